@@ -1,85 +1,199 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 import sqlite3
 import os
+import io
+import csv
+import zlib
+import sys
 import json
-from datetime import datetime
+import atexit
+import functools
+import threading
+import time
+from datetime import datetime, timedelta
 from flask_cors import CORS
 import logging
 
+# Make the shared utils/ and models/ packages importable when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.alert_parser import parse_alert
+from utils.alert_rows import (
+    INSERT_INSIGHT_SQL, INSERT_NOTIFICATION_SQL, INSERT_TRADE_SQL, insight_row, notification_row, trade_row
+)
+from utils.classifier import classify, classify_many
+from utils.dedup import Deduplicator, stored_hashes
+from utils.ingest_queue import IngestQueue, QueueFull
+from utils.logger import configure_logging
+from utils.metrics import Counter, Gauge, Histogram, MultiProcessExporter, collect
+from utils.migrations import ensure_schema
+from utils.pool import get_pool
+from utils.pubsub import EventHub, TableTailer
+from utils.response_cache import ResponseCache
+from models.batch import RecordBatch
+from models.insight import Insight
+from models.notification import Notification
+from models.position import PositionBook
+from models.trade import Trade
+
 app = Flask(__name__)
 CORS(app)
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging: records are written by a listener thread, off the request path
+configure_logging(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Environment variables for configuration
 DB_PATH = os.environ.get('DATABASE_URL', '/tmp/tradesync.db')
 MAX_INSIGHTS_LIMIT = int(os.environ.get('MAX_INSIGHTS_LIMIT', 10))
+MAX_INSIGHTS_PAGE_SIZE = int(os.environ.get('MAX_INSIGHTS_PAGE_SIZE', 100))
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 500))
 
-# Database connection helper with timeout
-def get_db_connection():
-    try:
-        conn = sqlite3.connect(DB_PATH, timeout=10)  # Add timeout to prevent database locked errors
-        conn.row_factory = sqlite3.Row  # Enable row factory for easier column access
-        return conn
-    except sqlite3.OperationalError as e:
-        logger.error(f"Database connection error: {str(e)}")
-        raise
+# Async ingest: /webhook queues alerts and returns 202 when enabled (or with ?async=1)
+WEBHOOK_ASYNC = os.environ.get('WEBHOOK_ASYNC', 'false').lower() in ('1', 'true', 'yes')
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 1000))
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 100))
+INGEST_FLUSH_MS = float(os.environ.get('INGEST_FLUSH_MS', 50))
+# Failed flushes are retried with backoff; alerts that still fail are appended here,
+# in discord_trades.log format, for backfill_alerts.py
+INGEST_MAX_RETRIES = int(os.environ.get('INGEST_MAX_RETRIES', 3))
+INGEST_RETRY_BACKOFF_MS = float(os.environ.get('INGEST_RETRY_BACKOFF_MS', 200))
+INGEST_DEAD_LETTER_LOG = os.environ.get('INGEST_DEAD_LETTER_LOG', 'ingest_failed.log')
 
-# Initialize the notifications table
-def init_notifications_table():
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source TEXT,
-                content TEXT,
-                timestamp DATETIME,
-                raw_data TEXT
-            )
-        ''')
-        conn.commit()
-        logger.info("Notifications table initialized")
-    except Exception as e:
-        logger.error(f"Error initializing notifications table: {str(e)}")
-        raise
-    finally:
-        conn.close()
+# Server-Sent Events stream of new insights
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+SSE_POLL_MS = float(os.environ.get('SSE_POLL_MS', 1000))
+SSE_HISTORY_SIZE = int(os.environ.get('SSE_HISTORY_SIZE', 1000))
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 5000))
+SSE_REPLAY_LIMIT = int(os.environ.get('SSE_REPLAY_LIMIT', 1000))
+
+# Ingest deduplication: repeats of the same text from the same source within the window are dropped
+DEDUP_WINDOW_SECONDS = float(os.environ.get('DEDUP_WINDOW_SECONDS', 60))
+DEDUP_CACHE_SIZE = int(os.environ.get('DEDUP_CACHE_SIZE', 10000))
+
+# Bulk close and the scheduled auto-close sweep (disabled while AUTO_CLOSE_AFTER_HOURS is 0)
+MAX_CLOSE_IDS = int(os.environ.get('MAX_CLOSE_IDS', 5000))
+AUTO_CLOSE_AFTER_HOURS = float(os.environ.get('AUTO_CLOSE_AFTER_HOURS', 0))
+AUTO_CLOSE_INTERVAL_SECONDS = float(os.environ.get('AUTO_CLOSE_INTERVAL_SECONDS', 300))
 
-# Initialize the database (both tables)
+# Pre-serialized read responses, invalidated whenever insights change
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+
+# Streaming table exports: rows fetched per query and gzip level
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', 5000))
+EXPORT_GZIP_LEVEL = int(os.environ.get('EXPORT_GZIP_LEVEL', 6))
+
+# Upper bound on tickers / hours returned by /api/stats
+MAX_STATS_ROWS = int(os.environ.get('MAX_STATS_ROWS', 1000))
+
+# Directory shared by gunicorn workers for /metrics aggregation; empty it before starting
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+
+# Shared WAL-mode connection pool (see utils/pool.py); looked up on every use
+# rather than held in a global so a worker forked after import gets its own
+def db_pool():
+    return get_pool(DB_PATH)
+
+# Database connection helper: use as `with get_db_connection() as conn:`
+def get_db_connection():
+    return db_pool().connection()
+
+# Bring the schema up to date once per process (see utils/migrations.py)
 def init_db():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS insights (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticker TEXT,
-                category TEXT,
-                subcategory TEXT,
-                sentiment TEXT,
-                summary TEXT,
-                confidence REAL,
-                source TEXT,
-                timestamp TEXT,
-                closed INTEGER DEFAULT 0
-            )
-        ''')
-        conn.commit()
-        logger.info("Insights table initialized")
+        ensure_schema(get_db_connection, DB_PATH)
+        logger.info("Database schema is up to date")
     except Exception as e:
-        logger.error(f"Error initializing insights table: {str(e)}")
+        logger.error(f"Error migrating database: {str(e)}")
         raise
-    finally:
-        conn.close()
-    init_notifications_table()
+
+# Request and ingest metrics, served at /metrics (see utils/metrics.py)
+http_request_seconds = Histogram(
+    'tradesync_http_request_seconds', 'Request latency by endpoint', ['endpoint', 'method', 'status']
+)
+ingest_stage_seconds = Histogram('tradesync_ingest_stage_seconds', 'Time spent in each alert ingest stage', ['stage'])
+ingest_stage = {
+    stage: ingest_stage_seconds.labels(stage)
+    for stage in ('parse', 'dedup', 'classify', 'dedup_db', 'insert_notifications', 'insert_insights',
+                  'insert_trades', 'commit')
+}
+alerts_counter = Counter('tradesync_alerts_total', 'Alerts received, by outcome', ['outcome'])
+alerts_total = {
+    outcome: alerts_counter.labels(outcome) for outcome in ('stored', 'duplicate', 'rejected', 'queue_full')
+}
+metrics_exporter = MultiProcessExporter(METRICS_DIR, interval=METRICS_FLUSH_SECONDS) if METRICS_DIR else None
+if metrics_exporter is not None:
+    metrics_exporter.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        http_request_seconds.labels(request.endpoint or 'unmatched', request.method, response.status_code).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+# Recently stored alert hashes; the unique index on notifications.content_hash backs it up
+deduplicator = Deduplicator(window_seconds=DEDUP_WINDOW_SECONDS, max_entries=DEDUP_CACHE_SIZE)
+
+# Open positions, kept in memory and fed from the trades table in id order
+position_book = PositionBook()
+
+# Trades with ids above last_id, for PositionBook.catch_up()
+def fetch_trades_since(last_id, limit, conn=None):
+    if conn is None:
+        with get_db_connection() as conn:
+            return fetch_trades_since(last_id, limit, conn)
+    return conn.execute('''
+        SELECT id, symbol, strike, option_type, expiry, trade_type, price, quantity, fraction
+        FROM trades
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (last_id, limit)).fetchall()
+
+# Replay the trades table into the position book
+def load_positions():
+    position_book.catch_up(fetch_trades_since)
+    logger.info(f"Position book rebuilt from {position_book.events_applied} trades")
+
+# Cached insights responses; webhook() and close_insight() bump its version
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE)
+
+# Marker that changes whenever any process writes to the tables behind cached
+# responses. Other gunicorn workers cannot bump this process's cache version,
+# but triggers advance cache_versions on every write, whoever commits it.
+def db_change_token():
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT version FROM cache_versions WHERE name IN ('insights', 'trades') ORDER BY name"
+        ).fetchall()
+    return tuple(row[0] for row in rows)
+
+# Live insight stream: the tailer publishes newly committed rows to the hub in id order
+insight_hub = EventHub(history_size=SSE_HISTORY_SIZE, max_subscribers=SSE_MAX_SUBSCRIBERS)
+
+def fetch_insights_since(last_id, limit):
+    with get_db_connection() as conn:
+        rows = conn.execute('SELECT * FROM insights WHERE id > ? ORDER BY id LIMIT ?', (last_id, limit)).fetchall()
+    return [(row['id'], insight_to_dict(row)) for row in rows]
+
+def latest_insight_id():
+    with get_db_connection() as conn:
+        return conn.execute('SELECT COALESCE(MAX(id), 0) FROM insights').fetchone()[0]
+
+insight_tailer = TableTailer(insight_hub, fetch_insights_since, latest_insight_id, poll_interval=SSE_POLL_MS / 1000)
 
 # Initialize database at app startup
 with app.app_context():
     init_db()
+    load_positions()
 
 @app.route("/")
 def home():
@@ -88,9 +202,8 @@ def home():
 @app.route('/health', methods=['GET'])
 def health_check():
     try:
-        conn = get_db_connection()
-        conn.cursor().execute('SELECT 1')
-        conn.close()
+        with get_db_connection() as conn:
+            conn.execute('SELECT 1')
         return jsonify({"status": "healthy"}), 200
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
@@ -98,151 +211,760 @@ def health_check():
 
 def call_grok_api(post_text, source, timestamp, image_url=None):
     try:
-        if "$" in post_text:
-            ticker = next((word for word in post_text.split() if word.startswith("$")), "N/A")
-            if "buy" in post_text.lower() or "sell" in post_text.lower():
-                category = "Actionable Trade"
-                subcategory = ""
-                sentiment = ""
-                summary = f"Trade suggestion for {ticker}."
-                confidence = 85.0
-            elif "short" in post_text.lower() or "breakout" in post_text.lower():
-                category = "AI Insight"
-                subcategory = ""
-                sentiment = "Bearish" if "short" in post_text.lower() else "Bullish"
-                summary = f"{sentiment} sentiment on {ticker} based on market signal."
-                confidence = 80.0
-            else:
-                category = "General Insight"
-                subcategory = "Community/Noise"
-                sentiment = ""
-                summary = f"General comment about {ticker}."
-                confidence = 30.0
-        else:
-            ticker = "N/A"
-            category = "General Insight"
-            subcategory = "Education" if "means" in post_text.lower() else "Community/Noise"
-            sentiment = ""
-            summary = "General trading discussion."
-            confidence = 60.0 if "means" in post_text.lower() else 10.0
-
-        return {
-            "ticker": ticker,
-            "category": category,
-            "subcategory": subcategory,
-            "sentiment": sentiment,
-            "summary": summary,
-            "confidence": confidence,
-            "source": source,
-            "timestamp": timestamp
-        }
+        return classify(post_text, source, timestamp)
     except Exception as e:
         logger.error(f"Error in call_grok_api: {str(e)}")
         raise
 
+# Pull the stored fields out of a webhook payload, raising ValueError when it is unusable
+def parse_alert_payload(data):
+    if not data:
+        raise ValueError("No JSON data provided")
+    if not isinstance(data, dict):
+        raise ValueError("Payload must be a JSON object")
+
+    post_text = data.get('text', '')
+    source = data.get('source', 'Unknown')
+    timestamp = data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+    if not post_text:
+        raise ValueError("Missing 'text' field")
+    return post_text, source, timestamp
+
+# Dedup hashes for an alert received now, or None when deduplication is off
+def alert_hashes(post_text, source):
+    return deduplicator.hashes(post_text, source) if deduplicator.enabled else None
+
+# Decide which alerts to keep: drop those whose hash is already persisted
+# (by any process) or repeated earlier in the same batch. Runs inside the
+# write transaction so the check and the inserts see the same rows.
+def drop_stored_duplicates(cursor, alerts):
+    persisted = stored_hashes(cursor, (digest for alert in alerts if alert[4] for digest in alert[4]))
+
+    keep = []
+    for alert in alerts:
+        hashes = alert[4]
+        if hashes and any(digest in persisted for digest in hashes):
+            keep.append(False)
+            continue
+        if hashes:
+            persisted.add(hashes[0])
+        keep.append(True)
+    return keep
+
+# Write notifications and their insights for a list of
+# (data, post_text, source, timestamp, hashes, insight_data) tuples in one transaction.
+# Options alerts in the batch are also recorded as trades, which the position
+# book reads back once the transaction has committed.
+# Returns a (notification_id, insight_id) pair per alert, in input order, or
+# None for alerts dropped as duplicates.
+def store_alerts(conn, alerts):
+    if not alerts:
+        return []
+
+    cursor = conn.cursor()
+    # IMMEDIATE takes the write lock up front, so AUTOINCREMENT ids in this
+    # transaction are contiguous and can be derived from last_insert_rowid()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        with ingest_stage['dedup_db'].time():
+            keep = drop_stored_duplicates(cursor, alerts)
+        stored = [alert for alert, kept in zip(alerts, keep) if kept]
+
+        trades = []
+        for _, post_text, source, timestamp, _, _ in stored:
+            alert = parse_alert(post_text)
+            if alert is not None:
+                trades.append((alert, source, timestamp))
+
+        if stored:
+            with ingest_stage['insert_notifications'].time():
+                cursor.executemany(INSERT_NOTIFICATION_SQL, [
+                    notification_row(source, post_text, timestamp, json.dumps(data), hashes[0] if hashes else None)
+                    for data, post_text, source, timestamp, hashes, _ in stored
+                ])
+                last_notification_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+            with ingest_stage['insert_insights'].time():
+                cursor.executemany(INSERT_INSIGHT_SQL, [insight_row(insight_data) for *_, insight_data in stored])
+                last_insight_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+        if trades:
+            with ingest_stage['insert_trades'].time():
+                cursor.executemany(INSERT_TRADE_SQL, [
+                    trade_row(alert, source, timestamp) for alert, source, timestamp in trades
+                ])
+        with ingest_stage['commit'].time():
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    alerts_total['stored'].inc(len(stored))
+    if len(stored) < len(alerts):
+        alerts_total['duplicate'].inc(len(alerts) - len(stored))
+        deduplicator.record_db_duplicates(len(alerts) - len(stored))
+    if not stored:
+        return [None] * len(alerts)
+
+    for *_, hashes, _ in stored:
+        if hashes:
+            deduplicator.remember(hashes[0])
+    if trades:
+        position_book.catch_up(functools.partial(fetch_trades_since, conn=conn))
+    response_cache.bump()
+    insight_tailer.notify()
+
+    next_notification_id = last_notification_id - len(stored) + 1
+    next_insight_id = last_insight_id - len(stored) + 1
+    ids = []
+    for kept in keep:
+        if kept:
+            ids.append((next_notification_id, next_insight_id))
+            next_notification_id += 1
+            next_insight_id += 1
+        else:
+            ids.append(None)
+    return ids
+
+# Writer-thread flush for the async ingest queue: classify and commit a micro-batch
+def flush_queued_alerts(batch):
+    items = [item for _, item in batch]
+    with ingest_stage['classify'].time():
+        insights = classify_many((post_text, source, timestamp) for _, post_text, source, timestamp, _ in items)
+    alerts = [item + (insight_data,) for item, insight_data in zip(items, insights)]
+
+    with get_db_connection() as conn:
+        ids = store_alerts(conn, alerts)
+    logger.info("Flushed %d queued notifications", sum(1 for i in ids if i))
+
+# The client's timestamp in the '%Y-%m-%d %H:%M:%S' form backfill_alerts.py reads; one
+# it can't parse is replaced by the current time, which is within the retry backoff of
+# when the alert was received, rather than writing a line the backfill would skip
+def log_timestamp(timestamp):
+    stamp = str(timestamp).strip()
+    try:
+        when = datetime.fromisoformat(stamp)
+    except ValueError:
+        try:
+            # Discord's own form, as in discord_trades.log
+            when = datetime.strptime(stamp, '%B %d, %Y at %I:%M%p')
+        except ValueError:
+            logger.warning(f"Unparseable alert timestamp {timestamp!r}; dead-lettering it with the current time")
+            when = datetime.now()
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return when.strftime('%Y-%m-%d %H:%M:%S')
+
+# Keep queued alerts that could not be stored: they were already acknowledged with a
+# receipt, so they go to the dead-letter log (backfill_alerts.py can load it) and the log
+def dead_letter_alerts(batch, error):
+    with open(INGEST_DEAD_LETTER_LOG, 'a') as f:
+        for receipt, (data, post_text, source, timestamp, _) in batch:
+            logger.error("Dropped queued alert %s from %s: %s", receipt, source, json.dumps(data))
+            f.write(f"{' '.join(post_text.split())} [{log_timestamp(timestamp)}]\n")
+    logger.error(f"Wrote {len(batch)} unstored alerts to {INGEST_DEAD_LETTER_LOG} after: {str(error)}")
+
+ingest_queue = IngestQueue(
+    flush_queued_alerts,
+    max_size=INGEST_QUEUE_SIZE,
+    batch_size=INGEST_BATCH_SIZE,
+    flush_interval=INGEST_FLUSH_MS / 1000,
+    max_retries=INGEST_MAX_RETRIES,
+    retry_backoff=INGEST_RETRY_BACKOFF_MS / 1000,
+    on_failure=dead_letter_alerts
+)
+atexit.register(ingest_queue.stop)
+
+Gauge('tradesync_ingest_queue_depth', 'Alerts waiting in the async ingest queue').set_function(
+    lambda: ingest_queue.stats()['depth']
+)
+Gauge('tradesync_sse_subscribers', 'Open /api/insights/stream connections').set_function(
+    lambda: insight_hub.subscriber_count
+)
+Gauge('tradesync_db_pool_in_use', 'Pooled SQLite connections checked out').set_function(
+    lambda: db_pool().stats()['in_use']
+)
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     try:
-        data = request.get_json()
-        logger.info(f"Received payload: {data}")
-        if not data:
-            logger.warning("No JSON data received")
-            return jsonify({"error": "No JSON data provided"}), 400
-        
-        post_text = data.get('text', '')
-        source = data.get('source', 'Unknown')
-        timestamp = data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        
-        if not post_text:
-            logger.warning("Missing 'text' field in payload")
-            return jsonify({"error": "Missing 'text' field"}), 400
-        
-        logger.info(f"Processing notification: source={source}, content={post_text}, timestamp={timestamp}")
+        with ingest_stage['parse'].time():
+            data = request.get_json()
+            logger.debug("Received payload: %s", data)
+            try:
+                post_text, source, timestamp = parse_alert_payload(data)
+            except ValueError as e:
+                alerts_total['rejected'].inc()
+                logger.warning(f"Rejected payload: {str(e)}")
+                return jsonify({"error": str(e)}), 400
+
+        # Repeats seen recently by this process are dropped before any further work
+        with ingest_stage['dedup'].time():
+            hashes = alert_hashes(post_text, source)
+            duplicate = hashes and deduplicator.is_duplicate(hashes)
+        if duplicate:
+            alerts_total['duplicate'].inc()
+            logger.info("Dropped duplicate notification")
+            return jsonify({"status": "duplicate"}), 200
         
-        # Store the notification
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO notifications (source, content, timestamp, raw_data)
-            VALUES (?, ?, ?, ?)
-        ''', (source, post_text, timestamp, json.dumps(data)))
-        conn.commit()
-        logger.info("Notification stored in database")
+        if WEBHOOK_ASYNC or request.args.get('async') == '1':
+            try:
+                receipt = ingest_queue.submit((data, post_text, source, timestamp, hashes))
+            except QueueFull as e:
+                alerts_total['queue_full'].inc()
+                logger.warning(f"Rejected payload: {str(e)}")
+                return jsonify({"error": str(e)}), 429, {'Retry-After': '1'}
+            return jsonify({"status": "queued", "receipt": receipt}), 202
+
+        logger.info("Processing notification: source=%s, content=%s, timestamp=%s", source, post_text, timestamp)
         
-        # Generate and store insight
-        insight_data = call_grok_api(post_text, source, timestamp)
-        cursor.execute('''
-            INSERT INTO insights (ticker, category, subcategory, sentiment, summary, confidence, source, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            insight_data['ticker'],
-            insight_data['category'],
-            insight_data.get('subcategory', ''),
-            insight_data.get('sentiment', ''),
-            insight_data['summary'],
-            insight_data['confidence'],
-            insight_data['source'],
-            insight_data['timestamp']
-        ))
-        conn.commit()
-        logger.info("Insight generated and stored")
-        conn.close()
+        # Generate the insight, then store it together with the notification
+        with ingest_stage['classify'].time():
+            insight_data = call_grok_api(post_text, source, timestamp)
+        with get_db_connection() as conn:
+            ids = store_alerts(conn, [(data, post_text, source, timestamp, hashes, insight_data)])
+        if ids[0] is None:
+            logger.info("Dropped duplicate notification")
+            return jsonify({"status": "duplicate"}), 200
+        logger.info("Notification and insight stored in database")
         
         return 'Webhook received', 200
     except Exception as e:
         logger.error(f"Error in webhook: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/webhook/batch', methods=['POST'])
+def webhook_batch():
+    try:
+        payloads = request.get_json()
+        if not isinstance(payloads, list) or not payloads:
+            logger.warning("Batch payload is not a non-empty JSON array")
+            return jsonify({"error": "Expected a non-empty JSON array of payloads"}), 400
+        if len(payloads) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch exceeds {MAX_BATCH_SIZE} payloads"}), 413
+
+        logger.info("Received batch of %d payloads", len(payloads))
+
+        # Validate every item first; bad items are reported, not fatal, and
+        # recent repeats are dropped before classification
+        results = [{"index": index} for index in range(len(payloads))]
+        valid = []
+        accepted = []
+        duplicates = 0
+        for index, data in enumerate(payloads):
+            try:
+                post_text, source, timestamp = parse_alert_payload(data)
+            except ValueError as e:
+                alerts_total['rejected'].inc()
+                results[index]["error"] = str(e)
+                continue
+            hashes = alert_hashes(post_text, source)
+            if hashes and deduplicator.is_duplicate(hashes):
+                alerts_total['duplicate'].inc()
+                results[index]["duplicate"] = True
+                duplicates += 1
+                continue
+            valid.append((data, post_text, source, timestamp, hashes))
+            accepted.append(index)
+
+        with ingest_stage['classify'].time():
+            insights = classify_many((post_text, source, timestamp) for _, post_text, source, timestamp, _ in valid)
+        alerts = [item + (insight_data,) for item, insight_data in zip(valid, insights)]
+
+        with get_db_connection() as conn:
+            ids = store_alerts(conn, alerts)
+
+        stored = 0
+        for index, alert_ids in zip(accepted, ids):
+            if alert_ids is None:
+                results[index]["duplicate"] = True
+                duplicates += 1
+                continue
+            results[index]["notification_id"], results[index]["insight_id"] = alert_ids
+            stored += 1
+
+        logger.info("Stored %d of %d batched notifications", stored, len(payloads))
+        return jsonify({
+            "accepted": stored,
+            "duplicates": duplicates,
+            "rejected": len(payloads) - stored - duplicates,
+            "results": results
+        }), 200
+    except Exception as e:
+        logger.error(f"Error in webhook_batch: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/ingest/stats', methods=['GET'])
+def ingest_stats():
+    return jsonify({"queue": ingest_queue.stats(), "dedup": deduplicator.stats()})
+
+@app.route('/api/db/stats', methods=['GET'])
+def db_stats():
+    return jsonify({"pool": db_pool().stats()})
+
+@app.route('/api/positions', methods=['GET'])
+def get_positions():
+    try:
+        include_closed = request.args.get('include_closed') == '1'
+        # Pick up trades committed by other processes since the last request
+        position_book.catch_up(fetch_trades_since)
+        return jsonify({
+            "positions": position_book.snapshot(include_closed=include_closed),
+            "realized_pnl": position_book.realized_pnl()
+        })
+    except Exception as e:
+        logger.error(f"Error in get_positions: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# JSON shape of an insights row
+def insight_to_dict(row):
+    return {
+        "id": row['id'],
+        "ticker": row['ticker'],
+        "category": row['category'],
+        "subcategory": row['subcategory'],
+        "sentiment": row['sentiment'],
+        "summary": row['summary'],
+        "confidence": row['confidence'],
+        "source": row['source'],
+        "timestamp": row['timestamp'],
+        "closed": row['closed']
+    }
+
+# Filterable query parameters accepted by the insights list endpoints
+INSIGHT_EQUALITY_FILTERS = ('ticker', 'category', 'sentiment')
+
+# Build the keyset-paginated SELECT for an insights page from request args.
+# Raises ValueError for malformed parameters.
+def build_insights_query(args, closed):
+    clauses = ['closed = ?']
+    params = [closed]
+
+    for column in INSIGHT_EQUALITY_FILTERS:
+        value = args.get(column)
+        if value:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+
+    if args.get('min_confidence'):
+        clauses.append('confidence >= ?')
+        params.append(float(args['min_confidence']))
+    if args.get('since'):
+        clauses.append('timestamp >= ?')
+        params.append(args['since'])
+    if args.get('until'):
+        clauses.append('timestamp < ?')
+        params.append(args['until'])
+    if args.get('before_id'):
+        clauses.append('id < ?')
+        params.append(int(args['before_id']))
+
+    limit = int(args.get('limit', MAX_INSIGHTS_LIMIT))
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    limit = min(limit, MAX_INSIGHTS_PAGE_SIZE)
+    params.append(limit)
+
+    query = f"SELECT {', '.join(Insight.COLUMNS)} FROM insights WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT ?"
+    return query, params, limit
+
+# Run an insights page query and return (insights, next_before_id), with the
+# insights as a column-wise RecordBatch that encodes straight to JSON
+def fetch_insights_page(args, closed):
+    query, params, limit = build_insights_query(args, closed)
+    with get_db_connection() as conn:
+        insights = RecordBatch.from_cursor(conn.execute(query, params), Insight.COLUMN_TYPES)
+
+    # A full page means there may be older rows; the client pages back with ?before_id=
+    next_before_id = insights.column('id')[-1] if len(insights) == limit else None
+    return insights, next_before_id
+
+# Serve a JSON body built by build() -> (payload, headers) through the response cache.
+# Bodies are reused while the data version is unchanged, and a matching
+# If-None-Match is answered with 304 without touching SQLite. build() raises
+# ValueError for bad query parameters.
+def cached_json_response(key, build):
+    token = db_change_token()
+    entry = response_cache.get(key, token)
+    if entry is None:
+        version = response_cache.version
+        try:
+            payload, headers = build()
+        except ValueError as e:
+            return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+        if isinstance(payload, RecordBatch):
+            body = payload.to_json().encode()
+        else:
+            body = app.json.dumps(payload).encode()
+        entry = response_cache.put(key, body, headers, version=version, token=token)
+
+    if request.if_none_match.contains(entry.etag):
+        response_cache.record_not_modified(entry)
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers.update(entry.headers)
+    return response
+
+# Serve one page of insights, with the cursor for the next page in X-Next-Before-Id
+def insights_page_response(closed):
+    def build():
+        insights, next_before_id = fetch_insights_page(request.args, closed)
+        headers = {}
+        if next_before_id is not None:
+            headers['X-Next-Before-Id'] = str(next_before_id)
+        return insights, headers
+
+    return cached_json_response((closed, tuple(sorted(request.args.items(multi=True)))), build)
+
+# Prometheus text exposition, merged across workers when METRICS_DIR is set
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    try:
+        return Response(collect(metrics_exporter), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logger.error(f"Error in metrics: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(response_cache.stats())
+
 @app.route('/api/insights', methods=['GET'])
 def get_insights():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("PRAGMA table_info(insights)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'closed' not in columns:
-            cursor.execute('ALTER TABLE insights ADD COLUMN closed INTEGER DEFAULT 0')
-            conn.commit()
-            logger.info("Added 'closed' column to insights table")
-        
-        cursor.execute('SELECT * FROM insights WHERE closed = 0 OR closed IS NULL ORDER BY id DESC LIMIT ?', (MAX_INSIGHTS_LIMIT,))
-        rows = cursor.fetchall()
-        
-        insights = [
-            {
-                "id": row['id'],
-                "ticker": row['ticker'],
-                "category": row['category'],
-                "subcategory": row['subcategory'],
-                "sentiment": row['sentiment'],
-                "summary": row['summary'],
-                "confidence": row['confidence'],
-                "source": row['source'],
-                "timestamp": row['timestamp'],
-                "closed": row['closed']
-            } for row in rows
-        ]
-        conn.close()
-        return jsonify(insights)
+        return insights_page_response(closed=0)
     except Exception as e:
         logger.error(f"Error in get_insights: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Comma-separated or repeated query parameter, e.g. ?ticker=$A,$B or ?ticker=$A&ticker=$B
+def split_arg(args, name):
+    return [value for raw in args.getlist(name) for value in raw.split(',') if value]
+
+# Aggregate insight and trade statistics from the trigger-maintained summary
+# tables (see migration 5), so the cost depends on the number of distinct
+# tickers and hours rather than on the number of rows
+def compute_stats(args):
+    closed = args.get('closed', '0')
+    if closed not in ('0', '1', 'all'):
+        raise ValueError("closed must be 0, 1 or all")
+    limit = min(int(args.get('limit', 20)), MAX_STATS_ROWS)
+    hours = min(int(args.get('hours', 48)), MAX_STATS_ROWS)
+    tickers = split_arg(args, 'ticker')
+
+    insight_clauses = ['count > 0']
+    insight_params = []
+    if closed != 'all':
+        insight_clauses.append('closed = ?')
+        insight_params.append(int(closed))
+    trade_clauses = ['count > 0']
+    trade_params = []
+    if tickers:
+        insight_clauses.append(f"ticker IN ({', '.join('?' * len(tickers))})")
+        insight_params.extend(tickers)
+        # Trades store the bare symbol ($NDX -> NDX)
+        trade_clauses.append(f"symbol IN ({', '.join('?' * len(tickers))})")
+        trade_params.extend(ticker.lstrip('$') for ticker in tickers)
+    insight_where = ' AND '.join(insight_clauses)
+    trade_where = ' AND '.join(trade_clauses)
+
+    def grouped(conn, column, order='total DESC', limit=-1):
+        return conn.execute(
+            f"SELECT {column} AS value, SUM(count) AS total FROM insight_stats WHERE {insight_where} "
+            f"GROUP BY {column} ORDER BY {order} LIMIT ?", insight_params + [limit]
+        ).fetchall()
+
+    with get_db_connection() as conn:
+        by_ticker = grouped(conn, 'ticker', limit=limit)
+        by_sentiment = grouped(conn, 'sentiment')
+        by_category = grouped(conn, 'category')
+        histogram = dict((row['value'], row['total']) for row in grouped(conn, 'confidence_bucket', 'value'))
+        per_hour = conn.execute(f"""
+            SELECT hour,
+                   SUM(count) AS trades,
+                   SUM(CASE WHEN trade_type = 'BUY' THEN count ELSE 0 END) AS buys,
+                   SUM(CASE WHEN trade_type = 'SELL' THEN count ELSE 0 END) AS sells,
+                   SUM(quantity) AS contracts
+            FROM trade_stats WHERE {trade_where}
+            GROUP BY hour ORDER BY hour DESC LIMIT ?
+        """, trade_params + [hours]).fetchall()
+        trade_total = conn.execute(
+            f"SELECT IFNULL(SUM(count), 0) FROM trade_stats WHERE {trade_where}", trade_params
+        ).fetchone()[0]
+
+    return {
+        "insights": {
+            "total": sum(histogram.values()),
+            "by_ticker": [{"ticker": row['value'], "count": row['total']} for row in by_ticker],
+            "by_sentiment": {row['value'] or 'Neutral': row['total'] for row in by_sentiment},
+            "by_category": {row['value']: row['total'] for row in by_category},
+            "confidence_histogram": [
+                {"min": bucket * 10, "max": bucket * 10 + 10, "count": histogram.get(bucket, 0)}
+                for bucket in range(10)
+            ]
+        },
+        "trades": {
+            "total": trade_total,
+            "per_hour": [
+                {
+                    "hour": f"{row['hour']}:00",
+                    "trades": row['trades'],
+                    "buys": row['buys'],
+                    "sells": row['sells'],
+                    "contracts": row['contracts']
+                } for row in per_hour
+            ]
+        }
+    }
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    try:
+        return cached_json_response(
+            ('stats', tuple(sorted(request.args.items(multi=True)))),
+            lambda: (compute_stats(request.args), {})
+        )
+    except Exception as e:
+        logger.error(f"Error in get_stats: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# Replay insights after last_id from SQLite when the hub's buffer does not reach back far enough.
+# Returns one page of up to SSE_REPLAY_LIMIT events with ids up to until_id, the
+# hub's last_id when the client subscribed; callers page on until they reach it,
+# since only later events arrive live.
+def replay_insights(last_id, tickers, categories, until_id=None):
+    clauses = ['id > ?']
+    params = [last_id]
+    if until_id is not None:
+        clauses.append('id <= ?')
+        params.append(until_id)
+    if tickers:
+        clauses.append(f"ticker IN ({', '.join('?' * len(tickers))})")
+        params.extend(tickers)
+    if categories:
+        clauses.append(f"category IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
+    params.append(SSE_REPLAY_LIMIT)
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM insights WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?", params
+        ).fetchall()
+    return [(row['id'], EventHub.encode(row['id'], insight_to_dict(row))) for row in rows]
+
+@app.route('/api/insights/stream', methods=['GET'])
+def stream_insights():
+    try:
+        tickers = split_arg(request.args, 'ticker')
+        categories = split_arg(request.args, 'category')
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an insight id"}), 400
+
+    insight_tailer.start()
+    try:
+        subscription, backlog = insight_hub.subscribe(tickers, categories, last_event_id)
+    except OverflowError as e:
+        logger.warning(f"Rejected stream subscriber: {str(e)}")
+        return jsonify({"error": str(e)}), 503
+
+    replay_until = None
+    try:
+        if backlog is None:
+            replay_until = insight_hub.last_id
+            backlog = replay_insights(last_event_id, tickers, categories, replay_until)
+    except Exception:
+        subscription.close()
+        raise
+
+    def generate():
+        nonlocal backlog
+        last_sent = last_event_id or 0
+        try:
+            yield f"retry: {int(SSE_POLL_MS)}\n\n".encode()
+            while True:
+                for event_id, payload in backlog:
+                    last_sent = event_id
+                    yield payload
+                # A full replay page may stop short of the first live event
+                if replay_until is None or len(backlog) < SSE_REPLAY_LIMIT:
+                    break
+                backlog = replay_insights(last_sent, tickers, categories, replay_until)
+            while not subscription.closed:
+                event = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield b": keepalive\n\n"
+                    continue
+                event_id, payload = event
+                # Events already sent from the replay are skipped
+                if event_id > last_sent:
+                    last_sent = event_id
+                    yield payload
+        finally:
+            subscription.close()
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/insights/stream/stats', methods=['GET'])
+def stream_stats():
+    return jsonify(insight_hub.stats())
+
+# UPDATE ... RETURNING needs SQLite 3.35; older builds select the ids first
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Keep each IN (...) list under SQLite's bound-parameter limit
+CLOSE_CHUNK_SIZE = 500
+
+# Close the open insights matching `where` and return their ids. Must run inside
+# a write transaction so the fallback SELECT and UPDATE see the same rows.
+def close_matching(cursor, where, params):
+    if SUPPORTS_RETURNING:
+        rows = cursor.execute(
+            f'UPDATE insights SET closed = 1 WHERE closed = 0 AND {where} RETURNING id', params
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    ids = [row[0] for row in cursor.execute(f'SELECT id FROM insights WHERE closed = 0 AND {where}', params)]
+    for start in range(0, len(ids), CLOSE_CHUNK_SIZE):
+        chunk = ids[start:start + CLOSE_CHUNK_SIZE]
+        cursor.execute(f"UPDATE insights SET closed = 1 WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+    return ids
+
+# Close a list of insight ids in one transaction.
+# Returns (changed, already_closed, missing) id lists.
+def close_insight_ids(conn, ids):
+    ids = sorted(set(ids))
+    changed = []
+    existing = set()
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        for start in range(0, len(ids), CLOSE_CHUNK_SIZE):
+            chunk = ids[start:start + CLOSE_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            existing.update(row[0] for row in cursor.execute(f'SELECT id FROM insights WHERE id IN ({placeholders})', chunk))
+            changed.extend(close_matching(cursor, f'id IN ({placeholders})', chunk))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    changed_set = set(changed)
+    already_closed = [insight_id for insight_id in ids if insight_id in existing and insight_id not in changed_set]
+    missing = [insight_id for insight_id in ids if insight_id not in existing]
+    return sorted(changed), already_closed, missing
+
+# Close every open insight matching ticker / category / older_than in one transaction
+def close_insights_where(conn, ticker=None, category=None, older_than=None):
+    clauses = []
+    params = []
+    if ticker:
+        clauses.append('ticker = ?')
+        params.append(ticker)
+    if category:
+        clauses.append('category = ?')
+        params.append(category)
+    if older_than:
+        clauses.append('timestamp < ?')
+        params.append(older_than)
+    if not clauses:
+        raise ValueError("At least one of ticker, category or older_than is required")
+
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        changed = close_matching(cursor, ' AND '.join(clauses), params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return sorted(changed)
+
+@app.route('/api/insights/close', methods=['POST'])
+def close_insights_bulk():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object with 'ids' or filters"}), 400
+
+        if 'ids' in data:
+            ids = data['ids']
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                return jsonify({"error": "'ids' must be a list of integers"}), 400
+            if len(ids) > MAX_CLOSE_IDS:
+                return jsonify({"error": f"At most {MAX_CLOSE_IDS} ids per request"}), 413
+            with get_db_connection() as conn:
+                changed, already_closed, missing = close_insight_ids(conn, ids)
+            result = {"closed": changed, "already_closed": already_closed, "missing": missing}
+        else:
+            try:
+                with get_db_connection() as conn:
+                    changed = close_insights_where(
+                        conn,
+                        ticker=data.get('ticker'),
+                        category=data.get('category'),
+                        older_than=data.get('older_than')
+                    )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            result = {"closed": changed}
+
+        if changed:
+            response_cache.bump()
+        logger.info(f"Bulk closed {len(changed)} insights")
+        return jsonify(result), 200
+    except Exception as e:
+        logger.error(f"Error in close_insights_bulk: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# Periodically close insights older than AUTO_CLOSE_AFTER_HOURS. The cutoff is a
+# range on the (closed, timestamp) index, so each sweep only visits stale rows.
+def auto_close_sweep():
+    cutoff = (datetime.now() - timedelta(hours=AUTO_CLOSE_AFTER_HOURS)).strftime('%Y-%m-%d %H:%M:%S')
+    with get_db_connection() as conn:
+        changed = close_insights_where(conn, older_than=cutoff)
+    if changed:
+        response_cache.bump()
+        logger.info(f"Auto-closed {len(changed)} insights older than {cutoff}")
+    return changed
+
+def run_auto_close():
+    while True:
+        try:
+            auto_close_sweep()
+        except Exception as e:
+            logger.error(f"Error in auto-close sweep: {str(e)}")
+        time.sleep(AUTO_CLOSE_INTERVAL_SECONDS)
+
+if AUTO_CLOSE_AFTER_HOURS > 0:
+    threading.Thread(target=run_auto_close, name='auto-close', daemon=True).start()
+
+# Close one insight; returns False when there is no such insight
+def close_one_insight(conn, insight_id):
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT id FROM insights WHERE id = ?', (insight_id,))
+    if not cursor.fetchone():
+        return False
+    
+    cursor.execute('UPDATE insights SET closed = 1 WHERE id = ?', (insight_id,))
+    conn.commit()
+    return True
+
 @app.route('/api/insights/close/<int:insight_id>', methods=['POST'])
 def close_insight(insight_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT id FROM insights WHERE id = ?', (insight_id,))
-        if not cursor.fetchone():
-            conn.close()
-            return jsonify({"error": "Insight not found"}), 404
-        
-        cursor.execute('UPDATE insights SET closed = 1 WHERE id = ?', (insight_id,))
-        conn.commit()
-        conn.close()
+        with get_db_connection() as conn:
+            if not close_one_insight(conn, insight_id):
+                return jsonify({"error": "Insight not found"}), 404
+        response_cache.bump()
         
         return jsonify({"success": True, "message": f"Insight {insight_id} closed successfully"}), 200
     except Exception as e:
@@ -252,32 +974,116 @@ def close_insight(insight_id):
 @app.route('/api/insights/closed', methods=['GET'])
 def get_closed_insights():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM insights WHERE closed = 1 ORDER BY id DESC LIMIT ?', (MAX_INSIGHTS_LIMIT,))
-        rows = cursor.fetchall()
-        
-        insights = [
-            {
-                "id": row['id'],
-                "ticker": row['ticker'],
-                "category": row['category'],
-                "subcategory": row['subcategory'],
-                "sentiment": row['sentiment'],
-                "summary": row['summary'],
-                "confidence": row['confidence'],
-                "source": row['source'],
-                "timestamp": row['timestamp'],
-                "closed": row['closed']
-            } for row in rows
-        ]
-        conn.close()
-        return jsonify(insights)
+        return insights_page_response(closed=1)
     except Exception as e:
         logger.error(f"Error in get_closed_insights: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Columns and RecordBatch array types per exportable table
+EXPORT_TABLES = {
+    'insights': (Insight.COLUMNS, Insight.COLUMN_TYPES),
+    'notifications': (Notification.COLUMNS, Notification.COLUMN_TYPES),
+    'trades': (Trade.COLUMNS, Trade.COLUMN_TYPES),
+}
+
+# Build the keyset query for an export from request args; returns
+# (query, params, limit) with the resume id first in params. Raises
+# ValueError for malformed parameters.
+def build_export_query(table, args):
+    columns, _ = EXPORT_TABLES[table]
+    clauses = ['id > ?']
+    params = [int(args.get('after_id', 0))]
+    if args.get('since'):
+        clauses.append('timestamp >= ?')
+        params.append(args['since'])
+    if args.get('until'):
+        clauses.append('timestamp < ?')
+        params.append(args['until'])
+    limit = int(args['limit']) if args.get('limit') else None
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be positive")
+    query = f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+    return query, params, limit
+
+# Yield an export as lists of row tuples in id order. Each chunk is its own
+# short keyset query, so a slow client never holds a read transaction open
+# (which would stop WAL checkpoints) and memory stays at one chunk.
+def export_chunks(query, params, limit=None):
+    params = list(params)
+    while limit is None or limit > 0:
+        size = EXPORT_CHUNK_ROWS if limit is None else min(EXPORT_CHUNK_ROWS, limit)
+        with get_db_connection() as conn:
+            rows = conn.execute(query, params + [size]).fetchall()
+        if not rows:
+            return
+        yield rows
+        params[0] = rows[-1]['id']
+        if limit is not None:
+            limit -= len(rows)
+        if len(rows) < size:
+            return
+
+# Encode export chunks as NDJSON or CSV text
+def encode_export(table, chunks, fmt):
+    columns, types = EXPORT_TABLES[table]
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for rows in chunks:
+            yield '\n'.join(RecordBatch.from_rows(rows, columns, types).json_rows()) + '\n'
+
+# Compress a stream of text chunks into one gzip member as it is produced
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+# Stream a whole table as NDJSON (default) or CSV. Filters: since / until on
+# timestamp, after_id to resume, limit. Compressed when the client accepts
+# gzip, or as a .gz download with ?gzip=1.
+@app.route('/api/export/<table>', methods=['GET'])
+def export_table(table):
+    try:
+        if table not in EXPORT_TABLES:
+            return jsonify({"error": f"Unknown table '{table}'"}), 404
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in ('ndjson', 'csv'):
+            return jsonify({"error": "format must be ndjson or csv"}), 400
+        try:
+            query, params, limit = build_export_query(table, request.args)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+
+        body = encode_export(table, export_chunks(query, params, limit), fmt)
+        mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        filename = f"{table}.{fmt}"
+        headers = {'X-Accel-Buffering': 'no', 'Vary': 'Accept-Encoding'}
+        if request.args.get('gzip') == '1':
+            body = gzip_stream(body)
+            mimetype = 'application/gzip'
+            filename += '.gz'
+        elif 'gzip' in request.accept_encodings:
+            body = gzip_stream(body)
+            headers['Content-Encoding'] = 'gzip'
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        logger.info("Exporting %s as %s", table, fmt)
+        return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+    except Exception as e:
+        logger.error(f"Error in export_table: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,368 @@
+"""asyncio-native ASGI entry point for the backend API.
+
+Serves the same routes as app.py (/webhook, /api/insights,
+/api/insights/closed, /api/insights/close/<id>, /api/insights/stream and
+/health) with the same responses, reusing app.py's storage, caching and
+streaming code. Requests are coroutines rather than threads: SQLite work runs
+on dedicated executors (one writer thread, so writes never contend for the
+lock, plus a small read pool), classification stays synchronous on the event
+loop, and each open SSE stream is a waiting coroutine, so one process holds
+thousands of connections.
+
+Run with any ASGI server, e.g. from this directory:
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import functools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_etags, quote_etag
+
+# Import app.py from this directory, not the repository root's app.py
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import (
+    SSE_HEARTBEAT_SECONDS, SSE_POLL_MS, SSE_REPLAY_LIMIT, WEBHOOK_ASYNC, alerts_total, alert_hashes, call_grok_api,
+    close_one_insight, db_change_token, db_pool, deduplicator, fetch_insights_page, get_db_connection,
+    http_request_seconds, ingest_queue, ingest_stage, insight_hub, insight_tailer, logger, parse_alert_payload,
+    replay_insights, response_cache, split_arg, store_alerts
+)
+from utils.ingest_queue import QueueFull
+from utils.pubsub import AsyncSubscription
+
+# Threads for SQLite reads; one connection of the pool is left for the writer thread
+ASGI_DB_READ_THREADS = int(os.environ.get('ASGI_DB_READ_THREADS', max(1, db_pool().max_size - 1)))
+# Request bodies above this size are rejected with 413
+ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 1024 * 1024))
+
+db_read_executor = ThreadPoolExecutor(max_workers=ASGI_DB_READ_THREADS, thread_name_prefix='asgi-db-read')
+db_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='asgi-db-write')
+
+class BodyTooLarge(Exception):
+    """Raised while reading a request body longer than ASGI_MAX_BODY_BYTES"""
+
+# Run a blocking database call on the read (or write) executor
+async def run_read(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(db_read_executor, functools.partial(function, *args))
+
+async def run_write(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(db_write_executor, functools.partial(function, *args))
+
+class Request:
+    """The parts of an HTTP request the handlers use"""
+    __slots__ = ('method', 'path', 'args', 'headers', 'body')
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        self.headers = {}
+        for name, value in scope.get('headers', ()):
+            name = name.decode('latin-1').lower()
+            value = value.decode('latin-1')
+            self.headers[name] = f"{self.headers[name]}, {value}" if name in self.headers else value
+        self.body = body
+
+    def get_json(self):
+        """The decoded JSON body, or None when it is missing or malformed"""
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+class Response:
+    """A status, headers and a body of bytes or an async iterator of bytes"""
+    __slots__ = ('status', 'body', 'headers')
+
+    def __init__(self, body=b'', status=200, headers=None, content_type='text/html; charset=utf-8'):
+        self.status = status
+        self.body = body.encode() if isinstance(body, str) else body
+        self.headers = {'Content-Type': content_type} if content_type else {}
+        self.headers.update(headers or {})
+
+def json_response(data, status=200, headers=None):
+    return Response(json.dumps(data), status, headers, 'application/json')
+
+# Same insight pages as app.py's cached_json_response: bodies are built on the
+# read executor and shared through response_cache, 304 on a matching ETag
+async def insights_page(request, closed):
+    key = (closed, tuple(sorted(request.args.items(multi=True))))
+    token = await run_read(db_change_token)
+    entry = response_cache.get(key, token)
+    if entry is None:
+        version = response_cache.version
+
+        def build():
+            insights, next_before_id = fetch_insights_page(request.args, closed)
+            headers = {}
+            if next_before_id is not None:
+                headers['X-Next-Before-Id'] = str(next_before_id)
+            return insights.to_json().encode(), headers
+
+        try:
+            body, headers = await run_read(build)
+        except ValueError as e:
+            return json_response({"error": f"Invalid query parameter: {str(e)}"}, 400)
+        entry = response_cache.put(key, body, headers, version=version, token=token)
+
+    headers = dict(entry.headers, ETag=quote_etag(entry.etag))
+    headers['Cache-Control'] = 'no-cache'
+    if parse_etags(request.headers.get('if-none-match')).contains(entry.etag):
+        response_cache.record_not_modified(entry)
+        return Response(status=304, headers=headers, content_type=None)
+    return Response(entry.body, headers=headers, content_type='application/json')
+
+async def home(request):
+    return Response("TradeSync Bot API")
+
+async def health_check(request):
+    def ping():
+        with get_db_connection() as conn:
+            conn.execute('SELECT 1')
+    try:
+        await run_read(ping)
+        return json_response({"status": "healthy"})
+    except Exception as e:
+        logger.error(f"Health check failed: {str(e)}")
+        return json_response({"status": "unhealthy", "error": str(e)}, 500)
+
+# Store a list of alerts on the writer thread (see app.store_alerts)
+def store_alert_list(alerts):
+    with get_db_connection() as conn:
+        return store_alerts(conn, alerts)
+
+async def webhook(request):
+    with ingest_stage['parse'].time():
+        data = request.get_json()
+        logger.debug("Received payload: %s", data)
+        try:
+            post_text, source, timestamp = parse_alert_payload(data)
+        except ValueError as e:
+            alerts_total['rejected'].inc()
+            logger.warning(f"Rejected payload: {str(e)}")
+            return json_response({"error": str(e)}, 400)
+
+    with ingest_stage['dedup'].time():
+        hashes = alert_hashes(post_text, source)
+        duplicate = hashes and deduplicator.is_duplicate(hashes)
+    if duplicate:
+        alerts_total['duplicate'].inc()
+        logger.info("Dropped duplicate notification")
+        return json_response({"status": "duplicate"})
+
+    if WEBHOOK_ASYNC or request.args.get('async') == '1':
+        try:
+            receipt = ingest_queue.submit((data, post_text, source, timestamp, hashes))
+        except QueueFull as e:
+            alerts_total['queue_full'].inc()
+            logger.warning(f"Rejected payload: {str(e)}")
+            return json_response({"error": str(e)}, 429, {'Retry-After': '1'})
+        return json_response({"status": "queued", "receipt": receipt}, 202)
+
+    logger.info("Processing notification: source=%s, content=%s, timestamp=%s", source, post_text, timestamp)
+
+    # Classification is CPU-only and quick, so it stays on the event loop
+    with ingest_stage['classify'].time():
+        insight_data = call_grok_api(post_text, source, timestamp)
+    ids = await run_write(store_alert_list, [(data, post_text, source, timestamp, hashes, insight_data)])
+    if ids[0] is None:
+        logger.info("Dropped duplicate notification")
+        return json_response({"status": "duplicate"})
+    logger.info("Notification and insight stored in database")
+    return Response("Webhook received")
+
+async def get_insights(request):
+    return await insights_page(request, closed=0)
+
+async def get_closed_insights(request):
+    return await insights_page(request, closed=1)
+
+def close_insight_id(insight_id):
+    with get_db_connection() as conn:
+        return close_one_insight(conn, insight_id)
+
+async def close_insight(request, insight_id):
+    if not await run_write(close_insight_id, int(insight_id)):
+        return json_response({"error": "Insight not found"}, 404)
+    response_cache.bump()
+    return json_response({"success": True, "message": f"Insight {insight_id} closed successfully"})
+
+# Server-Sent Events stream of new insights; see app.stream_insights for the protocol
+async def stream_insights(request):
+    try:
+        tickers = split_arg(request.args, 'ticker')
+        categories = split_arg(request.args, 'category')
+        last_event_id = request.headers.get('last-event-id') or request.args.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return json_response({"error": "Last-Event-ID must be an insight id"}, 400)
+
+    await run_read(insight_tailer.start)
+    try:
+        subscription, backlog = insight_hub.subscribe(
+            tickers, categories, last_event_id, subscription_class=AsyncSubscription
+        )
+    except OverflowError as e:
+        logger.warning(f"Rejected stream subscriber: {str(e)}")
+        return json_response({"error": str(e)}, 503)
+
+    replay_until = None
+    try:
+        if backlog is None:
+            replay_until = insight_hub.last_id
+            backlog = await run_read(replay_insights, last_event_id, tickers, categories, replay_until)
+    except Exception:
+        subscription.close()
+        raise
+
+    async def generate():
+        nonlocal backlog
+        last_sent = last_event_id or 0
+        try:
+            yield f"retry: {int(SSE_POLL_MS)}\n\n".encode()
+            while True:
+                for event_id, payload in backlog:
+                    last_sent = event_id
+                    yield payload
+                # A full replay page may stop short of the first live event
+                if replay_until is None or len(backlog) < SSE_REPLAY_LIMIT:
+                    break
+                backlog = await run_read(replay_insights, last_sent, tickers, categories, replay_until)
+            while not subscription.closed:
+                event = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield b": keepalive\n\n"
+                    continue
+                event_id, payload = event
+                # Events already sent from the replay are skipped
+                if event_id > last_sent:
+                    last_sent = event_id
+                    yield payload
+        finally:
+            subscription.close()
+
+    return Response(generate(), headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }, content_type='text/event-stream; charset=utf-8')
+
+# (method, path pattern, endpoint name, handler). Endpoint names match the
+# Flask view functions so both entry points report the same metric labels.
+ROUTES = [
+    ('GET', re.compile(r'/'), 'home', home),
+    ('GET', re.compile(r'/health'), 'health_check', health_check),
+    ('POST', re.compile(r'/webhook'), 'webhook', webhook),
+    ('GET', re.compile(r'/api/insights'), 'get_insights', get_insights),
+    ('GET', re.compile(r'/api/insights/closed'), 'get_closed_insights', get_closed_insights),
+    ('POST', re.compile(r'/api/insights/close/(\d+)'), 'close_insight', close_insight),
+    ('GET', re.compile(r'/api/insights/stream'), 'stream_insights', stream_insights),
+]
+
+# Find the route for a request: (endpoint, handler, path arguments), or a
+# ready-made 404 / 405 response in place of the handler
+def resolve(method, path):
+    allowed = []
+    for route_method, pattern, endpoint, handler in ROUTES:
+        match = pattern.fullmatch(path)
+        if match is None:
+            continue
+        if route_method == method:
+            return endpoint, handler, match.groups()
+        allowed.append(route_method)
+    if allowed:
+        return None, json_response({"error": "Method not allowed"}, 405, {'Allow': ', '.join(allowed)}), ()
+    return None, json_response({"error": "Not found"}, 404), ()
+
+async def read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > ASGI_MAX_BODY_BYTES:
+            raise BodyTooLarge(f"Request body exceeds {ASGI_MAX_BODY_BYTES} bytes")
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+async def send_response(send, response):
+    headers = [(name.encode('latin-1'), str(value).encode('latin-1')) for name, value in response.headers.items()]
+    await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+    if isinstance(response.body, bytes):
+        await send({'type': 'http.response.body', 'body': response.body})
+        return
+    try:
+        async for chunk in response.body:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        await response.body.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
+
+# Stream a response body until it ends or the client disconnects
+async def send_streaming(send, receive, response):
+    sender = asyncio.ensure_future(send_response(send, response))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait((sender, disconnected), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+        if not sender.done():
+            # Cancelling the sender closes the generator, which unsubscribes it
+            sender.cancel()
+        await asyncio.gather(sender, disconnected, return_exceptions=True)
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            db_read_executor.shutdown(wait=False)
+            db_write_executor.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    started = time.perf_counter()
+    endpoint, handler, path_args = resolve(scope['method'], scope['path'])
+    if endpoint is None:
+        response = handler
+    else:
+        try:
+            body = await read_body(receive)
+            if body is None:
+                return
+            response = await handler(Request(scope, body), *path_args)
+        except BodyTooLarge as e:
+            response = json_response({"error": str(e)}, 413)
+        except Exception as e:
+            logger.error(f"Error in {endpoint}: {str(e)}")
+            response = json_response({"error": str(e)}, 500)
+
+    # Observed once the response is ready, as app.py's after_request does
+    http_request_seconds.labels(endpoint or 'unmatched', scope['method'], response.status).observe(
+        time.perf_counter() - started
+    )
+    if isinstance(response.body, bytes):
+        await send_response(send, response)
+    else:
+        await send_streaming(send, receive, response)
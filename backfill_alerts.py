@@ -0,0 +1,241 @@
+"""Bulk-load historical alert logs (discord_trades.log format) into the database.
+
+Each line is ``<alert text> [<timestamp>]`` where the timestamp is either the
+Discord export form (``March 11, 2025 at 09:14PM``) or ``YYYY-MM-DD HH:MM:SS``
+as written by the scraper's fallback log. Files are streamed line by line and
+loaded in large transactions; progress is checkpointed by byte offset so an
+interrupted run picks up where it stopped.
+
+Usage: python backfill_alerts.py LOG [LOG ...] [--db PATH] [--source NAME] [--batch-size N]
+"""
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+from utils.alert_parser import parse_alert
+from utils.alert_rows import (
+    INSERT_INSIGHT_SQL, INSERT_NOTIFICATION_SQL, INSERT_TRADE_SQL, insight_row, notification_row, trade_row
+)
+from utils.classifier import classify_many
+from utils.dedup import Deduplicator, stored_hashes
+from utils.migrations import ensure_schema
+from utils.pool import get_pool
+
+TIMESTAMP_FORMATS = ("%B %d, %Y at %I:%M%p", "%Y-%m-%d %H:%M:%S")
+LINE_RE = re.compile(r"^(.*?)\s*\[\s*([^\[\]]+?)\s*\]\s*$")
+
+# Tables whose non-unique indexes are dropped for the load and rebuilt after
+LOADED_TABLES = ("notifications", "insights", "trades")
+
+
+# Log timestamps have minute resolution, so consecutive lines mostly share
+# one and strptime (the slowest step per line) is worth caching
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(stamp):
+    """Return (epoch seconds, 'YYYY-MM-DD HH:MM:SS') for a log timestamp, or None"""
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            when = datetime.strptime(stamp, fmt)
+        except ValueError:
+            continue
+        return when.timestamp(), when.strftime("%Y-%m-%d %H:%M:%S")
+    return None
+
+
+def parse_line(line):
+    """Split a log line into (text, epoch, timestamp), or None if it has no usable timestamp"""
+    match = LINE_RE.match(line)
+    if match is None:
+        return None
+    text, stamp = match.groups()
+    text = text.strip()
+    parsed = parse_timestamp(stamp)
+    if not text or parsed is None:
+        return None
+    return (text,) + parsed
+
+
+class Checkpoint:
+    """Byte offset reached in one log file, plus any indexes dropped for the load.
+
+    Stored as JSON next to the log and replaced atomically after every
+    committed batch, so it never runs ahead of the database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.dropped_indexes = []
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.offset = state.get("offset", 0)
+            self.dropped_indexes = state.get("dropped_indexes", [])
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"offset": self.offset, "dropped_indexes": self.dropped_indexes}, f)
+        os.replace(tmp, self.path)
+
+
+def drop_secondary_indexes(conn, checkpoint):
+    """Drop non-unique indexes on the loaded tables and remember how to rebuild them.
+
+    Unique indexes stay: notifications.content_hash is what makes a resumed
+    load idempotent.
+    """
+    rows = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        f"AND tbl_name IN ({', '.join('?' * len(LOADED_TABLES))})", LOADED_TABLES
+    ).fetchall()
+    for name, sql in rows:
+        if sql.upper().startswith("CREATE UNIQUE"):
+            continue
+        checkpoint.dropped_indexes.append([name, sql])
+        checkpoint.save()
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+
+
+def rebuild_indexes(conn, checkpoint):
+    """Recreate the indexes dropped for the load (those not already rebuilt)"""
+    for name, sql in checkpoint.dropped_indexes:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone():
+            continue
+        started = time.perf_counter()
+        conn.execute(sql)
+        print(f"Rebuilt index {name} in {time.perf_counter() - started:.1f}s")
+    conn.commit()
+    conn.execute("PRAGMA optimize")
+    checkpoint.dropped_indexes = []
+    checkpoint.save()
+
+
+def load_batch(conn, batch, source, deduplicator):
+    """Classify and insert one batch of parse_line() results; returns rows inserted per table"""
+    alerts = []
+    seen = set()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if deduplicator.enabled:
+            hashes = [deduplicator.hashes(text, source, epoch) for text, epoch, _ in batch]
+            persisted = stored_hashes(conn, (digest for pair in hashes for digest in pair))
+        else:
+            # Nothing is deduplicated and content_hash stays NULL, as at ingest
+            hashes = [None] * len(batch)
+            persisted = set()
+        for (text, _, timestamp), pair in zip(batch, hashes):
+            if pair is None:
+                alerts.append((text, timestamp, None))
+                continue
+            # Repeats inside the dedup window are dropped, as they would be at ingest
+            if any(digest in persisted or digest in seen for digest in pair):
+                continue
+            seen.add(pair[0])
+            alerts.append((text, timestamp, pair[0]))
+
+        insights = classify_many((text, source, timestamp) for text, timestamp, _ in alerts)
+        conn.executemany(INSERT_NOTIFICATION_SQL, [
+            notification_row(
+                source, text, timestamp, json.dumps({"text": text, "source": source, "timestamp": timestamp}), digest
+            ) for text, timestamp, digest in alerts
+        ])
+        conn.executemany(INSERT_INSIGHT_SQL, [insight_row(insight) for insight in insights])
+
+        trades = []
+        for text, timestamp, _ in alerts:
+            alert = parse_alert(text)
+            if alert is not None:
+                trades.append(trade_row(alert, source, timestamp))
+        conn.executemany(INSERT_TRADE_SQL, trades)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(alerts), len(trades)
+
+
+def backfill(path, conn, source="Discord", batch_size=50000, keep_indexes=False, deduplicator=None):
+    """Stream one log file into the database, resuming from its checkpoint; returns counters"""
+    deduplicator = deduplicator or Deduplicator(window_seconds=float(os.environ.get("DEDUP_WINDOW_SECONDS", 60)))
+    checkpoint = Checkpoint(f"{path}.checkpoint")
+    size = os.path.getsize(path)
+    stats = {"lines": 0, "skipped": 0, "duplicates": 0, "notifications": 0, "trades": 0}
+
+    if checkpoint.offset >= size and not checkpoint.dropped_indexes:
+        print(f"{path}: already loaded")
+        return stats
+    if not keep_indexes and not checkpoint.dropped_indexes:
+        drop_secondary_indexes(conn, checkpoint)
+
+    started = time.perf_counter()
+
+    def commit(batch, offset):
+        if batch:
+            notifications, trades = load_batch(conn, batch, source, deduplicator)
+            stats["notifications"] += notifications
+            stats["trades"] += trades
+            stats["duplicates"] += len(batch) - notifications
+        checkpoint.offset = offset
+        checkpoint.save()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{path}: {offset / size if size else 1:6.1%}  {stats['lines']} lines, "
+            f"{stats['notifications']} alerts, {stats['lines'] / elapsed if elapsed else 0:,.0f} lines/sec"
+        )
+
+    try:
+        with open(path, "rb") as f:
+            f.seek(checkpoint.offset)
+            offset = checkpoint.offset
+            batch = []
+            for raw in f:
+                offset += len(raw)
+                stats["lines"] += 1
+                parsed = parse_line(raw.decode("utf-8", errors="replace"))
+                if parsed is None:
+                    stats["skipped"] += 1
+                    continue
+                batch.append(parsed)
+                if len(batch) >= batch_size:
+                    commit(batch, offset)
+                    batch = []
+            commit(batch, offset)
+    finally:
+        # Also after a failed load: the live database must not be left without
+        # its indexes until someone reruns the tool. The checkpoint keeps the
+        # offset, so a rerun still resumes where this one stopped.
+        rebuild_indexes(conn, checkpoint)
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 2)
+    stats["rows_per_sec"] = round((stats["notifications"] * 2 + stats["trades"]) / elapsed) if elapsed else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("logs", nargs="+", help="log files to load")
+    parser.add_argument("--db", default=os.environ.get("DATABASE_URL", "/tmp/tradesync.db"))
+    parser.add_argument("--source", default="Discord", help="source recorded on every row")
+    parser.add_argument("--batch-size", type=int, default=50000, help="lines per transaction")
+    parser.add_argument("--keep-indexes", action="store_true", help="load without dropping secondary indexes")
+    args = parser.parse_args()
+
+    pool = get_pool(args.db)
+    ensure_schema(pool.connection, args.db)
+    deduplicator = Deduplicator(window_seconds=float(os.environ.get("DEDUP_WINDOW_SECONDS", 60)))
+    with pool.connection() as conn:
+        for path in args.logs:
+            stats = backfill(path, conn, args.source, args.batch_size, args.keep_indexes, deduplicator)
+            print(f"{path}: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
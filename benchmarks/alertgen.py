@@ -0,0 +1,171 @@
+"""Generate synthetic Discord alerts in the discord_trades.log grammar.
+
+Lines look like the real log: options entries and exits (BOUGHT / SOLD 1/2 /
+ALL OUT) that refer to positions opened earlier in the stream, plain stock
+calls and ticker chatter for the classifier, each followed by a Discord
+timestamp. Output is fully determined by the seed, so two runs (or two
+commits) see the same data. build_database() loads a generated log through
+backfill_alerts into a database reused across benchmark runs.
+
+Usage: python benchmarks/alertgen.py --lines N [--out PATH] [--seed S]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Underlying and a typical strike, used to draw realistic contracts
+UNDERLYINGS = {
+    "NDX": 20700, "SPX": 5700, "SPY": 570, "QQQ": 490, "TSLA": 250, "NVDA": 120,
+    "AAPL": 225, "AMD": 160, "META": 590, "LRCX": 80, "TSM": 190, "COIN": 230,
+}
+CHATTER = (
+    "${ticker} breakout above {level}, watching for follow through",
+    "short ${ticker} under {level}",
+    "${ticker} looking heavy today, {level} is the line",
+    "buy the dip on ${ticker} if it holds {level}",
+    "what a day, ${ticker} closed near {level}, great job everyone",
+    "a red close under {level} means we wait for tomorrow",
+    "heading out, will post {ticker} entries in the morning",
+)
+# Relative frequency of each kind of line
+KINDS = (("bought", 35), ("sold", 20), ("all_out", 10), ("stock", 5), ("chatter", 30))
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "tradesync-bench")
+
+
+class AlertGenerator:
+    """Reproducible stream of alert texts and timestamps"""
+
+    def __init__(self, seed=1, start=datetime(2025, 3, 11, 9, 30), mean_gap_seconds=20.0):
+        self.random = random.Random(seed)
+        self.now = start
+        self.mean_gap_seconds = mean_gap_seconds
+        self.open = []  # contracts bought and not yet closed
+        kinds, weights = zip(*KINDS)
+        self._kinds = kinds
+        self._cumulative = [sum(weights[:i + 1]) for i in range(len(weights))]
+
+    def _contract(self):
+        rng = self.random
+        underlying = rng.choice(list(UNDERLYINGS))
+        base = UNDERLYINGS[underlying]
+        step = 5 if base < 1000 else 50
+        strike = round(base * rng.uniform(0.9, 1.1) / step) * step
+        expiry = self.now + timedelta(days=rng.choice((0, 1, 2, 3, 7, 14, 30)))
+        return underlying, strike, rng.choice("CCCP"), f"{expiry.month}/{expiry.day}"
+
+    def _price(self):
+        return f"{self.random.lognormvariate(0.5, 0.9):.2f}".rstrip("0").rstrip(".")
+
+    def text(self):
+        """The next alert text, without timestamp"""
+        rng = self.random
+        kind = rng.choices(self._kinds, cum_weights=self._cumulative)[0]
+        if kind in ("sold", "all_out") and not self.open:
+            kind = "bought"
+
+        if kind == "bought":
+            contract = self._contract()
+            self.open.append(contract)
+            if len(self.open) > 50:
+                self.open.pop(0)
+            underlying, strike, right, expiry = contract
+            return f"BOUGHT {underlying} {strike}{right} {expiry} {self._price()} - {rng.randint(1, 20)} cont"
+        if kind == "sold":
+            underlying, strike, right, expiry = rng.choice(self.open)
+            return (
+                f"SOLD 1/{rng.choice((2, 3, 4))} {underlying} {strike}{right} {expiry} {self._price()} "
+                f"{rng.randint(-60, 200)}% {rng.randint(1, 50)} contracts left. @everyone"
+            )
+        if kind == "all_out":
+            underlying, strike, right, expiry = self.open.pop(rng.randrange(len(self.open)))
+            return f"ALL OUT {underlying} {strike}{right} {expiry} {self._price()} @everyone"
+        if kind == "stock":
+            return f"BUY {rng.randint(1, 100)} {rng.choice(list(UNDERLYINGS))} {rng.choice(('CALLS', 'PUTS', 'SHARES'))}"
+        ticker = rng.choice(list(UNDERLYINGS))
+        return rng.choice(CHATTER).format(ticker=ticker, level=round(UNDERLYINGS[ticker] * rng.uniform(0.95, 1.05)))
+
+    def advance(self):
+        """Move the clock forward by a random gap and return the new time"""
+        self.now += timedelta(seconds=self.random.expovariate(1 / self.mean_gap_seconds))
+        return self.now
+
+    def lines(self, count):
+        """Yield ``count`` log lines: `` <text> [ March 11, 2025 at 09:14PM]``"""
+        for _ in range(count):
+            when = self.advance()
+            yield f" {self.text()} [ {when.strftime('%B %d, %Y at %I:%M%p')}]"
+
+    def payloads(self, count, source="Discord"):
+        """Yield ``count`` /webhook payloads"""
+        for _ in range(count):
+            when = self.advance()
+            yield {"text": self.text(), "source": source, "timestamp": when.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def write_log(path, count, seed=1):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in AlertGenerator(seed).lines(count):
+            f.write(line + "\n")
+
+
+def build_database(rows, seed=1, data_dir=DEFAULT_DATA_DIR):
+    """Path of a database holding ``rows`` generated alerts, built on first use.
+
+    A database is only reused once its load finished (marked by a ``.done``
+    file), so an interrupted build starts over.
+    """
+    from backfill_alerts import backfill
+    from utils.dedup import Deduplicator
+    from utils.migrations import ensure_schema
+    from utils.pool import get_pool
+
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"alerts-{rows}-seed{seed}.db")
+    if os.path.exists(f"{path}.done"):
+        return path
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    log_path = f"{path}.log"
+    write_log(log_path, rows, seed)
+    try:
+        pool = get_pool(path)
+        ensure_schema(pool.connection, path)
+        with pool.connection() as conn:
+            # Timestamps have minute resolution, so only repeats within the same minute are dropped
+            backfill(log_path, conn, batch_size=50000, deduplicator=Deduplicator(window_seconds=1))
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        pool.close()
+    finally:
+        for leftover in (log_path, f"{log_path}.checkpoint"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    open(f"{path}.done", "w").close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--out", help="log file to write (default: stdout)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.out:
+        write_log(args.out, args.lines, args.seed)
+    else:
+        for line in AlertGenerator(args.seed).lines(args.lines):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
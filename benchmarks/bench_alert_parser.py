@@ -0,0 +1,49 @@
+"""Replay discord_trades.log through the alert parser and report lines/sec.
+
+Usage: python benchmarks/bench_alert_parser.py [--log PATH] [--lines N] [--min-rate R]
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.alert_parser import parse_alert
+
+
+def run(lines, repeat=5):
+    """Return the best lines/sec over ``repeat`` passes and the match count"""
+    best = 0.0
+    matched = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        matched = sum(1 for line in lines if parse_alert(line) is not None)
+        elapsed = time.perf_counter() - started
+        best = max(best, len(lines) / elapsed)
+    return best, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", default=os.path.join(ROOT, "discord_trades.log"))
+    parser.add_argument("--lines", type=int, default=200000, help="lines to replay (log is cycled)")
+    parser.add_argument("--min-rate", type=float, default=100000, help="fail below this many lines/sec")
+    args = parser.parse_args()
+
+    with open(args.log, encoding="utf-8") as f:
+        source = f.read().splitlines()
+    lines = list(itertools.islice(itertools.cycle(source), args.lines))
+
+    rate, matched = run(lines)
+    print(f"parsed {len(lines)} lines ({matched} alerts) at {rate:,.0f} lines/sec")
+    if rate < args.min_rate:
+        print(f"FAIL: below {args.min_rate:,.0f} lines/sec")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
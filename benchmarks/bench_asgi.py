@@ -0,0 +1,257 @@
+"""Compare the ASGI entry point (backend/asgi.py) with the Flask app under load.
+
+Both apps are driven in-process against the same generated database, so the
+numbers compare the request handling models rather than a network stack:
+
+* requests: /webhook posts and uncached /api/insights pages at --concurrency,
+  as asyncio tasks for ASGI and as threads with test clients for Flask;
+* streams: --streams open /api/insights/stream subscribers, then --events
+  webhooks; reports how long until every subscriber received every event,
+  and how many threads the process needed to hold the connections.
+
+Usage: python benchmarks/bench_asgi.py [--rows N] [--concurrency 64] [--requests N] [--streams 1000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alertgen import DEFAULT_DATA_DIR, AlertGenerator, build_database
+from suite import load_test, percentile, restore_tables, table_marks
+
+
+async def asgi_request(application, method, url, payload=None):
+    """Run one request through ``application``; returns (status, body)"""
+    parts = urlsplit(url)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+        "method": method, "path": parts.path, "query_string": parts.query.encode(),
+        "headers": [(b"content-type", b"application/json")] if payload is not None else [],
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = []
+    chunks = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        else:
+            chunks.append(message.get("body", b""))
+
+    await application(scope, receive, send)
+    return status[0], b"".join(chunks)
+
+
+async def asgi_load_test(application, method, urls, payloads, concurrency):
+    """ASGI counterpart of suite.load_test: ``concurrency`` tasks share the requests"""
+    latencies = []
+    errors = 0
+    pending = iter(range(len(urls)))
+
+    async def worker():
+        nonlocal errors
+        for index in pending:
+            started = time.perf_counter()
+            status, _ = await asgi_request(application, method, urls[index], payloads[index] if payloads else None)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(urls),
+        "concurrency": concurrency,
+        "ops_per_sec": round(len(urls) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "errors": errors,
+    }
+
+
+async def asgi_streams(application, streams, post):
+    """Open ``streams`` SSE subscribers, call post() and time delivery of its events"""
+    tracker = StreamTracker(streams)
+
+    async def subscriber(index):
+        disconnect = asyncio.Event()
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if tracker.record(index, message.get("body", b"")):
+                disconnect.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+            "method": "GET", "path": "/api/insights/stream", "query_string": b"", "headers": [],
+        }
+        await application(scope, receive, send)
+
+    tasks = [asyncio.ensure_future(subscriber(index)) for index in range(streams)]
+    await wait_for_subscribers(streams)
+    threads = threading.active_count()
+    tracker.start()
+    tracker.target = await asyncio.get_running_loop().run_in_executor(None, post)
+    await asyncio.get_running_loop().run_in_executor(None, post.wake)
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=120)
+    return tracker.result(threads)
+
+
+def flask_streams(app, streams, post):
+    """Flask counterpart of asgi_streams: one thread per open stream"""
+    tracker = StreamTracker(streams)
+
+    def subscriber(index):
+        response = app.test_client().get("/api/insights/stream", buffered=False)
+        for chunk in response.response:
+            if tracker.record(index, chunk):
+                break
+        response.close()
+
+    threads = [threading.Thread(target=subscriber, args=(index,), daemon=True) for index in range(streams)]
+    for thread in threads:
+        thread.start()
+    asyncio.run(wait_for_subscribers(streams))
+    active = threading.active_count()
+    tracker.start()
+    tracker.target = post()
+    # Threads blocked waiting for an event only notice the target on the next one
+    post.wake()
+    for thread in threads:
+        thread.join(timeout=120)
+    return tracker.result(active)
+
+
+async def wait_for_subscribers(count):
+    from app import insight_hub
+    while insight_hub.subscriber_count < count:
+        await asyncio.sleep(0.01)
+
+
+class StreamTracker:
+    """When each subscriber received the last event posted (the ``target`` id)"""
+
+    def __init__(self, streams):
+        self.target = None
+        self.started = None
+        self.arrived = [None] * streams
+        self.seen = [0] * streams
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def record(self, index, chunk):
+        """Note one SSE chunk; True once the subscriber has everything up to the target"""
+        if chunk.startswith(b"id: "):
+            event_id = int(chunk[4:chunk.index(b"\n")])
+            if self.target is None or event_id <= self.target:
+                self.arrived[index] = time.perf_counter()
+                self.seen[index] = event_id
+            if self.target is not None and event_id >= self.target:
+                return True
+        return False
+
+    def result(self, threads):
+        delays = [
+            arrived - self.started for arrived, seen in zip(self.arrived, self.seen) if seen >= self.target
+        ]
+        return {
+            "delivered": len(delays),
+            "p50_ms": round(percentile(delays, 0.5) * 1000, 1) if delays else None,
+            "last_ms": round(max(delays) * 1000, 1) if delays else None,
+            "threads": threads,
+        }
+
+
+class Poster:
+    """Posts ``count`` generated alerts through the Flask test client and
+    returns the id of the last insight stored"""
+
+    def __init__(self, app, count, seed):
+        self.client = app.test_client()
+        self.payloads = list(AlertGenerator(seed).payloads(count))
+
+    def __call__(self):
+        from app import latest_insight_id
+        for payload in self.payloads:
+            self.client.post("/webhook", json=payload)
+        return latest_insight_id()
+
+    def wake(self):
+        self.client.post("/webhook", json={"text": f"benchmark wake-up {time.time_ns()}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="rows in the generated database")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--streams", type=int, default=1000, help="concurrent SSE subscribers")
+    parser.add_argument("--events", type=int, default=20, help="alerts posted to the open streams")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = build_database(args.rows, args.seed, args.data_dir)
+    # Streams are woken by the tailer after each commit; keep idle polling out of the way
+    os.environ.setdefault("SSE_HEARTBEAT_SECONDS", "60")
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    import asgi
+    import app as flask_app
+    logging.getLogger().setLevel(logging.WARNING)
+    flask_app.logger.setLevel(logging.WARNING)
+
+    marks = table_marks(flask_app)
+    rng = random.Random(args.seed)
+    pages = [f"/api/insights?limit=50&before_id={rng.randint(1, marks['insights'] + 1)}" for _ in range(args.requests)]
+    # Each app posts different alerts, so the second is not answered from dedup
+    flask_payloads = list(AlertGenerator(args.seed + 1).payloads(args.requests))
+    asgi_payloads = list(AlertGenerator(args.seed + 2).payloads(args.requests))
+
+    app = flask_app.app
+    application = asgi.application
+    results = {
+        "flask/webhook": load_test(
+            app, lambda client, i: client.post("/webhook", json=flask_payloads[i]), args.requests, args.concurrency
+        ),
+        "flask/insights_paged": load_test(app, lambda client, i: client.get(pages[i]), args.requests, args.concurrency),
+        "flask/streams": flask_streams(app, args.streams, Poster(app, args.events, args.seed + 101)),
+        "asgi/webhook": asyncio.run(
+            asgi_load_test(application, "POST", ["/webhook"] * args.requests, asgi_payloads, args.concurrency)
+        ),
+        "asgi/insights_paged": asyncio.run(asgi_load_test(application, "GET", pages, None, args.concurrency)),
+        "asgi/streams": asyncio.run(asgi_streams(application, args.streams, Poster(app, args.events, args.seed + 102))),
+    }
+    restore_tables(flask_app, marks)
+
+    print(f"{args.rows} rows, concurrency {args.concurrency}, {args.streams} streams x {args.events} events")
+    for name, result in results.items():
+        print(f"{name:<22} " + "  ".join(f"{key}={value}" for key, value in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Compare memory and time of insight row representations for a large result set.
+
+Builds N synthetic insight rows as per-row dicts (what insight_to_dict returns),
+plain __dict__ objects (the old Trade style), slotted Insight records and a
+column-wise RecordBatch, then reports build time, retained memory and JSON
+encode time for each.
+
+Usage: python benchmarks/bench_records.py [--rows N]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.batch import RecordBatch
+from models.insight import Insight
+
+
+class PlainInsight:
+    """Baseline: an Insight without __slots__"""
+
+    def __init__(self, *values):
+        for name, value in zip(Insight.COLUMNS, values):
+            setattr(self, name, value)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in Insight.COLUMNS}
+
+
+def generate_rows(count, seed=1):
+    rng = random.Random(seed)
+    tickers = [f"${name}" for name in ("SPY", "QQQ", "NDX", "TSLA", "NVDA", "AAPL", "LRCX", "TSM")]
+    categories = ("Actionable Trade", "AI Insight", "General Insight")
+    return [
+        (
+            row_id, rng.choice(tickers), rng.choice(categories), "", rng.choice(("Bullish", "Bearish", "")),
+            "Trade suggestion.", rng.choice((10.0, 30.0, 60.0, 80.0, 85.0)), "Discord",
+            f"2025-03-{1 + row_id % 28:02d} 21:{row_id % 60:02d}:00", row_id % 2
+        )
+        for row_id in range(1, count + 1)
+    ]
+
+
+REPRESENTATIONS = {
+    "dicts": (
+        lambda rows: [dict(zip(Insight.COLUMNS, row)) for row in rows],
+        lambda built: json.dumps(built)
+    ),
+    "plain objects": (
+        lambda rows: [PlainInsight(*row) for row in rows],
+        lambda built: json.dumps([record.to_dict() for record in built])
+    ),
+    "slotted records": (
+        lambda rows: [Insight(*row) for row in rows],
+        lambda built: json.dumps([record.to_dict() for record in built])
+    ),
+    "record batch": (
+        lambda rows: RecordBatch.from_rows(rows, Insight.COLUMNS, Insight.COLUMN_TYPES),
+        lambda built: built.to_json()
+    ),
+}
+
+
+def measure(build, encode, rows):
+    """Return (build seconds, retained bytes, encode seconds) for one representation"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    built = build(rows)
+    build_seconds = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    encode(built)
+    encode_seconds = time.perf_counter() - started
+    del built
+    return build_seconds, retained, encode_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.rows)
+    print(f"{args.rows} insight rows")
+    print(f"{'representation':<16} {'build s':>8} {'memory MB':>10} {'bytes/row':>10} {'json s':>8}")
+    for name, (build, encode) in REPRESENTATIONS.items():
+        build_seconds, retained, encode_seconds = measure(build, encode, rows)
+        print(
+            f"{name:<16} {build_seconds:>8.2f} {retained / 1e6:>10.1f} "
+            f"{retained / args.rows:>10.0f} {encode_seconds:>8.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
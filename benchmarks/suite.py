@@ -0,0 +1,344 @@
+"""Benchmark the ingest, classify and read paths and compare runs between commits.
+
+``run`` builds (or reuses) generated databases of each --sizes row count, then
+for each one starts a fresh process that imports backend/app.py against it and
+drives /webhook and /api/insights through the Flask test client at each
+--concurrency level. Microbenchmarks (parse_alert, classify, call_grok_api,
+Trade.from_discord_message, get_db_connection) run once, in the first process.
+Results are written as JSON; ``compare`` (or ``run --baseline``) checks them
+against an earlier file and exits 1 when anything regressed by more than
+--threshold.
+
+Load tests run in one process, so concurrency here measures contention on the
+GIL and the SQLite write lock rather than multi-worker throughput. Rows written
+by /webhook are deleted again afterwards, so every level sees the same table.
+
+Usage:
+  python benchmarks/suite.py run [--sizes 10000,100000] [--concurrency 1,4,16] [--output FILE] [--baseline FILE]
+  python benchmarks/suite.py compare BASELINE CURRENT [--threshold 0.1]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alertgen import DEFAULT_DATA_DIR, AlertGenerator, build_database
+
+# Metrics compared between runs and whether a higher value is better
+COMPARED = {"ops_per_sec": True, "p95_ms": False}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def time_calls(function, inputs, repeat=5):
+    """Best calls/sec over ``repeat`` passes of ``function`` over ``inputs``"""
+    best = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in inputs:
+            function(item)
+        best = max(best, len(inputs) / (time.perf_counter() - started))
+    return {"ops_per_sec": round(best, 1)}
+
+
+def load_test(app, send, requests, concurrency):
+    """Issue ``requests`` calls of send(client, i) from ``concurrency`` threads.
+
+    Each thread has its own test client. Returns throughput, latency
+    percentiles and the number of responses with a 4xx/5xx status.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        client = app.test_client()
+        local = []
+        failed = 0
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            started = time.perf_counter()
+            response = send(client, index)
+            local.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ops_per_sec": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "errors": errors[0],
+    }
+
+
+def micro_benchmarks(backend, seed, count):
+    from models.trade import Trade
+    from utils.alert_parser import parse_alert
+    from utils.classifier import classify, classify_many
+
+    generator = AlertGenerator(seed)
+    texts = [generator.text() for _ in range(count)]
+    batches = [[(text, "Discord", "2025-03-11 21:14:00") for text in texts[i:i + 1000]] for i in range(0, count, 1000)]
+
+    def query(_):
+        with backend.get_db_connection() as conn:
+            conn.execute("SELECT 1").fetchone()
+
+    results = {
+        "parse_alert": time_calls(parse_alert, texts),
+        "classify": time_calls(lambda text: classify(text, "Discord", "2025-03-11 21:14:00"), texts),
+        "call_grok_api": time_calls(lambda text: backend.call_grok_api(text, "Discord", "2025-03-11 21:14:00"), texts),
+        "Trade.from_discord_message": time_calls(Trade.from_discord_message, texts),
+        "get_db_connection": time_calls(query, range(count)),
+    }
+    # Reported per message, like the single-message classify above
+    batched = time_calls(classify_many, batches)
+    results["classify_many"] = {"ops_per_sec": round(batched["ops_per_sec"] * count / len(batches), 1)}
+    return {f"micro/{name}": result for name, result in results.items()}
+
+
+def table_marks(backend):
+    """The highest id in each table /webhook writes to"""
+    with backend.get_db_connection() as conn:
+        return {
+            table: conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            for table in ("notifications", "insights", "trades")
+        }
+
+
+def restore_tables(backend, marks):
+    """Delete rows written since table_marks(), returning the notifications removed"""
+    with backend.get_db_connection() as conn:
+        removed = conn.execute("DELETE FROM notifications WHERE id > ?", (marks["notifications"],)).rowcount
+        for table in ("insights", "trades"):
+            conn.execute(f"DELETE FROM {table} WHERE id > ?", (marks[table],))
+        conn.commit()
+    return removed
+
+
+def load_benchmarks(backend, rows, seed, concurrency_levels, requests):
+    results = {}
+    before = table_marks(backend)
+    tickers = ["$" + ticker for ticker in ("SPY", "QQQ", "NVDA", "TSLA", "AMD")]
+
+    for concurrency in concurrency_levels:
+        # Different alerts per level, so dedup does not reject them as repeats
+        payloads = list(AlertGenerator(seed + concurrency).payloads(requests))
+        result = load_test(backend.app, lambda client, i: client.post("/webhook", json=payloads[i]),
+                           requests, concurrency)
+        # Put the tables back to their generated size for the next level
+        result["stored"] = restore_tables(backend, before)
+        results[f"webhook/rows={rows}/c={concurrency}"] = result
+
+        # Latest page: mostly served from the response cache
+        results[f"insights_latest/rows={rows}/c={concurrency}"] = load_test(
+            backend.app, lambda client, i: client.get("/api/insights?limit=50"), requests, concurrency
+        )
+
+        # Random pages and ticker filters: each request reaches SQLite
+        rng = random.Random(seed)
+        queries = [
+            f"/api/insights?limit=50&before_id={rng.randint(1, before['insights'] + 1)}"
+            + (f"&ticker={rng.choice(tickers)}" if i % 2 else "")
+            for i in range(requests)
+        ]
+        results[f"insights_paged/rows={rows}/c={concurrency}"] = load_test(
+            backend.app, lambda client, i: client.get(queries[i]), requests, concurrency
+        )
+    return results
+
+
+def worker_main(args):
+    """Run the benchmarks for one database in this process and write them to --output"""
+    os.environ["DATABASE_URL"] = args.db
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    import app as backend
+    # utils.db configures the "app" logger, which backend/app.py logs to when
+    # imported as "app"; load it first so the level below sticks
+    import utils.db  # noqa: F401
+    # Keep per-request log lines off the console; WARNING and above still show
+    logging.getLogger().setLevel(logging.WARNING)
+    backend.logger.setLevel(logging.WARNING)
+
+    results = {}
+    if args.micro:
+        results.update(micro_benchmarks(backend, args.seed, args.micro))
+    results.update(load_benchmarks(backend, args.rows, args.seed, args.concurrency, args.requests))
+    with open(args.output, "w") as f:
+        json.dump(results, f)
+    return 0
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_main(args):
+    results = {}
+    for index, rows in enumerate(args.sizes):
+        print(f"preparing {rows} rows", flush=True)
+        db = build_database(rows, args.seed, args.data_dir)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            output = f.name
+        command = [
+            sys.executable, os.path.abspath(__file__), "worker", "--db", db, "--rows", str(rows),
+            "--seed", str(args.seed), "--requests", str(args.requests), "--output", output,
+            "--concurrency", ",".join(map(str, args.concurrency)),
+        ]
+        if index == 0 and args.micro:
+            command += ["--micro", str(args.micro)]
+        print(f"benchmarking {rows} rows", flush=True)
+        try:
+            subprocess.run(command, check=True)
+            with open(output) as f:
+                results.update(json.load(f))
+        finally:
+            os.remove(output)
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "sizes": args.sizes,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    print_results(results)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            return compare(json.load(f), report, args.threshold)
+    return 0
+
+
+def print_results(results):
+    print(f"{'benchmark':<44} {'ops/sec':>12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        latencies = "".join(
+            f" {result[key]:>9.2f}" if key in result else f" {'':>9}" for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        print(f"{name:<44} {result['ops_per_sec']:>12,.1f}{latencies}")
+
+
+def compare(baseline, current, threshold):
+    """Print the change of every shared benchmark; return 1 if any regressed beyond ``threshold``"""
+    regressions = []
+    print(f"baseline {baseline['meta'].get('revision')}  current {current['meta'].get('revision')}")
+    print(f"{'benchmark':<44} {'metric':<12} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            if metric not in result or not previous.get(metric):
+                continue
+            change = result[metric] / previous[metric] - 1
+            regressed = -change > threshold if higher_is_better else change > threshold
+            if regressed:
+                regressions.append((name, metric))
+            print(
+                f"{name:<44} {metric:<12} {previous[metric]:>12,.2f} {result[metric]:>12,.2f} "
+                f"{change:>+8.1%}{'  REGRESSION' if regressed else ''}"
+            )
+    if regressions:
+        print(f"FAIL: {len(regressions)} regression(s) beyond {threshold:.0%}")
+        return 1
+    print(f"OK: no regression beyond {threshold:.0%}")
+    return 0
+
+
+def compare_main(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return compare(baseline, current, args.threshold)
+
+
+def int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the suite and write JSON results")
+    run.add_argument("--sizes", type=int_list, default=[10000, 100000],
+                     help="comma-separated table sizes in rows (10000 to 10000000)")
+    run.add_argument("--concurrency", type=int_list, default=[1, 4, 16], help="comma-separated thread counts")
+    run.add_argument("--requests", type=int, default=2000, help="requests per load test")
+    run.add_argument("--micro", type=int, default=20000, help="messages per microbenchmark (0 skips them)")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated databases are kept")
+    run.add_argument("--output", default="benchmark-results.json")
+    run.add_argument("--baseline", help="results file to compare against")
+    run.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+
+    worker = commands.add_parser("worker", help=argparse.SUPPRESS)
+    worker.add_argument("--db", required=True)
+    worker.add_argument("--rows", type=int, required=True)
+    worker.add_argument("--seed", type=int, default=1)
+    worker.add_argument("--requests", type=int, default=2000)
+    worker.add_argument("--concurrency", type=int_list, default=[1])
+    worker.add_argument("--micro", type=int, default=0)
+    worker.add_argument("--output", required=True)
+
+    args = parser.parse_args()
+    return {"run": run_main, "compare": compare_main, "worker": worker_main}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,323 @@
-import pyautogui
-import time
+import argparse
+import collections
+import concurrent.futures
+import functools
+import glob
+import json
 import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Coordinates of Discord notification area (adjust these after testing)
-NOTIFICATION_X = 50  # Top-left corner of notification
-NOTIFICATION_Y = 50
-NOTIFICATION_WIDTH = 300
-NOTIFICATION_HEIGHT = 100
-
-def capture_notification():
-    while True:
-        # Take a screenshot of the notification area
-        screenshot = pyautogui.screenshot(region=(NOTIFICATION_X, NOTIFICATION_Y, NOTIFICATION_WIDTH, NOTIFICATION_HEIGHT))
-        # Use OCR to extract text (requires tesseract installed: brew install tesseract on macOS)
-        text = pyautogui.screenshot_to_text(screenshot)
-        
-        if text and "Trade Alert" in text:  # Adjust this keyword based on your notification format
-            print(f"Captured: {text}")
-            with open('discord_trades.log', 'a') as f:
-                f.write(f"{text} [{time.strftime('%Y-%m-%d %H:%M:%S')}]\n")
-        
-        time.sleep(5)  # Check every 5 seconds
+NOTIFICATION_X = int(os.environ.get('NOTIFICATION_X', 50))  # Top-left corner of notification
+NOTIFICATION_Y = int(os.environ.get('NOTIFICATION_Y', 50))
+NOTIFICATION_WIDTH = int(os.environ.get('NOTIFICATION_WIDTH', 300))
+NOTIFICATION_HEIGHT = int(os.environ.get('NOTIFICATION_HEIGHT', 100))
+
+# Diffing the region is cheap, so poll often and only OCR when it changes
+POLL_HZ = float(os.environ.get('SCRAPER_POLL_HZ', 10))
+HASH_SIZE = int(os.environ.get('SCRAPER_HASH_SIZE', 16))
+# Differing hash bits (out of HASH_SIZE * HASH_SIZE) below which the region counts as unchanged
+CHANGE_THRESHOLD = int(os.environ.get('SCRAPER_CHANGE_THRESHOLD', 6))
+
+# OCR runs in a process pool fed by a bounded queue of changed frames
+OCR_WORKERS = int(os.environ.get('SCRAPER_OCR_WORKERS', 2))
+OCR_QUEUE_SIZE = int(os.environ.get('SCRAPER_QUEUE_SIZE', 32))
+METRICS_SECONDS = float(os.environ.get('SCRAPER_METRICS_SECONDS', 60))
+# Identical text seen again within this many seconds is the same notification redrawing
+REDRAW_SECONDS = float(os.environ.get('SCRAPER_REDRAW_SECONDS', 5))
+
+ALERT_KEYWORD = os.environ.get('ALERT_KEYWORD', 'Trade Alert')  # Adjust this keyword based on your notification format
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL', 'http://localhost:5001/webhook')
+SCRAPER_SOURCE = os.environ.get('SCRAPER_SOURCE', 'Discord')
+# Alerts that could not be posted are kept here so they can be backfilled later
+FALLBACK_LOG = os.environ.get('SCRAPER_FALLBACK_LOG', 'discord_trades.log')
+
+
+class ScreenCapture:
+    """Grab the notification region from the live screen"""
+
+    def __init__(self, region=(NOTIFICATION_X, NOTIFICATION_Y, NOTIFICATION_WIDTH, NOTIFICATION_HEIGHT)):
+        # Imported here so headless runs against recorded frames don't need a display
+        import pyautogui
+        self.pyautogui = pyautogui
+        self.region = region
+
+    def grab(self):
+        return self.pyautogui.screenshot(region=self.region)
+
+
+class ImageSequenceCapture:
+    """Replay recorded frames (image files, in name order) as if they were the screen"""
+
+    def __init__(self, paths):
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(os.path.join(paths, '*.png')) + glob.glob(os.path.join(paths, '*.jpg')))
+        self.paths = list(paths)
+        self.position = 0
+
+    def grab(self):
+        # Returns None once every frame has been replayed
+        if self.position >= len(self.paths):
+            return None
+        from PIL import Image
+        path = self.paths[self.position]
+        self.position += 1
+        with Image.open(path) as image:
+            return image.copy()
+
+
+# Difference hash: one bit per horizontally adjacent pixel pair of a small
+# grayscale thumbnail. Robust to noise, but any new text changes many bits.
+def dhash(image, size=HASH_SIZE):
+    pixels = list(image.convert('L').resize((size + 1, size)).getdata())
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+# Use OCR to extract text (requires tesseract installed: brew install tesseract on macOS)
+def ocr_image(image):
+    import pytesseract
+    return pytesseract.image_to_string(image)
+
+# Send one alert to the backend; falls back to the log file if it can't be reached.
+# The alert is stamped with its capture time (epoch seconds) when given, so a
+# backlog behind OCR doesn't shift alerts to when they were finally posted.
+def post_alert(text, captured_at=None, url=WEBHOOK_URL, source=SCRAPER_SOURCE):
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(captured_at))
+    body = json.dumps({'text': text, 'source': source, 'timestamp': timestamp}).encode()
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return 200 <= response.status < 300
+    except (urllib.error.URLError, OSError) as e:
+        print(f"Failed to post alert ({e}); appending to {FALLBACK_LOG}")
+        with open(FALLBACK_LOG, 'a') as f:
+            f.write(f"{text} [{timestamp}]\n")
+        return False
+
+# Runs in an OCR worker process; returns the text and how long OCR took
+def timed_ocr(ocr, image):
+    started = time.perf_counter()
+    text = ocr(image)
+    return text, time.perf_counter() - started
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[round(pct / 100 * (len(ordered) - 1))]
+
+
+class OcrPipeline:
+    """Capture, OCR and emit alerts in separate stages.
+
+    A capture thread hashes every frame and enqueues the changed ones into a
+    bounded queue, dropping frames (and counting them) when OCR falls that
+    far behind. OCR runs in a process pool with at most ``workers * 2``
+    frames in flight. Results are put back into capture order before the
+    keyword check and post, so a fast OCR pass never overtakes a slow one.
+    """
+
+    def __init__(self, capture, ocr=ocr_image, post=post_alert, workers=OCR_WORKERS, queue_size=OCR_QUEUE_SIZE,
+                 poll_hz=POLL_HZ, threshold=CHANGE_THRESHOLD, keyword=ALERT_KEYWORD, executor=None,
+                 redraw_seconds=REDRAW_SECONDS):
+        self.capture = capture
+        self.ocr = ocr
+        self.post = post
+        self.workers = workers
+        self.poll_hz = poll_hz
+        self.threshold = threshold
+        self.keyword = keyword
+        self.executor = executor
+        self.redraw_seconds = redraw_seconds
+        self.frames = queue.Queue(maxsize=queue_size)
+        self._ready = queue.Queue()
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._outstanding = 0
+        self._results = {}
+        self._next_seq = 0
+        self._last_text = None
+        self._last_seen_at = None
+        self._ocr_seconds = collections.deque(maxlen=1000)
+        self._latency_seconds = collections.deque(maxlen=1000)
+        self._stats = {'frames': 0, 'changes': 0, 'dropped_frames': 0, 'ocr_errors': 0, 'alerts': 0,
+                       'max_queue_depth': 0}
+
+    def _capture_loop(self):
+        interval = 1 / self.poll_hz if self.poll_hz > 0 else 0
+        last_hash = None
+        seq = 0
+        deadline = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                image = self.capture.grab()
+                if image is None:
+                    break
+                digest = dhash(image)
+                with self._lock:
+                    self._stats['frames'] += 1
+
+                if last_hash is None or hamming(digest, last_hash) > self.threshold:
+                    try:
+                        self.frames.put_nowait((seq, time.time(), image))
+                        # Only a queued frame counts as seen: after a drop the next
+                        # frame of the same notification is still a change
+                        last_hash = digest
+                        seq += 1
+                        with self._lock:
+                            self._stats['changes'] += 1
+                            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self.frames.qsize())
+                    except queue.Full:
+                        with self._lock:
+                            self._stats['dropped_frames'] += 1
+
+                # Sleep to the next tick rather than a fixed delay so hashing time isn't added on top
+                deadline += interval
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    deadline = time.monotonic()
+        finally:
+            self.frames.put(None)
+
+    def _ocr_done(self, seq, captured_at, future):
+        self._slots.release()
+        try:
+            text, seconds = future.result()
+        except Exception as e:
+            print(f"OCR failed: {e}")
+            text, seconds = '', None
+        with self._lock:
+            if seconds is None:
+                self._stats['ocr_errors'] += 1
+            else:
+                self._ocr_seconds.append(seconds)
+            # Hand results on strictly in capture order
+            self._results[seq] = (captured_at, text)
+            while self._next_seq in self._results:
+                self._ready.put(self._results.pop(self._next_seq))
+                self._next_seq += 1
+
+    def _is_redraw(self, text, captured_at):
+        # The same notification can redraw (hover, fade) while it stays on screen;
+        # a repeat after redraw_seconds without it is a new alert with the same text
+        return (text == self._last_text and self._last_seen_at is not None
+                and captured_at - self._last_seen_at < self.redraw_seconds)
+
+    def _emit_loop(self):
+        while True:
+            result = self._ready.get()
+            if result is None:
+                return
+            captured_at, text = result
+            text = text.strip()
+            if not text:
+                # The notification is gone, so the same alert showing again is a new one
+                self._last_text = None
+            elif self.keyword in text and self._is_redraw(text, captured_at):
+                self._last_seen_at = captured_at
+            elif self.keyword in text:
+                self._last_text = text
+                self._last_seen_at = captured_at
+                print(f"Captured: {text}")
+                try:
+                    self.post(text, captured_at)
+                except Exception as e:
+                    print(f"Failed to post alert: {e}")
+                with self._lock:
+                    self._stats['alerts'] += 1
+                    self._latency_seconds.append(time.time() - captured_at)
+            with self._lock:
+                self._outstanding -= 1
+                self._idle.notify_all()
+
+    def run(self, metrics_interval=None):
+        """Run until the capture backend runs out of frames (live capture never
+        does) and return the final stats; prints stats every ``metrics_interval``
+        seconds when set."""
+        executor = self.executor or concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        capture_thread = threading.Thread(target=self._capture_loop, name='scraper-capture', daemon=True)
+        emit_thread = threading.Thread(target=self._emit_loop, name='scraper-emit', daemon=True)
+        capture_thread.start()
+        emit_thread.start()
+        next_report = time.monotonic() + metrics_interval if metrics_interval else None
+
+        try:
+            while True:
+                try:
+                    frame = self.frames.get(timeout=1)
+                except queue.Empty:
+                    frame = False
+                if next_report is not None and time.monotonic() >= next_report:
+                    print(f"Scraper metrics: {self.stats()}")
+                    next_report += metrics_interval
+                if frame is None:
+                    break
+                if frame is False:
+                    continue
+
+                seq, captured_at, image = frame
+                self._slots.acquire()
+                with self._lock:
+                    self._outstanding += 1
+                future = executor.submit(timed_ocr, self.ocr, image)
+                future.add_done_callback(functools.partial(self._ocr_done, seq, captured_at))
+
+            with self._idle:
+                self._idle.wait_for(lambda: self._outstanding == 0)
+        finally:
+            self._stop.set()
+            self._ready.put(None)
+            if self.executor is None:
+                executor.shutdown(cancel_futures=True)
+        emit_thread.join()
+        return self.stats()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            ocr_seconds = list(self._ocr_seconds)
+            latency_seconds = list(self._latency_seconds)
+        stats['queue_depth'] = self.frames.qsize()
+        for pct in (50, 95, 99):
+            value = percentile(ocr_seconds, pct)
+            stats[f'ocr_ms_p{pct}'] = round(value * 1000, 1) if value is not None else None
+        for pct in (50, 95):
+            value = percentile(latency_seconds, pct)
+            stats[f'alert_latency_ms_p{pct}'] = round(value * 1000, 1) if value is not None else None
+        return stats
+
+
+def capture_notification(capture=None, workers=OCR_WORKERS, metrics_interval=None, **kwargs):
+    """Watch the notification region and post each new alert; see OcrPipeline"""
+    return OcrPipeline(capture or ScreenCapture(), workers=workers, **kwargs).run(metrics_interval)
 
 if __name__ == '__main__':
-    print("Starting notification scraper... Position Discord to show notifications.")
-    time.sleep(5)  # Give you time to open Discord
-    capture_notification()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Scrape Discord trade alerts from desktop notifications')
+    parser.add_argument('--frames', help='Replay recorded frames from this directory instead of the screen')
+    parser.add_argument('--workers', type=int, default=OCR_WORKERS, help='OCR worker processes')
+    args = parser.parse_args()
+
+    if args.frames:
+        print(capture_notification(ImageSequenceCapture(args.frames), workers=args.workers, poll_hz=0))
+    else:
+        print("Starting notification scraper... Position Discord to show notifications.")
+        time.sleep(5)  # Give you time to open Discord
+        capture_notification(workers=args.workers, metrics_interval=METRICS_SECONDS)
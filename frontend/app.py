@@ -1,56 +1,35 @@
 from flask import Flask, request, jsonify
-import sqlite3
 import os
-import json
+import sys
 from datetime import datetime
 from flask_cors import CORS
 
+# Make the shared utils/ package importable when run from frontend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.classifier import classify
+from utils.migrations import ensure_schema
+from utils.pool import get_pool
+
 app = Flask(__name__)
 CORS(app)
 
+DB_PATH = os.environ.get('DB_PATH', '/tmp/tradesync.db')
+
+# Pooled connection helper: use as `with get_db_connection() as conn:`.
+# The pool is looked up per call so a worker forked after import gets its own.
+def get_db_connection():
+    return get_pool(DB_PATH).connection()
+
+# Create or upgrade the schema once at startup instead of on every request
+ensure_schema(get_db_connection, DB_PATH)
+
 @app.route("/")
 def home():
     return "TradeSync Bot API", 200
 
 def call_grok_api(post_text, source, timestamp, image_url=None):
-    if "$" in post_text:
-        ticker = next((word for word in post_text.split() if word.startswith("$")), "N/A")
-        if "buy" in post_text.lower() or "sell" in post_text.lower():
-            category = "Actionable Trade"
-            subcategory = ""
-            sentiment = ""
-            summary = f"Trade suggestion for {ticker}."
-            confidence = 85.0
-        elif "short" in post_text.lower() or "breakout" in post_text.lower():
-            category = "AI Insight"
-            subcategory = ""
-            sentiment = "Bearish" if "short" in post_text.lower() else "Bullish"
-            summary = f"{sentiment} sentiment on {ticker} based on market signal."
-            confidence = 80.0
-        else:
-            category = "General Insight"
-            subcategory = "Community/Noise"
-            sentiment = ""
-            summary = f"General comment about {ticker}."
-            confidence = 30.0
-    else:
-        ticker = "N/A"
-        category = "General Insight"
-        subcategory = "Education" if "means" in post_text.lower() else "Community/Noise"
-        sentiment = ""
-        summary = "General trading discussion."
-        confidence = 60.0 if "means" in post_text.lower() else 10.0
-
-    return {
-        "ticker": ticker,
-        "category": category,
-        "subcategory": subcategory,
-        "sentiment": sentiment,
-        "summary": summary,
-        "confidence": confidence,
-        "source": source,
-        "timestamp": timestamp
-    }
+    return classify(post_text, source, timestamp)
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
@@ -64,37 +43,21 @@ def webhook():
 
         insight_data = call_grok_api(post_text, source, timestamp)
 
-        db_path = os.environ.get('DB_PATH', '/tmp/tradesync.db')
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS insights (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticker TEXT,
-                category TEXT,
-                subcategory TEXT,
-                sentiment TEXT,
-                summary TEXT,
-                confidence REAL,
-                source TEXT,
-                timestamp TEXT
-            )
-        ''')
-        cursor.execute('''
-            INSERT INTO insights (ticker, category, subcategory, sentiment, summary, confidence, source, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            insight_data['ticker'],
-            insight_data['category'],
-            insight_data.get('subcategory', ''),
-            insight_data.get('sentiment', ''),
-            insight_data['summary'],
-            insight_data['confidence'],
-            insight_data['source'],
-            insight_data['timestamp']
-        ))
-        conn.commit()
-        conn.close()
+        with get_db_connection() as conn:
+            conn.execute('''
+                INSERT INTO insights (ticker, category, subcategory, sentiment, summary, confidence, source, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                insight_data['ticker'],
+                insight_data['category'],
+                insight_data.get('subcategory', ''),
+                insight_data.get('sentiment', ''),
+                insight_data['summary'],
+                insight_data['confidence'],
+                insight_data['source'],
+                insight_data['timestamp']
+            ))
+            conn.commit()
         return 'Webhook received', 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -102,12 +65,8 @@ def webhook():
 @app.route('/api/insights', methods=['GET'])
 def get_insights():
     try:
-        db_path = os.environ.get('DB_PATH', '/tmp/tradesync.db')
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM insights ORDER BY id DESC LIMIT 10')
-        rows = cursor.fetchall()
-        conn.close()
+        with get_db_connection() as conn:
+            rows = conn.execute('SELECT * FROM insights ORDER BY id DESC LIMIT 10').fetchall()
 
         insights = [
             {
@@ -0,0 +1,139 @@
+import itertools
+import json
+import math
+from array import array
+from json.encoder import encode_basestring_ascii
+
+# NumPy dtypes for the array typecodes used by record classes
+NUMPY_DTYPES = {"q": "int64", "d": "float64"}
+
+
+def _encode_column(values, typecode, nulls=None):
+    """JSON-encode every value of one column, staying in C-level map() when possible"""
+    if typecode == "q":
+        encoded = list(map(str, values))
+        for index in nulls or ():
+            encoded[index] = "null"
+        return encoded
+    if typecode == "d":
+        # A NaN (NULL) anywhere makes the sum NaN
+        if not math.isnan(sum(values)):
+            return list(map(float.__repr__, values))
+        return ["null" if math.isnan(value) else repr(value) for value in values]
+    try:
+        return list(map(encode_basestring_ascii, values))
+    except TypeError:
+        # Not all strings: NULLs or numbers in a loosely typed column
+        return [
+            encode_basestring_ascii(value) if type(value) is str else "null" if value is None else json.dumps(value)
+            for value in values
+        ]
+
+
+class RecordBatch:
+    """A result set stored column-wise.
+
+    Columns listed in ``types`` are packed into ``array.array`` buffers (``q``
+    for integers, ``d`` for reals), so a million rows cost a few bytes per
+    value instead of one object each. The other columns are plain lists.
+    NULL is stored as NaN in a real column and as 0 in an integer column,
+    whose NULL row numbers are kept in a set; rows and JSON give None/null
+    for both. Rows are only materialized when iterated, and to_json()
+    encodes column by column without building per-row dicts.
+    """
+
+    __slots__ = ("columns", "types", "_data", "_nulls")
+
+    def __init__(self, columns, types=None):
+        self.columns = tuple(columns)
+        self.types = {name: code for name, code in (types or {}).items() if name in self.columns}
+        self._data = [array(self.types[name]) if name in self.types else [] for name in self.columns]
+        # Row numbers of the NULLs in each integer column (None for other columns)
+        self._nulls = [set() if self.types.get(name) == "q" else None for name in self.columns]
+
+    @classmethod
+    def from_rows(cls, rows, columns, types=None, chunk_size=4096):
+        """Build a batch from row sequences (tuples, sqlite3.Row) in ``columns`` order"""
+        batch = cls(columns, types)
+        batch.extend(rows, chunk_size)
+        return batch
+
+    @classmethod
+    def from_cursor(cls, cursor, types=None, chunk_size=4096):
+        """Build a batch from an executed cursor, taking column names from its description"""
+        return cls.from_rows(cursor, [column[0] for column in cursor.description], types, chunk_size)
+
+    def extend(self, rows, chunk_size=4096):
+        """Append rows, transposing them a chunk at a time"""
+        rows = iter(rows)
+        codes = [self.types.get(name) for name in self.columns]
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            for column, nulls, code, values in zip(self._data, self._nulls, codes, zip(*chunk)):
+                if code is None or None not in values:
+                    column.extend(values)
+                elif code == "d":
+                    column.extend(math.nan if value is None else value for value in values)
+                else:
+                    start = len(column)
+                    nulls.update(start + i for i, value in enumerate(values) if value is None)
+                    column.extend(0 if value is None else value for value in values)
+
+    def __len__(self):
+        return len(self._data[0]) if self._data else 0
+
+    def _values(self, index):
+        """One column as Python values, with NULLs as None"""
+        values, nulls = self._data[index], self._nulls[index]
+        if nulls:
+            values = list(values)
+            for row in nulls:
+                values[row] = None
+        elif isinstance(values, array) and values.typecode == "d" and math.isnan(sum(values)):
+            # A NaN (NULL) anywhere makes the sum NaN
+            values = [None if math.isnan(value) else value for value in values]
+        return values
+
+    def __iter__(self):
+        """Yield each row as a tuple, read from the column buffers; NULLs come back as None"""
+        return zip(*map(self._values, range(len(self.columns))))
+
+    def column(self, name):
+        """The column's own storage (an array or list), not a copy; NULLs read as 0 / NaN"""
+        return self._data[self.columns.index(name)]
+
+    def numpy(self, name):
+        """The column as a NumPy array; numeric columns share the array's buffer, and an
+        integer column with NULLs comes back as a masked array"""
+        import numpy
+        index = self.columns.index(name)
+        values, nulls = self._data[index], self._nulls[index]
+        if not isinstance(values, array):
+            return numpy.array(values, dtype=object)
+        data = numpy.frombuffer(values, dtype=NUMPY_DTYPES[values.typecode])
+        if nulls:
+            mask = numpy.zeros(len(data), dtype=bool)
+            mask[list(nulls)] = True
+            return numpy.ma.masked_array(data, mask)
+        return data
+
+    def records(self, record_class):
+        """Yield ``record_class`` instances; the class takes its COLUMNS positionally"""
+        index = [self.columns.index(name) for name in record_class.COLUMNS]
+        for row in self:
+            yield record_class(*[row[i] for i in index])
+
+    def json_rows(self):
+        """Yield each row as a JSON object string, with NULLs as null"""
+        template = "{" + ",".join(f"{json.dumps(name)}:%s" for name in self.columns) + "}"
+        encoded = [
+            _encode_column(values, self.types.get(name), nulls)
+            for name, values, nulls in zip(self.columns, self._data, self._nulls)
+        ]
+        return map(template.__mod__, zip(*encoded))
+
+    def to_json(self):
+        """Encode the batch as a JSON array of objects"""
+        return "[" + ",".join(self.json_rows()) + "]"
@@ -0,0 +1,31 @@
+class Insight:
+    """One row of the insights table"""
+
+    COLUMNS = (
+        "id", "ticker", "category", "subcategory", "sentiment", "summary", "confidence", "source", "timestamp",
+        "closed",
+    )
+    # Array typecodes for RecordBatch columns
+    COLUMN_TYPES = {"id": "q", "confidence": "d", "closed": "q"}
+    __slots__ = COLUMNS
+
+    def __init__(self, id=None, ticker=None, category=None, subcategory=None, sentiment=None, summary=None,
+                 confidence=None, source=None, timestamp=None, closed=0):
+        self.id = id
+        self.ticker = ticker
+        self.category = category
+        self.subcategory = subcategory
+        self.sentiment = sentiment
+        self.summary = summary
+        self.confidence = confidence
+        self.source = source
+        self.timestamp = timestamp
+        self.closed = closed
+
+    @classmethod
+    def from_row(cls, row):
+        """Create an Insight from a database row"""
+        return cls(*[row[name] for name in cls.COLUMNS])
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.COLUMNS}
@@ -0,0 +1,23 @@
+class Notification:
+    """One row of the notifications table (a raw alert as received)"""
+
+    COLUMNS = ("id", "source", "content", "timestamp", "raw_data", "content_hash")
+    # Array typecodes for RecordBatch columns
+    COLUMN_TYPES = {"id": "q"}
+    __slots__ = COLUMNS
+
+    def __init__(self, id=None, source=None, content=None, timestamp=None, raw_data=None, content_hash=None):
+        self.id = id
+        self.source = source
+        self.content = content
+        self.timestamp = timestamp
+        self.raw_data = raw_data
+        self.content_hash = content_hash
+
+    @classmethod
+    def from_row(cls, row):
+        """Create a Notification from a database row"""
+        return cls(*[row[name] for name in cls.COLUMNS])
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.COLUMNS}
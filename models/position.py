@@ -0,0 +1,137 @@
+import threading
+
+# Option prices are quoted per share; one contract covers 100 shares
+CONTRACT_MULTIPLIER = 100
+
+
+class Position:
+    def __init__(self, underlying, strike, right, expiry):
+        self.underlying = underlying
+        self.strike = strike
+        self.right = right
+        self.expiry = expiry
+        self.quantity = 0.0
+        self.avg_cost = 0.0
+        self.realized_pnl = 0.0
+        self.last_price = None
+
+    @property
+    def key(self):
+        return (self.underlying, self.strike, self.right, self.expiry)
+
+    def buy(self, price, quantity):
+        """Add contracts at ``price``, updating the average cost"""
+        total = self.quantity + quantity
+        if total > 0:
+            self.avg_cost = (self.avg_cost * self.quantity + price * quantity) / total
+        self.quantity = total
+        self.last_price = price
+
+    def sell(self, price, quantity):
+        """Close up to ``quantity`` contracts at ``price`` and realize the P&L"""
+        closed = min(quantity, self.quantity)
+        self.realized_pnl += (price - self.avg_cost) * closed * CONTRACT_MULTIPLIER
+        self.quantity -= closed
+        if self.quantity <= 0:
+            self.quantity = 0.0
+            self.avg_cost = 0.0
+        self.last_price = price
+        return closed
+
+    def to_dict(self):
+        return {
+            "underlying": self.underlying,
+            "strike": self.strike,
+            "right": self.right,
+            "expiry": self.expiry,
+            "quantity": self.quantity,
+            "avg_cost": round(self.avg_cost, 4),
+            "realized_pnl": round(self.realized_pnl, 2),
+            "last_price": self.last_price
+        }
+
+
+class PositionBook:
+    """In-memory option positions keyed by (underlying, strike, right, expiry).
+
+    Each trade event is applied incrementally with a single dict lookup, so
+    the book never has to re-scan trade history to answer a query.
+    """
+
+    def __init__(self):
+        self._positions = {}
+        self._lock = threading.Lock()
+        self._catch_up_lock = threading.Lock()
+        self.events_applied = 0
+        # Highest trades.id seen by catch_up()
+        self.last_trade_id = 0
+
+    def apply(self, trade_type, underlying, strike, right, expiry, price, quantity=None, fraction=None):
+        """Apply one BUY or SELL event and return the affected position.
+
+        Buys add ``quantity`` contracts (one if not given). Sells close
+        ``fraction`` of the open quantity when given, otherwise ``quantity``
+        contracts, otherwise the whole position.
+        """
+        key = (underlying, strike, right, expiry)
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._positions[key] = Position(underlying, strike, right, expiry)
+
+            if trade_type == "BUY":
+                position.buy(price, quantity or 1)
+            elif fraction is not None:
+                position.sell(price, position.quantity * fraction)
+            elif quantity:
+                position.sell(price, quantity)
+            else:
+                position.sell(price, position.quantity)
+            self.events_applied += 1
+            return position
+
+    def apply_row(self, row):
+        """Apply one row of the trades table"""
+        return self.apply(
+            row['trade_type'], row['symbol'], row['strike'], row['option_type'], row['expiry'],
+            row['price'], row['quantity'], row['fraction']
+        )
+
+    def catch_up(self, fetch_since, batch_size=1000):
+        """Apply every trade committed since the last call, in id order; returns the count.
+
+        ``fetch_since(last_id, limit)`` returns up to ``limit`` trades rows
+        with ids above ``last_id``, ordered by id. Following the table
+        rather than the alerts this process stores keeps the book in commit
+        order and in step with trades written by other workers and by
+        backfill_alerts.py. Rows without an option contract are skipped.
+        """
+        applied = 0
+        with self._catch_up_lock:
+            while True:
+                rows = fetch_since(self.last_trade_id, batch_size)
+                for row in rows:
+                    if row['strike'] is not None:
+                        self.apply_row(row)
+                        applied += 1
+                    self.last_trade_id = row['id']
+                if len(rows) < batch_size:
+                    return applied
+
+    def get(self, underlying, strike, right, expiry):
+        with self._lock:
+            return self._positions.get((underlying, strike, right, expiry))
+
+    def snapshot(self, include_closed=False):
+        """Return positions as dicts, open ones only unless include_closed is set"""
+        with self._lock:
+            positions = [
+                position.to_dict() for position in self._positions.values()
+                if include_closed or position.quantity > 0
+            ]
+        positions.sort(key=lambda p: (p["underlying"], p["expiry"], p["strike"], p["right"]))
+        return positions
+
+    def realized_pnl(self):
+        with self._lock:
+            return round(sum(position.realized_pnl for position in self._positions.values()), 2)
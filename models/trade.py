@@ -1,8 +1,22 @@
 from utils.db import db
+from utils.alert_parser import parse_alert
+from utils.alert_rows import trade_side
+from models.batch import RecordBatch
 from datetime import datetime
+from operator import attrgetter
 
 class Trade:
-    def __init__(self, symbol, price, quantity, trade_type, source=None, timestamp=None, id=None):
+    # Columns in constructor order, as RecordBatch.records() passes them
+    COLUMNS = (
+        'symbol', 'price', 'quantity', 'trade_type', 'source', 'timestamp', 'id',
+        'strike', 'option_type', 'expiry', 'fraction'
+    )
+    # Array typecodes for RecordBatch columns
+    COLUMN_TYPES = {'id': 'q', 'price': 'd', 'strike': 'd', 'fraction': 'd'}
+    __slots__ = COLUMNS
+
+    def __init__(self, symbol, price, quantity, trade_type, source=None, timestamp=None, id=None,
+                 strike=None, option_type=None, expiry=None, fraction=None):
         self.id = id
         self.symbol = symbol
         self.price = price
@@ -10,12 +24,21 @@ class Trade:
         self.trade_type = trade_type  # 'BUY' or 'SELL'
         self.source = source
         self.timestamp = timestamp or datetime.now()
+        # Option contract details, set for trades parsed from options alerts
+        self.strike = strike
+        self.option_type = option_type  # 'C' or 'P'
+        self.expiry = expiry
+        self.fraction = fraction  # share of the position closed by a SELL
     
     @classmethod
     def from_discord_message(cls, message):
         """Parse a Discord message and create a Trade object"""
-        # Implement parsing logic here
-        # This is a simplified example - you would have more complex parsing
+        # Options alerts (BOUGHT / SOLD 1/2 / ALL OUT) go through the grammar parser
+        alert = parse_alert(message)
+        if alert is not None:
+            return cls.from_alert(alert, "Discord")
+
+        # Fall back to keyword matching for messages outside the alert grammar
         if "BOUGHT" in message:
             trade_type = "BUY"
         elif "SOLD" in message:
@@ -23,7 +46,6 @@ class Trade:
         else:
             return None
         
-        # Very basic parsing - you would need more sophisticated parsing
         parts = message.split()
         symbol = parts[1] if len(parts) > 1 else "UNKNOWN"
         
@@ -44,28 +66,74 @@ class Trade:
         
         return cls(symbol, price, quantity, trade_type, "Discord")
     
+    @classmethod
+    def from_alert(cls, alert, source=None, timestamp=None):
+        """Create a Trade from a parsed OptionAlert"""
+        trade_type, quantity = trade_side(alert)
+        return cls(
+            alert.underlying, alert.price, quantity, trade_type, source, timestamp,
+            strike=alert.strike, option_type=alert.right, expiry=alert.expiry, fraction=alert.fraction
+        )
+    
+    def to_row(self):
+        """Column values for the trades table"""
+        return {
+            'symbol': self.symbol,
+            'price': self.price,
+            'quantity': self.quantity,
+            'trade_type': self.trade_type,
+            'source': self.source,
+            'timestamp': self.timestamp,
+            'strike': self.strike,
+            'option_type': self.option_type,
+            'expiry': self.expiry,
+            'fraction': self.fraction
+        }
+    
     def save(self):
         """Save the trade to the database"""
         if self.id is None:
-            cursor = db.execute_query(
-                """
-                INSERT INTO trades (symbol, price, quantity, trade_type, source, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (self.symbol, self.price, self.quantity, self.trade_type, self.source, self.timestamp)
-            )
-            self.id = cursor.lastrowid
+            self.id = db.insert_row('trades', self.to_row())
         else:
-            db.execute_query(
-                """
-                UPDATE trades
-                SET symbol = ?, price = ?, quantity = ?, trade_type = ?, source = ?, timestamp = ?
-                WHERE id = ?
-                """,
-                (self.symbol, self.price, self.quantity, self.trade_type, self.source, self.timestamp, self.id)
-            )
+            db.update_row('trades', self.to_row(), {'id': self.id})
         return self
     
+    @classmethod
+    def save_many(cls, trades):
+        """Save many trades in one transaction; new trades get their ids set"""
+        trades = list(trades)
+        new = [trade for trade in trades if trade.id is None]
+        existing = [trade for trade in trades if trade.id is not None]
+        columns = tuple(column for column in cls.COLUMNS if column != 'id')
+
+        with db.transaction() as conn:
+            if new:
+                count = db.insert_many('trades', map(attrgetter(*columns), new), columns)
+                # Rows inserted under one write lock get consecutive rowids
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                for id, trade in enumerate(new, last_id - count + 1):
+                    trade.id = id
+            if existing:
+                db.upsert_many('trades', map(attrgetter('id', *columns), existing), ('id',), ('id',) + columns)
+        return trades
+    
+    @classmethod
+    def from_row(cls, row):
+        """Create a Trade object from a database row"""
+        return cls(
+            symbol=row['symbol'],
+            price=row['price'],
+            quantity=row['quantity'],
+            trade_type=row['trade_type'],
+            source=row['source'],
+            timestamp=row['timestamp'],
+            id=row['id'],
+            strike=row['strike'],
+            option_type=row['option_type'],
+            expiry=row['expiry'],
+            fraction=row['fraction']
+        )
+    
     @classmethod
     def get_all(cls, limit=100):
         """Get all trades from the database"""
@@ -78,41 +146,31 @@ class Trade:
             (limit,)
         )
         
-        trades = []
-        for row in cursor:
-            trade = cls(
-                symbol=row['symbol'],
-                price=row['price'],
-                quantity=row['quantity'],
-                trade_type=row['trade_type'],
-                source=row['source'],
-                timestamp=row['timestamp'],
-                id=row['id']
+        return [cls.from_row(row) for row in cursor]
+    
+    @classmethod
+    def get_batch(cls, limit=None):
+        """Get trades in id order as a column-wise RecordBatch (for large histories)"""
+        # Rows are streamed from the cursor straight into the columns
+        with db.get_db_connection() as conn:
+            cursor = conn.execute(
+                f"SELECT {', '.join(cls.COLUMNS)} FROM trades ORDER BY id LIMIT ?",
+                (-1 if limit is None else limit,)
             )
-            trades.append(trade)
-            
-        return trades
+            return RecordBatch.from_rows(cursor, cls.COLUMNS, cls.COLUMN_TYPES)
     
     @classmethod
     def get_by_id(cls, id):
         """Get a trade by ID"""
-        cursor = db.execute_query(
+        row = db.execute_query(
             """
             SELECT * FROM trades
             WHERE id = ?
             """,
-            (id,)
+            (id,),
+            fetch_one=True
         )
         
-        row = cursor.fetchone()
         if row:
-            return cls(
-                symbol=row['symbol'],
-                price=row['price'],
-                quantity=row['quantity'],
-                trade_type=row['trade_type'],
-                source=row['source'],
-                timestamp=row['timestamp'],
-                id=row['id']
-            )
+            return cls.from_row(row)
         return None
@@ -1,7 +1,36 @@
+import logging
+import os
 from utils.db import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.metrics import Counter
+from utils.passwords import HasherBusy, password_hasher
+from utils.record_cache import RecordCache
 from flask_login import UserMixin
 
+# User objects cached by id, username, email and google_id (USER_CACHE_SIZE=0 disables)
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 300))
+# How often the cache checks cache_versions for writes by other processes
+USER_CACHE_CHECK_SECONDS = float(os.environ.get('USER_CACHE_CHECK_SECONDS', 1))
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_LOOKUPS = Counter('tradesync_user_cache_lookups_total', 'User lookups by cache result', ['result'])
+
+def user_cache_version():
+    row = db.execute_query("SELECT version FROM cache_versions WHERE name = 'users'", fetch_one=True)
+    return row[0] if row else None
+
+def user_cache_keys(user):
+    return (('id', user.id), ('username', user.username), ('email', user.email), ('google_id', user.google_id))
+
+user_cache = RecordCache(
+    user_cache_keys,
+    version=user_cache_version,
+    max_entries=USER_CACHE_SIZE,
+    ttl=USER_CACHE_TTL_SECONDS,
+    check_interval=USER_CACHE_CHECK_SECONDS
+)
+
 class User(UserMixin):
     def __init__(self, username=None, email=None, google_id=None, id=None):
         self.id = id
@@ -11,14 +40,51 @@ class User(UserMixin):
         self.password_hash = None
     
     def set_password(self, password):
-        """Set the user's password hash"""
-        self.password_hash = generate_password_hash(password)
+        """Set the user's password hash (hashed on the password worker pool;
+        raises HasherBusy when too many hashes are pending)"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Check if the provided password matches the stored hash"""
+        """Check if the provided password matches the stored hash, upgrading
+        the hash when it was made with outdated parameters"""
+        if not self.password_hash:
+            return False
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            try:
+                self._rehash(password_hasher.hash(password))
+            except HasherBusy:
+                pass  # Upgrade on a quieter login
+        return True
+    
+    async def set_password_async(self, password):
+        """set_password() for coroutines"""
+        self.password_hash = await password_hasher.hash_async(password)
+    
+    async def check_password_async(self, password):
+        """check_password() for coroutines"""
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
+        if not await password_hasher.verify_async(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            try:
+                self._rehash(await password_hasher.hash_async(password))
+            except HasherBusy:
+                pass
+        return True
+    
+    def _rehash(self, password_hash):
+        """Store a hash made with the current parameters; a failure only delays the upgrade"""
+        self.password_hash = password_hash
+        if not self.id:
+            return
+        try:
+            db.update_row('users', {'password_hash': password_hash}, {'id': self.id})
+            user_cache.invalidate()
+        except Exception as e:
+            logger.warning("Could not upgrade password hash for user %s: %s", self.id, e)
     
     def save(self):
         """Save the user to the database"""
@@ -37,6 +103,7 @@ class User(UserMixin):
             
             condition = {'id': self.id}
             db.update_row('users', data, condition)
+            user_cache.invalidate()
             return self.id
         else:
             # Insert new user
@@ -52,6 +119,7 @@ class User(UserMixin):
                 data['google_id'] = self.google_id
             
             self.id = db.insert_row('users', data)
+            user_cache.invalidate()
             return self.id
     
     @staticmethod
@@ -67,52 +135,52 @@ class User(UserMixin):
         return user
     
     @staticmethod
-    def get_by_id(user_id):
-        """Get a user by ID"""
-        query = "SELECT * FROM users WHERE id = ?"
+    def _get_by(column, value):
+        """Get a user by a unique column, from the user cache when possible"""
+        user = user_cache.get(column, value)
+        if user is not None:
+            USER_CACHE_LOOKUPS.labels('hit').inc()
+            return user
+        USER_CACHE_LOOKUPS.labels('miss').inc()
         
-        # Use fetch_one=True to get a single result
-        row = db.execute_query(query, (user_id,), fetch_one=True)
+        # Read before the query, so a save() racing with it keeps the row out of the cache
+        generation = user_cache.generation
+        row = db.execute_query(f"SELECT * FROM users WHERE {column} = ?", (value,), fetch_one=True)
         
         if row:
-            return User.from_row(row)
+            user = User.from_row(row)
+            user_cache.put(user, generation)
+            return user
         return None
     
+    @staticmethod
+    def get_by_id(user_id):
+        """Get a user by ID (Flask-Login passes it as a string)"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        return User._get_by('id', user_id)
+    
     @staticmethod
     def get_by_username(username):
         """Get a user by username"""
-        query = "SELECT * FROM users WHERE username = ?"
-        
-        # Use fetch_one=True to get a single result
-        row = db.execute_query(query, (username,), fetch_one=True)
-        
-        if row:
-            return User.from_row(row)
-        return None
+        return User._get_by('username', username)
     
     @staticmethod
     def get_by_email(email):
         """Get a user by email"""
-        query = "SELECT * FROM users WHERE email = ?"
-        
-        # Use fetch_one=True to get a single result
-        row = db.execute_query(query, (email,), fetch_one=True)
-        
-        if row:
-            return User.from_row(row)
-        return None
+        return User._get_by('email', email)
     
     @staticmethod
     def get_by_google_id(google_id):
         """Get a user by Google ID"""
-        query = "SELECT * FROM users WHERE google_id = ?"
-        
-        # Use fetch_one=True to get a single result
-        row = db.execute_query(query, (google_id,), fetch_one=True)
-        
-        if row:
-            return User.from_row(row)
-        return None
+        return User._get_by('google_id', google_id)
+    
+    @staticmethod
+    def cache_stats():
+        """Hit ratio and counters of the user cache"""
+        return user_cache.stats()
     
     @staticmethod
     def get_all(limit=None):
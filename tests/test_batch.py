@@ -0,0 +1,95 @@
+"""RecordBatch must hand NULLs back as None/null in every typed column.
+
+Rows go through extend() in small chunks so NULLs land in later chunks
+too, and come back out through iteration, records() and json_rows().
+Run with: python -m unittest discover tests
+"""
+import json
+import math
+import os
+import sqlite3
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.batch import RecordBatch  # noqa: E402
+
+COLUMNS = ("id", "price", "symbol", "quantity")
+TYPES = {"id": "q", "price": "d", "quantity": "q"}
+ROWS = [
+    (1, 10.5, "SPX", 2),
+    (2, None, "NDX", None),
+    (3, 0.0, None, 0),
+    (None, -1.25, "TSM", 7),
+    (5, None, "SPY", None),
+]
+
+
+class Trade:
+    """The shape of models.trade.Trade, which can't be imported without
+    opening the repository's own database"""
+
+    COLUMNS = ("symbol", "price", "quantity", "trade_type", "source", "timestamp", "id",
+               "strike", "option_type", "expiry", "fraction")
+    COLUMN_TYPES = {"id": "q", "price": "d", "strike": "d", "fraction": "d"}
+
+    def __init__(self, *values):
+        for name, value in zip(self.COLUMNS, values):
+            setattr(self, name, value)
+
+
+class RecordBatchTest(unittest.TestCase):
+    def test_null_round_trip_through_iteration(self):
+        batch = RecordBatch.from_rows(ROWS, COLUMNS, TYPES, chunk_size=2)
+        self.assertEqual(list(batch), ROWS)
+        self.assertEqual(len(batch), len(ROWS))
+
+    def test_null_round_trip_through_json(self):
+        batch = RecordBatch.from_rows(ROWS, COLUMNS, TYPES, chunk_size=2)
+        expected = [dict(zip(COLUMNS, row)) for row in ROWS]
+        self.assertEqual([json.loads(line) for line in batch.json_rows()], expected)
+        self.assertEqual(json.loads(batch.to_json()), expected)
+
+    def test_zero_is_not_null(self):
+        batch = RecordBatch.from_rows([(0, 0.0, "", 0)], COLUMNS, TYPES)
+        self.assertEqual(list(batch), [(0, 0.0, "", 0)])
+        self.assertEqual(json.loads(batch.to_json()), [{"id": 0, "price": 0.0, "symbol": "", "quantity": 0}])
+
+    def test_columns_keep_compact_storage(self):
+        batch = RecordBatch.from_rows(ROWS, COLUMNS, TYPES)
+        self.assertEqual(batch.column("id").typecode, "q")
+        self.assertEqual(list(batch.column("id")), [1, 2, 3, 0, 5])
+        self.assertTrue(math.isnan(batch.column("price")[1]))
+
+    def test_records_from_sqlite(self):
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        conn.execute(
+            "CREATE TABLE trades (id INTEGER PRIMARY KEY, symbol TEXT, price REAL, quantity INTEGER, "
+            "trade_type TEXT, source TEXT, timestamp TEXT, strike REAL, option_type TEXT, expiry TEXT, fraction REAL)"
+        )
+        conn.executemany(
+            "INSERT INTO trades (symbol, price, quantity, trade_type, source, timestamp, strike, option_type, "
+            "expiry, fraction) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("SPX", 5.5, 2, "BUY", "Discord", "2025-03-11 21:19:00", 5700.0, "C", "3/14", None),
+                ("SPX", 7.0, None, "SELL", "Discord", "2025-03-11 22:00:00", 5700.0, "C", "3/14", 0.5),
+                ("AAPL", 180.0, 10, "BUY", None, "2025-03-12 15:00:00", None, None, None, None),
+            ]
+        )
+        cursor = conn.execute(f"SELECT {', '.join(Trade.COLUMNS)} FROM trades ORDER BY id")
+        batch = RecordBatch.from_rows(cursor, Trade.COLUMNS, Trade.COLUMN_TYPES)
+        trades = list(batch.records(Trade))
+
+        self.assertEqual([trade.id for trade in trades], [1, 2, 3])
+        self.assertIsNone(trades[0].fraction)
+        self.assertIsNone(trades[1].quantity)
+        self.assertEqual(trades[1].fraction, 0.5)
+        self.assertIsNone(trades[2].strike)
+        self.assertIsNone(trades[2].source)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""utils.classifier must agree with the original call_grok_api rules.
+
+The golden corpus is every line of discord_trades.log plus
+tests/data/classifier_corpus.json: hand-written mixed-case,
+overlapping-keyword and unicode-whitespace cases and a fixed set of
+generated ones. Run with: python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.classifier import classify, classify_many  # noqa: E402
+
+
+def legacy_call_grok_api(post_text, source, timestamp):
+    """call_grok_api as it was before the rule table, kept as the reference"""
+    if "$" in post_text:
+        ticker = next((word for word in post_text.split() if word.startswith("$")), "N/A")
+        if "buy" in post_text.lower() or "sell" in post_text.lower():
+            category = "Actionable Trade"
+            subcategory = ""
+            sentiment = ""
+            summary = f"Trade suggestion for {ticker}."
+            confidence = 85.0
+        elif "short" in post_text.lower() or "breakout" in post_text.lower():
+            category = "AI Insight"
+            subcategory = ""
+            sentiment = "Bearish" if "short" in post_text.lower() else "Bullish"
+            summary = f"{sentiment} sentiment on {ticker} based on market signal."
+            confidence = 80.0
+        else:
+            category = "General Insight"
+            subcategory = "Community/Noise"
+            sentiment = ""
+            summary = f"General comment about {ticker}."
+            confidence = 30.0
+    else:
+        ticker = "N/A"
+        category = "General Insight"
+        subcategory = "Education" if "means" in post_text.lower() else "Community/Noise"
+        sentiment = ""
+        summary = "General trading discussion."
+        confidence = 60.0 if "means" in post_text.lower() else 10.0
+
+    return {
+        "ticker": ticker,
+        "category": category,
+        "subcategory": subcategory,
+        "sentiment": sentiment,
+        "summary": summary,
+        "confidence": confidence,
+        "source": source,
+        "timestamp": timestamp
+    }
+
+
+def golden_corpus():
+    with open(os.path.join(ROOT, "discord_trades.log"), encoding="utf-8") as f:
+        corpus = [line.rstrip("\n") for line in f]
+    with open(os.path.join(ROOT, "tests", "data", "classifier_corpus.json"), encoding="utf-8") as f:
+        corpus.extend(json.load(f))
+    return corpus
+
+
+class ClassifierGoldenTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = golden_corpus()
+
+    def test_classify_matches_legacy_rules(self):
+        for text in self.corpus:
+            with self.subTest(text=text):
+                self.assertEqual(classify(text, "Discord", "2025-03-11 21:14:00"),
+                                 legacy_call_grok_api(text, "Discord", "2025-03-11 21:14:00"))
+
+    def test_classify_many_matches_legacy_rules(self):
+        items = [(text, "Discord", "2025-03-11 21:14:00") for text in self.corpus]
+        self.assertEqual(classify_many(items), [legacy_call_grok_api(*item) for item in items])
+
+
+if __name__ == "__main__":
+    unittest.main()
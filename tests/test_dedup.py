@@ -0,0 +1,111 @@
+"""Deduplicator's window and the notifications.content_hash unique index.
+
+The LRU is exercised with explicit receive times so bucket boundaries
+are deterministic; the index is checked on a schema built by migrate()
+in an in-memory database. Run with: python -m unittest discover tests
+"""
+import os
+import sqlite3
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.alert_rows import INSERT_NOTIFICATION_SQL, notification_row  # noqa: E402
+from utils.dedup import Deduplicator, content_hash, stored_hashes  # noqa: E402
+from utils.migrations import migrate  # noqa: E402
+
+ALERT = "BOUGHT SPX 5700C 3/14 5.50"
+
+
+class DeduplicatorTest(unittest.TestCase):
+    def setUp(self):
+        self.dedup = Deduplicator(window_seconds=60, max_entries=3)
+
+    def seen(self, text, when, source="Discord"):
+        """Check an alert and record it when new, the way store_alerts() does"""
+        hashes = self.dedup.hashes(text, source, when)
+        if self.dedup.is_duplicate(hashes):
+            return True
+        self.dedup.remember(hashes[0])
+        return False
+
+    def test_repeat_in_same_bucket(self):
+        self.assertFalse(self.seen(ALERT, 1000))
+        self.assertTrue(self.seen(ALERT, 1010))
+
+    def test_repeat_across_bucket_boundary(self):
+        self.assertFalse(self.seen(ALERT, 1019.9))  # last moment of bucket 16
+        self.assertTrue(self.seen(ALERT, 1020.1))
+
+    def test_repeat_after_the_window(self):
+        self.assertFalse(self.seen(ALERT, 1000))
+        self.assertFalse(self.seen(ALERT, 1000 + 2 * 60))
+
+    def test_case_and_whitespace_are_ignored(self):
+        self.assertFalse(self.seen(ALERT, 1000))
+        self.assertTrue(self.seen("  bought spx\n5700C  3/14 5.50 ", 1001))
+
+    def test_sources_are_kept_apart(self):
+        self.assertFalse(self.seen(ALERT, 1000, source="Discord"))
+        self.assertFalse(self.seen(ALERT, 1000, source="Twitter"))
+
+    def test_is_duplicate_does_not_record(self):
+        hashes = self.dedup.hashes(ALERT, "Discord", 1000)
+        self.assertFalse(self.dedup.is_duplicate(hashes))
+        self.assertFalse(self.dedup.is_duplicate(hashes))
+        self.assertEqual(self.dedup.stats()["entries"], 0)
+
+    def test_lru_keeps_max_entries(self):
+        for n in range(4):
+            self.seen(f"{ALERT} #{n}", 1000)
+        self.assertEqual(self.dedup.stats()["entries"], 3)
+        # The oldest hash was evicted, so its repeat is only caught by the database
+        self.assertFalse(self.seen(f"{ALERT} #0", 1001))
+        self.assertTrue(self.seen(f"{ALERT} #3", 1001))
+
+    def test_zero_window_disables(self):
+        self.assertFalse(Deduplicator(window_seconds=0).enabled)
+        self.assertTrue(self.dedup.enabled)
+
+
+class ContentHashIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+        migrate(self.conn)
+
+    def store(self, text, digest):
+        self.conn.execute(INSERT_NOTIFICATION_SQL, notification_row("Discord", text, "2025-03-11 21:19:00", "{}", digest))
+
+    def test_unique_index_rejects_a_stored_hash(self):
+        digest = content_hash(ALERT, "Discord", 16)
+        self.store(ALERT, digest)
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.store(ALERT, digest)
+
+    def test_unhashed_rows_are_not_constrained(self):
+        # Stored with deduplication off
+        self.store(ALERT, None)
+        self.store(ALERT, None)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0], 2)
+
+    def test_stored_hashes_finds_persisted_digests(self):
+        digests = [content_hash(f"{ALERT} #{n}", "Discord", 16) for n in range(5)]
+        for n, digest in enumerate(digests[:3]):
+            self.store(f"{ALERT} #{n}", digest)
+        self.assertEqual(stored_hashes(self.conn, digests, chunk_size=2), set(digests[:3]))
+        self.assertEqual(stored_hashes(self.conn, []), set())
+
+    def test_previous_bucket_hash_matches_a_stored_alert(self):
+        dedup = Deduplicator(window_seconds=60)
+        first = dedup.hashes(ALERT, "Discord", 1019.9)
+        self.store(ALERT, first[0])
+        # A fresh process (empty LRU) still finds the repeat through the index
+        later = Deduplicator(window_seconds=60).hashes(ALERT, "Discord", 1020.1)
+        self.assertEqual(stored_hashes(self.conn, later), {first[0]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Every insights filter combination must be answered from an index.
+
+Builds the schema through utils.migrations.migrate and checks the
+EXPLAIN QUERY PLAN of build_insights_query() for open and closed insights.
+Run with: python -m unittest discover tests
+"""
+import itertools
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+# Importing the backend initializes its database; keep it out of the way
+os.environ.setdefault("DATABASE_URL", os.path.join(tempfile.mkdtemp(), "tradesync.db"))
+
+from app import build_insights_query  # noqa: E402
+from utils.migrations import migrate  # noqa: E402
+
+FILTERS = {
+    "ticker": "SPY",
+    "category": "Actionable Trade",
+    "sentiment": "Bullish",
+    "min_confidence": "50",
+    "since": "2025-01-01 00:00:00",
+    "until": "2026-01-01 00:00:00",
+    "before_id": "100",
+}
+
+
+class InsightsQueryPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = sqlite3.connect(":memory:")
+        migrate(cls.conn)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def plan(self, args, closed):
+        query, params, _ = build_insights_query(args, closed)
+        return " | ".join(row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+
+    def test_every_filter_combination_uses_an_index(self):
+        for count in range(len(FILTERS) + 1):
+            for names in itertools.combinations(FILTERS, count):
+                for closed in (0, 1):
+                    args = {name: FILTERS[name] for name in names}
+                    with self.subTest(filters=names, closed=closed):
+                        plan = self.plan(args, closed)
+                        self.assertIn("USING INDEX", plan)
+                        self.assertNotIn("SCAN insights", plan)
+
+    def test_equality_filter_uses_its_composite_index(self):
+        for name in ("ticker", "category", "sentiment"):
+            with self.subTest(filter=name):
+                self.assertIn(f"idx_insights_{name}_closed", self.plan({name: FILTERS[name]}, 0))
+
+    def test_time_range_uses_closed_timestamp_index(self):
+        plan = self.plan({"since": FILTERS["since"], "until": FILTERS["until"]}, 1)
+        self.assertIn("idx_insights_closed_timestamp", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""expand_method() must predict the prefix Werkzeug writes for each method.
+
+needs_rehash() compares stored hashes against expand_method(), so a
+mismatch would rehash every password on every login. Hashes are made
+inline (workers=0) with cheap parameters where the method allows.
+Run with: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+from werkzeug.security import generate_password_hash
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.passwords import HasherBusy, PasswordHasher, expand_method, method_of  # noqa: E402
+
+METHODS = [
+    None,
+    "scrypt",
+    "scrypt:16384:8:1",
+    "pbkdf2",
+    "pbkdf2:sha512",
+    "pbkdf2:sha256:1000",
+]
+
+
+class ExpandMethodTest(unittest.TestCase):
+    def test_matches_werkzeug_prefixes(self):
+        for method in METHODS:
+            with self.subTest(method=method):
+                if method is None:
+                    password_hash = generate_password_hash("secret")
+                else:
+                    password_hash = generate_password_hash("secret", method=method)
+                self.assertEqual(expand_method(method), method_of(password_hash))
+
+    def test_method_of(self):
+        self.assertEqual(method_of("pbkdf2:sha256:1000$salt$hash"), "pbkdf2:sha256:1000")
+        self.assertIsNone(method_of(None))
+        self.assertIsNone(method_of(""))
+
+
+class PasswordHasherTest(unittest.TestCase):
+    def test_hash_and_verify_inline(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0)
+        password_hash = hasher.hash("secret")
+        self.assertTrue(hasher.verify(password_hash, "secret"))
+        self.assertFalse(hasher.verify(password_hash, "wrong"))
+        self.assertFalse(hasher.verify(None, "secret"))
+        self.assertEqual(hasher.stats()["hashed"], 1)
+        self.assertEqual(hasher.stats()["pending"], 0)
+
+    def test_needs_rehash(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0)
+        self.assertFalse(hasher.needs_rehash(hasher.hash("secret")))
+        self.assertTrue(hasher.needs_rehash(generate_password_hash("secret", method="pbkdf2:sha256:2000")))
+        self.assertTrue(PasswordHasher(method="pbkdf2", workers=0).needs_rehash(hasher.hash("secret")))
+        self.assertFalse(hasher.needs_rehash(None))
+
+    def test_full_backlog_is_rejected(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0, max_pending=1)
+        hasher._slots.acquire()  # one hash already pending
+        with self.assertRaises(HasherBusy):
+            hasher.hash("secret")
+        hasher._slots.release()
+        self.assertEqual(hasher.stats()["rejected"], 1)
+        hasher.hash("secret")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""PositionBook must track average cost and realized P&L per contract.
+
+Events go through apply() and through catch_up() over rows of an
+in-memory trades table, the way backend/app.py feeds the book.
+Run with: python -m unittest discover tests
+"""
+import os
+import sqlite3
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.position import CONTRACT_MULTIPLIER, PositionBook  # noqa: E402
+
+SPX = ("SPX", 5700.0, "C", "3/14")
+
+
+class PositionBookTest(unittest.TestCase):
+    def test_buys_average_the_cost(self):
+        book = PositionBook()
+        book.apply("BUY", *SPX, price=5.0, quantity=2)
+        position = book.apply("BUY", *SPX, price=8.0, quantity=1)
+        self.assertEqual(position.quantity, 3)
+        self.assertAlmostEqual(position.avg_cost, 6.0)
+        self.assertEqual(position.realized_pnl, 0)
+
+    def test_buy_without_quantity_is_one_contract(self):
+        book = PositionBook()
+        self.assertEqual(book.apply("BUY", *SPX, price=5.0).quantity, 1)
+
+    def test_partial_and_full_sells_realize_pnl(self):
+        book = PositionBook()
+        book.apply("BUY", *SPX, price=5.0, quantity=4)
+        position = book.apply("SELL", *SPX, price=7.0, fraction=0.5)
+        self.assertEqual(position.quantity, 2)
+        self.assertAlmostEqual(position.realized_pnl, 2 * 2.0 * CONTRACT_MULTIPLIER)
+        position = book.apply("SELL", *SPX, price=4.0)
+        self.assertEqual(position.quantity, 0)
+        self.assertEqual(position.avg_cost, 0)
+        self.assertAlmostEqual(position.realized_pnl, (4.0 - 2.0) * CONTRACT_MULTIPLIER)
+        self.assertEqual(book.realized_pnl(), 200.0)
+
+    def test_sell_never_goes_short(self):
+        book = PositionBook()
+        book.apply("BUY", *SPX, price=5.0, quantity=1)
+        position = book.apply("SELL", *SPX, price=6.0, quantity=3)
+        self.assertEqual(position.quantity, 0)
+        self.assertAlmostEqual(position.realized_pnl, 1.0 * CONTRACT_MULTIPLIER)
+
+    def test_contracts_are_kept_apart(self):
+        book = PositionBook()
+        book.apply("BUY", *SPX, price=5.0, quantity=1)
+        book.apply("BUY", "SPX", 5700.0, "P", "3/14", price=3.0, quantity=2)
+        book.apply("SELL", "SPX", 5700.0, "P", "3/14", price=1.0)
+        self.assertEqual([p["right"] for p in book.snapshot()], ["C"])
+        self.assertEqual(len(book.snapshot(include_closed=True)), 2)
+        self.assertEqual(book.realized_pnl(), -400.0)
+
+    def test_catch_up_follows_the_trades_table(self):
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        self.addCleanup(conn.close)
+        conn.execute(
+            "CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT, price REAL, quantity INTEGER, "
+            "trade_type TEXT, strike REAL, option_type TEXT, expiry TEXT, fraction REAL)"
+        )
+        insert = (
+            "INSERT INTO trades (symbol, price, quantity, trade_type, strike, option_type, expiry, fraction) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+
+        def fetch_since(last_id, limit):
+            return conn.execute("SELECT * FROM trades WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)).fetchall()
+
+        conn.executemany(insert, [
+            ("SPX", 5.0, 2, "BUY", 5700.0, "C", "3/14", None),
+            ("AAPL", 180.0, 10, "BUY", None, None, None, None),  # not an option: skipped
+            ("SPX", 6.0, 2, "BUY", 5700.0, "C", "3/14", None),
+        ])
+        book = PositionBook()
+        self.assertEqual(book.catch_up(fetch_since, batch_size=2), 2)
+        self.assertEqual(book.last_trade_id, 3)
+        self.assertAlmostEqual(book.get(*SPX).avg_cost, 5.5)
+
+        # Only rows committed since the last call are applied
+        conn.execute(insert, ("SPX", 7.5, None, "SELL", 5700.0, "C", "3/14", 0.5))
+        self.assertEqual(book.catch_up(fetch_since, batch_size=2), 1)
+        self.assertEqual(book.catch_up(fetch_since, batch_size=2), 0)
+        self.assertEqual(book.get(*SPX).quantity, 2)
+        self.assertEqual(book.realized_pnl(), 400.0)
+        self.assertEqual(book.events_applied, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""RecordCache lookups, generations and cache_versions invalidation.
+
+Version checks read the cache_versions row that migration 6's triggers
+advance on every write to users, in an in-memory database.
+Run with: python -m unittest discover tests
+"""
+import os
+import sqlite3
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.migrations import migrate  # noqa: E402
+from utils.record_cache import RecordCache  # noqa: E402
+
+
+class Record:
+    def __init__(self, id, username, email=None):
+        self.id = id
+        self.username = username
+        self.email = email
+
+
+def record_keys(record):
+    return (("id", record.id), ("username", record.username), ("email", record.email))
+
+
+class RecordCacheTest(unittest.TestCase):
+    def test_record_is_found_under_every_key(self):
+        cache = RecordCache(record_keys)
+        cache.put(Record(1, "alice", "alice@example.com"))
+        for field, value in (("id", 1), ("username", "alice"), ("email", "alice@example.com")):
+            self.assertEqual(cache.get(field, value).id, 1)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_none_keys_are_not_indexed(self):
+        cache = RecordCache(record_keys)
+        cache.put(Record(1, "alice"))
+        self.assertIsNone(cache.get("email", None))
+
+    def test_callers_get_copies(self):
+        cache = RecordCache(record_keys)
+        record = Record(1, "alice")
+        cache.put(record)
+        record.username = "mallory"
+        cache.get("id", 1).username = "eve"
+        self.assertEqual(cache.get("id", 1).username, "alice")
+
+    def test_new_owner_of_a_key_replaces_the_old_record(self):
+        cache = RecordCache(record_keys)
+        cache.put(Record(1, "alice", "shared@example.com"))
+        cache.put(Record(2, "bob", "shared@example.com"))
+        self.assertIsNone(cache.get("id", 1))
+        self.assertEqual(cache.get("email", "shared@example.com").id, 2)
+
+    def test_lru_eviction(self):
+        cache = RecordCache(record_keys, max_entries=2)
+        cache.put(Record(1, "alice"))
+        cache.put(Record(2, "bob"))
+        cache.get("id", 1)
+        cache.put(Record(3, "carol"))
+        self.assertIsNone(cache.get("username", "bob"))
+        self.assertIsNotNone(cache.get("username", "alice"))
+        self.assertEqual(cache.stats()["evicted"], 1)
+
+    def test_expired_records_miss(self):
+        cache = RecordCache(record_keys, ttl=0)
+        cache.put(Record(1, "alice"))
+        self.assertIsNone(cache.get("id", 1))
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_put_after_invalidation_is_dropped(self):
+        cache = RecordCache(record_keys)
+        generation = cache.generation
+        # A write committed (and invalidated) while the record was being loaded
+        cache.invalidate()
+        cache.put(Record(1, "alice"), generation)
+        self.assertIsNone(cache.get("id", 1))
+        cache.put(Record(1, "alice"), cache.generation)
+        self.assertIsNotNone(cache.get("id", 1))
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = RecordCache(record_keys, max_entries=0)
+        cache.put(Record(1, "alice"))
+        self.assertIsNone(cache.get("id", 1))
+
+
+class RecordCacheVersionTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+        migrate(self.conn)
+        self.conn.execute("INSERT INTO users (username, email) VALUES ('alice', 'alice@example.com')")
+        self.conn.commit()
+
+    def version(self):
+        return self.conn.execute("SELECT version FROM cache_versions WHERE name = 'users'").fetchone()[0]
+
+    def test_write_from_another_process_empties_the_cache(self):
+        cache = RecordCache(record_keys, version=self.version, check_interval=0)
+        cache.get("id", 1)  # first check records the current version
+        cache.put(Record(1, "alice"))
+        self.assertIsNotNone(cache.get("id", 1))
+
+        self.conn.execute("UPDATE users SET email = 'new@example.com' WHERE id = 1")
+        self.conn.commit()
+        self.assertIsNone(cache.get("id", 1))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_version_is_read_at_most_every_check_interval(self):
+        cache = RecordCache(record_keys, version=self.version, check_interval=3600)
+        cache.get("id", 1)
+        cache.put(Record(1, "alice"))
+        self.conn.execute("DELETE FROM users WHERE id = 1")
+        self.conn.commit()
+        # The change is only noticed on the next check
+        self.assertIsNotNone(cache.get("id", 1))
+        self.assertEqual(cache.stats()["version_checks"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
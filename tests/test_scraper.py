@@ -0,0 +1,128 @@
+"""OcrPipeline must emit alerts in capture order and only skip redraws.
+
+The OCR stage is driven with completed futures and the emit stage with
+hand-built (captured_at, text) results, so no screen, tesseract or
+process pool is needed. Run with: python -m unittest discover tests
+"""
+import concurrent.futures
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from discord_notification_scraper import OcrPipeline  # noqa: E402
+
+
+class Frame:
+    """Stand-in for a PIL image: dhash() only needs convert/resize/getdata"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def convert(self, mode):
+        return self
+
+    def resize(self, size):
+        self.pixels = size[0] * size[1]
+        return self
+
+    def getdata(self):
+        return [(i * self.value * 7919) % 251 for i in range(self.pixels)]
+
+
+class FrameCapture:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def grab(self):
+        return Frame(self.values.pop(0)) if self.values else None
+
+
+def ocr_result(text, seconds=0.01):
+    future = concurrent.futures.Future()
+    future.set_result((text, seconds))
+    return future
+
+
+class OcrPipelineTest(unittest.TestCase):
+    def make_pipeline(self, **kwargs):
+        self.posted = []
+        return OcrPipeline(None, post=lambda text, captured_at: self.posted.append((text, captured_at)),
+                           workers=1, redraw_seconds=5, **kwargs)
+
+    def emit(self, pipeline, results):
+        """Run the emit stage over (captured_at, text) results and any OCR results already ready"""
+        for result in results:
+            pipeline._ready.put(result)
+        pipeline._outstanding = pipeline._ready.qsize()
+        pipeline._ready.put(None)
+        pipeline._emit_loop()
+        self.assertEqual(pipeline._outstanding, 0)
+
+    def test_ocr_results_are_emitted_in_capture_order(self):
+        pipeline = self.make_pipeline()
+        completions = [(2, 102.0, 'Trade Alert C'), (0, 100.0, 'Trade Alert A'), (1, 101.0, 'Trade Alert B')]
+        for seq, captured_at, text in completions:
+            pipeline._slots.acquire()
+            pipeline._ocr_done(seq, captured_at, ocr_result(text))
+        # Nothing may overtake seq 0, so all three are ready only after it lands
+        self.assertEqual(pipeline._ready.qsize(), 3)
+        self.emit(pipeline, [])
+        self.assertEqual(self.posted, [('Trade Alert A', 100.0), ('Trade Alert B', 101.0), ('Trade Alert C', 102.0)])
+
+    def test_failed_ocr_does_not_block_later_frames(self):
+        pipeline = self.make_pipeline()
+        failed = concurrent.futures.Future()
+        failed.set_exception(RuntimeError('tesseract crashed'))
+        pipeline._slots.acquire()
+        pipeline._ocr_done(0, 100.0, failed)
+        pipeline._slots.acquire()
+        pipeline._ocr_done(1, 101.0, ocr_result('Trade Alert A'))
+        self.emit(pipeline, [])
+        self.assertEqual(self.posted, [('Trade Alert A', 101.0)])
+        self.assertEqual(pipeline.stats()['ocr_errors'], 1)
+
+    def test_redraw_within_window_is_suppressed(self):
+        pipeline = self.make_pipeline()
+        self.emit(pipeline, [(100.0, 'Trade Alert A'), (101.0, 'Trade Alert A '), (102.5, 'Trade Alert A')])
+        self.assertEqual(self.posted, [('Trade Alert A', 100.0)])
+
+    def test_redraws_extend_the_window(self):
+        pipeline = self.make_pipeline()
+        # A notification held on screen (hover) keeps redrawing past the window
+        self.emit(pipeline, [(100.0 + 3 * i, 'Trade Alert A') for i in range(5)])
+        self.assertEqual(len(self.posted), 1)
+
+    def test_repeat_after_window_is_a_new_alert(self):
+        pipeline = self.make_pipeline()
+        self.emit(pipeline, [(100.0, 'Trade Alert A'), (200.0, 'Trade Alert A')])
+        self.assertEqual(self.posted, [('Trade Alert A', 100.0), ('Trade Alert A', 200.0)])
+
+    def test_repeat_after_blank_frame_is_a_new_alert(self):
+        pipeline = self.make_pipeline()
+        self.emit(pipeline, [(100.0, 'Trade Alert A'), (101.0, '  \n'), (102.0, 'Trade Alert A')])
+        self.assertEqual(self.posted, [('Trade Alert A', 100.0), ('Trade Alert A', 102.0)])
+
+    def test_text_without_keyword_is_ignored(self):
+        pipeline = self.make_pipeline()
+        self.emit(pipeline, [(100.0, 'Trade Alert A'), (101.0, 'Trade Alrt A'), (102.0, 'Trade Alert A')])
+        self.assertEqual(self.posted, [('Trade Alert A', 100.0)])
+        self.assertEqual(pipeline.stats()['alerts'], 1)
+
+    def test_run_posts_every_change_including_the_last(self):
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+        self.addCleanup(executor.shutdown)
+        pipeline = self.make_pipeline(executor=executor, poll_hz=0, queue_size=64)
+        pipeline.capture = FrameCapture([1, 1, 2, 3, 3, 3])
+        pipeline.ocr = lambda frame: f'Trade Alert {frame.value}'
+        stats = pipeline.run()
+        self.assertEqual([text for text, _ in self.posted], ['Trade Alert 1', 'Trade Alert 2', 'Trade Alert 3'])
+        self.assertEqual(stats['frames'], 6)
+        self.assertEqual(stats['changes'], 3)
+        self.assertEqual(stats['dropped_frames'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import re
+from collections import namedtuple
+
+# One parsed options alert. ``fraction`` is the share of the position being
+# sold (1.0 for ALL OUT, None for buys), ``contracts`` the size given on the
+# alert ("- 1 cont") and ``remaining`` the "50 contracts left" count.
+OptionAlert = namedtuple(
+    "OptionAlert",
+    "action underlying strike right expiry price fraction contracts remaining pct_change"
+)
+
+_ACTIONS = {"BOUGHT": "BOUGHT", "SOLD": "SOLD", "ALLOUT": "ALL OUT"}
+
+# <action> [<n>/<d>] <underlying> <strike><C|P> <m>/<d>[/<y>] <price> <tail>
+_ALERT_PATTERN = re.compile(
+    r"\s*(?P<action>BOUGHT|SOLD|ALL\s+OUT)"
+    r"\s+(?:(?P<num>\d+)/(?P<den>\d+)\s+)?"
+    r"(?P<underlying>[A-Z][A-Z0-9.]{0,9})"
+    r"\s+(?P<strike>\d+(?:\.\d+)?)(?P<right>[CP])"
+    r"\s+(?P<expiry>\d{1,2}/\d{1,2}(?:/\d{2,4})?)"
+    r"\s+(?P<price>\d*\.?\d+)\b"
+    r"(?P<tail>.*)",
+    re.IGNORECASE | re.DOTALL
+)
+_CONTRACTS_PATTERN = re.compile(r"^\s*-\s*(\d+)\s*cont(?:ract)?s?\b(?!\s+left)", re.IGNORECASE)
+_REMAINING_PATTERN = re.compile(r"(\d+)\s+cont(?:ract)?s?\s+left", re.IGNORECASE)
+_PCT_PATTERN = re.compile(r"^\s*([-+]?\d+(?:\.\d+)?)%")
+
+
+def parse_alert(text):
+    """Parse a Discord options alert line, returning an OptionAlert or None"""
+    match = _ALERT_PATTERN.match(text)
+    if match is None:
+        return None
+
+    action = _ACTIONS["".join(match.group("action").upper().split())]
+    num, den = match.group("num"), match.group("den")
+    if action == "ALL OUT":
+        fraction = 1.0
+    elif num is not None and int(den):
+        fraction = int(num) / int(den)
+    else:
+        fraction = None
+
+    contracts = remaining = pct_change = None
+    tail = match.group("tail")
+    if tail:
+        found = _CONTRACTS_PATTERN.match(tail)
+        if found:
+            contracts = int(found.group(1))
+        found = _PCT_PATTERN.match(tail)
+        if found:
+            pct_change = float(found.group(1))
+        found = _REMAINING_PATTERN.search(tail)
+        if found:
+            remaining = int(found.group(1))
+
+    return OptionAlert(
+        action,
+        match.group("underlying").upper(),
+        float(match.group("strike")),
+        match.group("right").upper(),
+        match.group("expiry"),
+        float(match.group("price")),
+        fraction,
+        contracts,
+        remaining,
+        pct_change
+    )
+
+
+def parse_alerts(lines):
+    """Yield an OptionAlert for every line that matches the alert grammar"""
+    for line in lines:
+        alert = parse_alert(line)
+        if alert is not None:
+            yield alert
@@ -0,0 +1,50 @@
+"""Rows written for each stored alert, shared by the webhook (backend/app.py)
+and backfill_alerts.py so both load the tables the same way."""
+
+INSERT_NOTIFICATION_SQL = (
+    "INSERT INTO notifications (source, content, timestamp, raw_data, content_hash) VALUES (?, ?, ?, ?, ?)"
+)
+INSERT_INSIGHT_SQL = (
+    "INSERT INTO insights (ticker, category, subcategory, sentiment, summary, confidence, source, timestamp) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_TRADE_SQL = (
+    "INSERT INTO trades (symbol, price, quantity, trade_type, source, timestamp, strike, option_type, expiry, fraction) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def notification_row(source, text, timestamp, raw_data, content_hash):
+    """INSERT_NOTIFICATION_SQL parameters; raw_data is the JSON text of the payload"""
+    return (source, text, timestamp, raw_data, content_hash)
+
+
+def insight_row(insight):
+    """INSERT_INSIGHT_SQL parameters for a classify() result"""
+    return (
+        insight["ticker"],
+        insight["category"],
+        insight.get("subcategory", ""),
+        insight.get("sentiment", ""),
+        insight["summary"],
+        insight["confidence"],
+        insight["source"],
+        insight["timestamp"]
+    )
+
+
+def trade_side(alert):
+    """(trade_type, quantity) for a parsed OptionAlert: a BOUGHT without a
+    contract count is one contract, a SOLD without one closes a fraction"""
+    if alert.action == "BOUGHT":
+        return "BUY", alert.contracts or 1
+    return "SELL", alert.contracts
+
+
+def trade_row(alert, source, timestamp):
+    """INSERT_TRADE_SQL parameters for a parsed OptionAlert"""
+    trade_type, quantity = trade_side(alert)
+    return (
+        alert.underlying, alert.price, quantity, trade_type, source, timestamp,
+        alert.strike, alert.right, alert.expiry, alert.fraction
+    )
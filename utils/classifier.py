@@ -0,0 +1,84 @@
+import re
+from collections import namedtuple
+
+# A rule fires when the message's has-ticker flag matches ``requires_ticker``
+# and any of its ``keywords`` occurs (case-insensitively, as a substring).
+# Rules with no keywords are fallbacks. Rules are tried in order.
+Rule = namedtuple("Rule", "requires_ticker keywords category subcategory sentiment summary confidence")
+
+RULES = (
+    Rule(True, ("buy", "sell"), "Actionable Trade", "", "", "Trade suggestion for {ticker}.", 85.0),
+    Rule(True, ("short",), "AI Insight", "", "Bearish", "Bearish sentiment on {ticker} based on market signal.", 80.0),
+    Rule(True, ("breakout",), "AI Insight", "", "Bullish", "Bullish sentiment on {ticker} based on market signal.", 80.0),
+    Rule(True, (), "General Insight", "Community/Noise", "", "General comment about {ticker}.", 30.0),
+    Rule(False, ("means",), "General Insight", "Education", "", "General trading discussion.", 60.0),
+    Rule(False, (), "General Insight", "Community/Noise", "", "General trading discussion.", 10.0),
+)
+
+# First whitespace-delimited word starting with "$"
+_TICKER_PATTERN = re.compile(r"(?<!\S)\$\S*")
+
+
+class Classifier:
+    """Classify alert text against a rule table compiled into one regex.
+
+    All keywords are folded into a single alternation wrapped in a
+    lookahead, so one scan over the lowercased text finds every keyword,
+    including ones that overlap (e.g. "meansell").
+    """
+
+    def __init__(self, rules=RULES):
+        self.rules = tuple(rules)
+        keywords = sorted({keyword for rule in self.rules for keyword in rule.keywords}, key=len, reverse=True)
+        alternation = "|".join(re.escape(keyword) for keyword in keywords)
+        self._pattern = re.compile(f"(?=({alternation}))") if keywords else None
+        self._rules_by_ticker = {
+            has_ticker: tuple(
+                (frozenset(rule.keywords), rule) for rule in self.rules if rule.requires_ticker == has_ticker
+            )
+            for has_ticker in (True, False)
+        }
+
+    def match(self, post_text):
+        """Return the (rule, ticker) pair that applies to the text"""
+        has_ticker = "$" in post_text
+        if has_ticker:
+            found = _TICKER_PATTERN.search(post_text)
+            ticker = found.group() if found else "N/A"
+        else:
+            ticker = "N/A"
+
+        if self._pattern is not None:
+            keywords = {m.group(1) for m in self._pattern.finditer(post_text.lower())}
+        else:
+            keywords = set()
+
+        for rule_keywords, rule in self._rules_by_ticker[has_ticker]:
+            if not rule_keywords or not rule_keywords.isdisjoint(keywords):
+                return rule, ticker
+        raise ValueError("Rule table has no fallback rule")
+
+    def classify(self, post_text, source, timestamp):
+        """Classify one message into an insight dict"""
+        rule, ticker = self.match(post_text)
+        return {
+            "ticker": ticker,
+            "category": rule.category,
+            "subcategory": rule.subcategory,
+            "sentiment": rule.sentiment,
+            "summary": rule.summary.format(ticker=ticker),
+            "confidence": rule.confidence,
+            "source": source,
+            "timestamp": timestamp
+        }
+
+    def classify_many(self, items):
+        """Classify an iterable of (post_text, source, timestamp) tuples"""
+        classify = self.classify
+        return [classify(post_text, source, timestamp) for post_text, source, timestamp in items]
+
+
+# Shared default instance, compiled once at import
+default_classifier = Classifier()
+classify = default_classifier.classify
+classify_many = default_classifier.classify_many
@@ -1,142 +1,225 @@
-import sqlite3
+import itertools
 import os
+import re
 import threading
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from operator import itemgetter
 from utils.logger import app_logger as logger
+from utils.metrics import Counter, Histogram, timed
+from utils.migrations import ensure_schema
+from utils.pool import get_pool
 
 # Define the database path
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tradesync.db")
 
-# Thread-local storage for database connections
-_local = threading.local()
+DB_CALL_SECONDS = Histogram("tradesync_db_call_seconds", "Database helper call latency", ["operation"])
+DB_CALL_ERRORS = Counter("tradesync_db_call_errors_total", "Database helper calls that raised", ["operation"])
+
+# Time a Database method and count its failures under one operation label
+def instrumented(operation):
+    return timed(DB_CALL_SECONDS.labels(operation), DB_CALL_ERRORS.labels(operation))
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def check_identifiers(*names):
+    """Raise ValueError unless every name is a plain SQL identifier (they are
+    interpolated into statements, so they must never come from user input)"""
+    for name in names:
+        if not isinstance(name, str) or not IDENTIFIER.match(name):
+            raise ValueError(f"Invalid SQL identifier: {name!r}")
+
+# Validated once per table/column set; the SQL text is reused afterwards
+@lru_cache(maxsize=256)
+def insert_sql(table, columns, conflict=(), update=None):
+    """INSERT statement for ``columns`` (a tuple); with ``conflict`` columns it
+    becomes an upsert that sets ``update`` (default: every other column)"""
+    check_identifiers(table, *columns, *conflict)
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+    if not conflict:
+        return query
+    if update is None:
+        update = tuple(column for column in columns if column not in conflict)
+    check_identifiers(*update)
+    if not update:
+        return f"{query} ON CONFLICT ({', '.join(conflict)}) DO NOTHING"
+    assignments = ", ".join(f"{column} = excluded.{column}" for column in update)
+    return f"{query} ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {assignments}"
+
+def row_values(rows, columns=None):
+    """Return (values, columns) for executemany from dicts or sequences; dict
+    rows default to the first row's keys, sequences need ``columns``"""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return (), tuple(columns or ())
+    rows = itertools.chain([first], rows)
+    if isinstance(first, dict):
+        columns = tuple(first if columns is None else columns)
+        if len(columns) == 1:
+            return ((row[columns[0]],) for row in rows), columns
+        return map(itemgetter(*columns), rows), columns
+    if columns is None:
+        raise ValueError("columns are required when rows are sequences")
+    return rows, tuple(columns)
 
 class Database:
+    def __init__(self, path=DATABASE_PATH):
+        self.path = path
+        # The connection of the transaction() open on each thread
+        self._local = threading.local()
+
+    @property
+    def pool(self):
+        """The shared connection pool for this database"""
+        return get_pool(self.path)
+
     def initialize_db(self):
         """Initialize the database with required tables if they don't exist"""
         try:
             # Create database directory if it doesn't exist
-            os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
             
-            # Get a connection
-            conn = self.get_db_connection()
-            
-            # Create users table
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                email TEXT UNIQUE,
-                password_hash TEXT,
-                google_id TEXT UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """)
-            
-            # Create trades table
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                symbol TEXT NOT NULL,
-                price REAL,
-                quantity INTEGER,
-                trade_type TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                source TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-            """)
-            
-            # Create strategies table
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS strategies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                name TEXT NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-            """)
-            
-            # Create portfolios table
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS portfolios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                name TEXT NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-            """)
-            
-            conn.commit()
+            # Create or upgrade every table through the versioned migrations
+            ensure_schema(self.get_db_connection, self.path)
             logger.info("Database initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
             raise e
 
     def get_db_connection(self):
-        """Get a connection to the database"""
-        # Use thread-local storage for connections
-        if not hasattr(_local, "connection"):
-            # Connect with check_same_thread=False to avoid threading issues
-            _local.connection = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
-            _local.connection.row_factory = sqlite3.Row
-        
-        return _local.connection
+        """Check a pooled connection out; use as `with db.get_db_connection() as conn:`
+
+        Inside transaction() this is the transaction's connection instead.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return nullcontext(conn)
+        return self.pool.connection()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block of writes as one transaction: `with db.transaction() as conn:`
+
+        Commits when the block exits, rolls back if it raises. The helpers
+        below join a transaction open on the same thread instead of
+        committing on their own, and nested transaction() blocks are part of
+        the outermost one.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        with self.pool.connection() as conn:
+            self._local.conn = conn
+            try:
+                # Take the write lock up front rather than failing to upgrade mid-way
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.conn = None
+
+    def _commit(self, conn):
+        if conn is not getattr(self._local, "conn", None):
+            conn.commit()
+
+    def _rollback(self, conn):
+        if conn is not getattr(self._local, "conn", None):
+            conn.rollback()
 
     def close_db_connection(self):
-        """Close the database connection if it exists"""
-        if hasattr(_local, "connection"):
-            _local.connection.close()
-            delattr(_local, "connection")
+        """Close the idle pooled connections"""
+        self.pool.close()
 
+    @instrumented("query")
     def execute_query(self, query, params=(), fetch_one=False, commit=False):
-        """Execute a SQL query and optionally return results"""
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(query, params)
+        """Execute a SQL query and optionally return results.
+
+        Writes must pass commit=True; uncommitted work is rolled back when
+        the connection goes back to the pool.
+        """
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
             
-            if commit:
-                conn.commit()
+            try:
+                cursor.execute(query, params)
             
-            if fetch_one:
-                return cursor.fetchone()
-            else:
-                return cursor.fetchall()
-        except Exception as e:
-            logger.error(f"Database error: {e}")
-            if commit:
-                conn.rollback()
-            raise e
-        finally:
-            cursor.close()
+                if commit:
+                    self._commit(conn)
+            
+                if fetch_one:
+                    return cursor.fetchone()
+                else:
+                    return cursor.fetchall()
+            except Exception as e:
+                logger.error(f"Database error: {e}")
+                if commit:
+                    self._rollback(conn)
+                raise e
+            finally:
+                cursor.close()
 
+    @instrumented("insert")
     def insert_row(self, table, data):
         """Insert a row into a table and return the ID"""
-        columns = ", ".join(data.keys())
-        placeholders = ", ".join(["?"] * len(data))
+        query = insert_sql(table, tuple(data))
         values = tuple(data.values())
         
-        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                cursor.execute(query, values)
+                self._commit(conn)
+                return cursor.lastrowid
+            except Exception as e:
+                logger.error(f"Error inserting into {table}: {e}")
+                self._rollback(conn)
+                raise e
+            finally:
+                cursor.close()
+
+    @instrumented("insert_many")
+    def insert_many(self, table, rows, columns=None):
+        """Insert rows (dicts, or sequences in ``columns`` order) in a single
+        transaction and return how many were inserted"""
+        values, columns = row_values(rows, columns)
+        if not columns:
+            return 0
+        query = insert_sql(table, columns)
         
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        with self.transaction() as conn:
+            try:
+                return conn.executemany(query, values).rowcount
+            except Exception as e:
+                logger.error(f"Error inserting into {table}: {e}")
+                raise e
+
+    @instrumented("upsert_many")
+    def upsert_many(self, table, rows, conflict, columns=None, update=None):
+        """Insert rows in a single transaction, updating the existing row
+        where one with the same ``conflict`` columns (a unique key) exists.
+
+        ``update`` names the columns overwritten on conflict (default: all
+        the others); an empty one keeps existing rows as they are.
+        """
+        values, columns = row_values(rows, columns)
+        if not columns:
+            return 0
+        query = insert_sql(table, columns, tuple(conflict), None if update is None else tuple(update))
         
-        try:
-            cursor.execute(query, values)
-            conn.commit()
-            return cursor.lastrowid
-        except Exception as e:
-            logger.error(f"Error inserting into {table}: {e}")
-            conn.rollback()
-            raise e
-        finally:
-            cursor.close()
+        with self.transaction() as conn:
+            try:
+                return conn.executemany(query, values).rowcount
+            except Exception as e:
+                logger.error(f"Error upserting into {table}: {e}")
+                raise e
 
+    @instrumented("update")
     def update_row(self, table, data, condition):
         """Update rows in a table that match the condition"""
         set_clause = ", ".join([f"{key} = ?" for key in data.keys()])
@@ -145,20 +228,21 @@ class Database:
         query = f"UPDATE {table} SET {set_clause} WHERE {where_clause}"
         values = tuple(list(data.values()) + list(condition.values()))
         
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(query, values)
-            conn.commit()
-            return cursor.rowcount
-        except Exception as e:
-            logger.error(f"Error updating {table}: {e}")
-            conn.rollback()
-            raise e
-        finally:
-            cursor.close()
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                cursor.execute(query, values)
+                self._commit(conn)
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"Error updating {table}: {e}")
+                self._rollback(conn)
+                raise e
+            finally:
+                cursor.close()
 
+    @instrumented("delete")
     def delete_row(self, table, condition):
         """Delete rows from a table that match the condition"""
         where_clause = " AND ".join([f"{key} = ?" for key in condition.keys()])
@@ -166,19 +250,19 @@ class Database:
         
         query = f"DELETE FROM {table} WHERE {where_clause}"
         
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(query, values)
-            conn.commit()
-            return cursor.rowcount
-        except Exception as e:
-            logger.error(f"Error deleting from {table}: {e}")
-            conn.rollback()
-            raise e
-        finally:
-            cursor.close()
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                cursor.execute(query, values)
+                self._commit(conn)
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"Error deleting from {table}: {e}")
+                self._rollback(conn)
+                raise e
+            finally:
+                cursor.close()
 
 # Create a single instance of the Database class
 db = Database()
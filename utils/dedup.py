@@ -0,0 +1,86 @@
+import collections
+import hashlib
+import threading
+import time
+
+
+def normalize_text(text):
+    """Case-fold and collapse whitespace so trivially different captures compare equal"""
+    return " ".join(text.split()).casefold()
+
+
+def content_hash(text, source, bucket):
+    """Hash of the normalized text, its source and a time bucket number"""
+    key = f"{source}\x1f{bucket}\x1f{normalize_text(text)}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def stored_hashes(conn, digests, chunk_size=500):
+    """Return the subset of ``digests`` already in notifications.content_hash"""
+    digests = list(digests)
+    found = set()
+    for start in range(0, len(digests), chunk_size):
+        chunk = digests[start:start + chunk_size]
+        found.update(row[0] for row in conn.execute(
+            f"SELECT content_hash FROM notifications WHERE content_hash IN ({', '.join('?' * len(chunk))})", chunk
+        ))
+    return found
+
+
+class Deduplicator:
+    """Detect repeated alerts within a time window using an in-memory LRU.
+
+    Alerts are hashed per ``window_seconds`` bucket. An alert counts as a
+    repeat when its hash for the current bucket or the previous one has
+    been seen, so two captures straddling a bucket boundary still match.
+    The LRU only covers this process; callers persist hashes behind a
+    unique index to catch repeats across processes and restarts.
+    """
+
+    def __init__(self, window_seconds=60, max_entries=10000):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"checked": 0, "suppressed_memory": 0, "suppressed_db": 0}
+
+    @property
+    def enabled(self):
+        return self.window_seconds > 0
+
+    def hashes(self, text, source, when=None):
+        """Return (current, previous) bucket hashes for an alert received at ``when``"""
+        bucket = int((time.time() if when is None else when) // self.window_seconds)
+        return content_hash(text, source, bucket), content_hash(text, source, bucket - 1)
+
+    def is_duplicate(self, hashes):
+        """Check (without recording) whether any of ``hashes`` was seen recently"""
+        with self._lock:
+            self._stats["checked"] += 1
+            for digest in hashes:
+                if digest in self._seen:
+                    self._seen.move_to_end(digest)
+                    self._stats["suppressed_memory"] += 1
+                    return True
+        return False
+
+    def remember(self, digest):
+        """Record a hash once its alert has been stored"""
+        with self._lock:
+            self._seen[digest] = True
+            self._seen.move_to_end(digest)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+
+    def record_db_duplicates(self, count):
+        """Count repeats that got past the LRU but were found among stored hashes"""
+        with self._lock:
+            self._stats["suppressed_db"] += count
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._seen)
+        stats["suppressed"] = stats["suppressed_memory"] + stats["suppressed_db"]
+        stats["window_seconds"] = self.window_seconds
+        return stats
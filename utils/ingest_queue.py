@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the ingest queue is at capacity and cannot accept more work"""
+
+
+class IngestQueue:
+    """Bounded in-process queue drained in micro-batches by one writer thread.
+
+    ``flush`` is called from the writer thread with a list of
+    ``(receipt, item)`` tuples and is expected to persist them in a single
+    transaction. A batch is flushed once it reaches ``batch_size`` items or
+    ``flush_interval`` seconds after its first item was dequeued.
+
+    Submitters have already been given a receipt, so a failed flush (a
+    locked database, a pool timeout) is retried up to ``max_retries`` times,
+    waiting ``retry_backoff`` seconds and doubling each time. A batch that
+    still fails is handed to ``on_failure(batch, error)`` so it can be
+    recovered later rather than lost.
+    """
+
+    def __init__(self, flush, max_size=1000, batch_size=100, flush_interval=0.05, name="ingest-writer",
+                 max_retries=3, retry_backoff=0.2, on_failure=None):
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.on_failure = on_failure
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "flushed": 0,
+            "failed": 0,
+            "retries": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def start(self):
+        """Start the writer thread if it is not already running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Flush whatever is queued and stop the writer thread"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, item):
+        """Queue an item without blocking and return its receipt id"""
+        self.start()
+        receipt = uuid.uuid4().hex
+        try:
+            self._queue.put_nowait((receipt, item))
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise QueueFull(f"Ingest queue is full ({self._queue.maxsize} items)")
+        with self._lock:
+            self._stats["submitted"] += 1
+        return receipt
+
+    def stats(self):
+        """Return a snapshot of queue depth and writer counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["depth"] = self._queue.qsize()
+        stats["max_size"] = self._queue.maxsize
+        stats["batch_size"] = self.batch_size
+        stats["flush_interval_ms"] = self.flush_interval * 1000
+        return stats
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            if not self._flush_with_retries(batch):
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with self._lock:
+                self._stats["flushed"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["last_batch_size"] = len(batch)
+                self._stats["last_flush_ms"] = round(elapsed_ms, 3)
+
+    def _flush_with_retries(self, batch):
+        delay = self.retry_backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.flush(batch)
+                return True
+            except Exception as e:
+                error = e
+            if attempt < self.max_retries:
+                logger.warning(
+                    "Flush of %d queued items failed (%s); retrying in %.2fs", len(batch), error, delay
+                )
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(delay)
+                delay *= 2
+
+        logger.error(f"Failed to flush {len(batch)} queued items after {self.max_retries} retries: {str(error)}")
+        with self._lock:
+            self._stats["failed"] += len(batch)
+        if self.on_failure is not None:
+            try:
+                self.on_failure(batch, error)
+            except Exception as e:
+                logger.error(f"Could not record {len(batch)} failed items: {str(e)}")
+        return False
@@ -1,36 +1,182 @@
+import atexit
+import itertools
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-def setup_logger(name, log_file, level=logging.INFO):
+# LOG_FORMAT=json switches every handler set up here to one JSON object per line
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+# Fraction of DEBUG records kept, per message template (1 keeps everything)
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1))
+LOG_DIR = os.environ.get('LOG_DIR', 'logs')
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON, including any extra= fields"""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in every 1/rate records at or below ``level``, counted per message template"""
+
+    def __init__(self, rate, level=logging.DEBUG):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self.level = level
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.level:
+            return True
+        if self.every == 0:
+            return False
+        counter = self._counters.get(record.msg)
+        if counter is None:
+            with self._lock:
+                # Pre-formatted (f-string) messages are all distinct templates
+                if len(self._counters) >= 10000:
+                    self._counters.clear()
+                counter = self._counters.setdefault(record.msg, itertools.count())
+        return next(counter) % self.every == 0
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock handler merges args into the message before enqueueing, which
+    puts the formatting cost back on the caller. Records stay in-process,
+    so they don't need to be made picklable either.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+# Queue handlers whose listeners were started here; stopped (and flushed) at exit
+_queue_handlers = []
+_lock = threading.Lock()
+
+
+def _formatter(json_format):
+    if json_format is None:
+        json_format = LOG_FORMAT == 'json'
+    return JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
+
+def attach_queue_handler(logger, handlers, level=logging.INFO, sample_rate=None):
+    """Route ``logger`` through a queue to ``handlers`` written on a listener thread.
+
+    The calling thread only filters and enqueues the record. Calling this
+    again for the same logger replaces its previous queue handler.
+    """
+    sample_rate = LOG_DEBUG_SAMPLE_RATE if sample_rate is None else sample_rate
+    records = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(records)
+    if sample_rate < 1:
+        queue_handler.addFilter(SamplingFilter(sample_rate))
+    queue_handler.listener = QueueListener(records, *handlers, respect_handler_level=True)
+
+    with _lock:
+        for handler in list(logger.handlers):
+            if isinstance(handler, LazyQueueHandler):
+                logger.removeHandler(handler)
+                if handler in _queue_handlers:
+                    _queue_handlers.remove(handler)
+                    handler.listener.stop()
+        logger.addHandler(queue_handler)
+        logger.setLevel(level)
+        queue_handler.listener.start()
+        _queue_handlers.append(queue_handler)
+    return logger
+
+
+def setup_logger(name, log_file, level=logging.INFO, json_format=None, sample_rate=None):
     """Function to set up a logger with file and console handlers"""
     # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
-    # Create logger
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    
-    # Create handlers
+    os.makedirs(LOG_DIR, exist_ok=True)
+
     file_handler = RotatingFileHandler(
-        os.path.join('logs', log_file), 
+        os.path.join(LOG_DIR, log_file),
         maxBytes=5*1024*1024,  # 5MB
         backupCount=3
     )
     console_handler = logging.StreamHandler()
-    
-    # Create formatters
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    formatter = _formatter(json_format)
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
-    
-    # Add handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
 
-# Common loggers
-discord_logger = setup_logger('discord', 'discord.log')
-trade_logger = setup_logger('trade', 'trade.log')
-app_logger = setup_logger('app', 'app.log')
+    return attach_queue_handler(logging.getLogger(name), [file_handler, console_handler], level, sample_rate)
+
+
+def configure_logging(level=logging.INFO, json_format=None, sample_rate=None):
+    """Queue-backed replacement for logging.basicConfig: root logs go to stderr off-thread"""
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(_formatter(json_format))
+    return attach_queue_handler(logging.getLogger(), [console_handler], level, sample_rate)
+
+
+@atexit.register
+def stop_listeners():
+    """Drain every queue and stop the listener threads"""
+    with _lock:
+        handlers = list(_queue_handlers)
+        _queue_handlers.clear()
+    for handler in handlers:
+        handler.listener.stop()
+
+
+def _restart_listeners():
+    # Threads don't survive fork (e.g. gunicorn --preload); without a fresh
+    # listener a worker's records would pile up in the queue unwritten. The
+    # inherited listener still thinks it is running, so it is replaced by a new
+    # one on the same queue rather than restarted.
+    for handler in _queue_handlers:
+        old = handler.listener
+        handler.listener = QueueListener(old.queue, *old.handlers, respect_handler_level=old.respect_handler_level)
+        handler.listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listeners)
+
+
+# Common loggers, created on first access rather than at import
+COMMON_LOGGERS = {
+    'discord_logger': ('discord', 'discord.log'),
+    'trade_logger': ('trade', 'trade.log'),
+    'app_logger': ('app', 'app.log'),
+}
+
+
+_common_lock = threading.Lock()
+
+
+def __getattr__(name):
+    if name not in COMMON_LOGGERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _common_lock:
+        if name not in globals():
+            globals()[name] = setup_logger(*COMMON_LOGGERS[name])
+    return globals()[name]
@@ -0,0 +1,391 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond SQLite calls to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def reset(self):
+        self.value = 0.0
+
+    def dump(self):
+        return self.value
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Read the value from ``function()`` at collection time instead"""
+        self.function = function
+
+    def reset(self):
+        self.value = 0.0
+
+    def dump(self):
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception as e:
+                logger.warning(f"Gauge callback failed: {str(e)}")
+                return float("nan")
+        return self.value
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        # One count per bucket plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the ``with`` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * len(self.counts)
+            self.sum = 0.0
+
+    def dump(self):
+        with self._lock:
+            return self.counts + [self.sum]
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The child for one combination of label values (created on first use)"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def reset(self):
+        """Zero every child; callback gauges keep their callbacks"""
+        for child in list(self._children.values()):
+            child.reset()
+
+    def snapshot(self):
+        return {
+            "kind": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "children": [[list(key), child.dump()] for key, child in list(self._children.items())],
+        }
+
+
+class Counter(_Metric):
+    """Monotonic count, summed across workers; by convention named ``*_total``"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Point-in-time value; ``mode`` says how workers combine ("sum" or "max").
+
+    Values from workers that are no longer running are dropped.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, mode="sum"):
+        self.mode = mode
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot["mode"] = self.mode
+        return snapshot
+
+
+class Histogram(_Metric):
+    """Bucketed observations (typically latencies in seconds), summed across workers"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+
+def timed(histogram, errors=None):
+    """Decorator observing each call's duration on ``histogram`` (a metric or
+    labelled child) and counting raised exceptions on ``errors``"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+class Registry:
+    """A set of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def reset(self):
+        """Zero every metric (e.g. in a worker forked from a process that already counted)"""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+
+REGISTRY = Registry()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots):
+    """Combine per-process snapshots given as (pid, snapshot, alive) triples"""
+    merged = {}
+    for pid, snapshot, alive in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, children={}))
+            if metric["kind"] == "gauge" and not alive:
+                continue
+            for key, value in metric["children"]:
+                key = tuple(key)
+                current = target["children"].get(key)
+                if current is None:
+                    target["children"][key] = value
+                elif metric["kind"] == "histogram":
+                    target["children"][key] = [a + b for a, b in zip(current, value)]
+                elif metric["kind"] == "gauge" and metric.get("mode") == "max":
+                    target["children"][key] = max(current, value)
+                else:
+                    target["children"][key] = current + value
+    for metric in merged.values():
+        metric["children"] = [[list(key), value] for key, value in metric["children"].items()]
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(snapshot):
+    """Render a snapshot in the Prometheus text exposition format (0.0.4)"""
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for key, value in sorted(metric["children"], key=lambda child: child[0]):
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_format_labels(names, key)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + [float("inf")], value[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(names, key, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(names, key)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(names, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class MultiProcessExporter:
+    """Share one registry's values between forked workers through files.
+
+    Each process writes its snapshot to ``<directory>/<pid>.json`` every
+    ``interval`` seconds (and at render time); collect() merges all files.
+    Counters and histograms of exited workers are kept so totals never go
+    backwards, which means ``directory`` should be emptied before the server
+    starts.
+    """
+
+    def __init__(self, directory, registry=REGISTRY, interval=5.0):
+        self.directory = directory
+        self.registry = registry
+        self.interval = interval
+        self._thread = None
+        self._pid = None
+        self._fork_hook = False
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """Start the periodic writer for this process (restarted in forked children)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+        if not self._fork_hook:
+            os.register_at_fork(after_in_child=self._after_fork)
+            self._fork_hook = True
+
+    def _after_fork(self):
+        # The parent's counts are already in the parent's file
+        self.registry.reset()
+        self._thread = None
+        self.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Error writing metrics: {str(e)}")
+
+    def write(self):
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(tmp, path)
+
+    def collect(self):
+        self.write()
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            pid = int(filename[:-5])
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots.append((pid, snapshot, pid == os.getpid() or _pid_alive(pid)))
+        return merge_snapshots(snapshots)
+
+
+def collect(exporter=None, registry=REGISTRY):
+    """Render every metric, merged across workers when ``exporter`` is given"""
+    snapshot = exporter.collect() if exporter is not None else registry.snapshot()
+    return render(snapshot)
@@ -0,0 +1,320 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def add_column(table, column, column_type):
+    """Migration step that adds a column unless the table already has it"""
+    def step(conn):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    return step
+
+
+# Summary-table keys. Confidence is a percentage; its bucket is the decile, 0-9
+# (100 falls in 9).
+# Triggers and the initial backfill must use the same expressions.
+def insight_stats_key(row):
+    return (
+        f"IFNULL({row}.ticker, ''), IFNULL({row}.category, ''), IFNULL({row}.sentiment, ''), "
+        f"MIN(CAST(MAX(IFNULL({row}.confidence, 0), 0) / 10 AS INTEGER), 9), IFNULL({row}.closed, 0)"
+    )
+
+
+def trade_stats_key(row):
+    return f"IFNULL(SUBSTR({row}.timestamp, 1, 13), ''), IFNULL({row}.symbol, ''), IFNULL({row}.trade_type, '')"
+
+
+INSIGHT_STATS_COLUMNS = "ticker, category, sentiment, confidence_bucket, closed"
+TRADE_STATS_COLUMNS = "hour, symbol, trade_type"
+
+
+def count_insight(row, sign):
+    """Trigger statement adding (sign=1) or removing (sign=-1) one insight from insight_stats"""
+    if sign > 0:
+        return (
+            f"INSERT INTO insight_stats ({INSIGHT_STATS_COLUMNS}, count) VALUES ({insight_stats_key(row)}, 1) "
+            f"ON CONFLICT ({INSIGHT_STATS_COLUMNS}) DO UPDATE SET count = count + 1;"
+        )
+    return (
+        f"UPDATE insight_stats SET count = count - 1 "
+        f"WHERE ({INSIGHT_STATS_COLUMNS}) = ({insight_stats_key(row)});"
+    )
+
+
+def count_trade(row, sign):
+    """Trigger statement adding (sign=1) or removing (sign=-1) one trade from trade_stats"""
+    if sign > 0:
+        return (
+            f"INSERT INTO trade_stats ({TRADE_STATS_COLUMNS}, count, quantity) "
+            f"VALUES ({trade_stats_key(row)}, 1, IFNULL({row}.quantity, 0)) "
+            f"ON CONFLICT ({TRADE_STATS_COLUMNS}) DO UPDATE SET "
+            f"count = count + 1, quantity = quantity + excluded.quantity;"
+        )
+    return (
+        f"UPDATE trade_stats SET count = count - 1, quantity = quantity - IFNULL({row}.quantity, 0) "
+        f"WHERE ({TRADE_STATS_COLUMNS}) = ({trade_stats_key(row)});"
+    )
+
+
+def bump_cache_version(table):
+    """Triggers advancing cache_versions.<table> on every insert, update and delete,
+    so caches in any process can tell that the table changed"""
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_cache_version_{event.lower()} AFTER {event} ON {table} BEGIN
+            UPDATE cache_versions SET version = version + 1 WHERE name = '{table}';
+        END
+        """
+        for event in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+# Ordered (version, description, steps). A step is a SQL string or a callable
+# taking the connection. Steps must be idempotent so that a database created
+# by an older, unversioned build can be brought forward safely. Never edit a
+# released migration; append a new one instead.
+MIGRATIONS = [
+    (1, "Create core tables", [
+        """
+        CREATE TABLE IF NOT EXISTS insights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticker TEXT,
+            category TEXT,
+            subcategory TEXT,
+            sentiment TEXT,
+            summary TEXT,
+            confidence REAL,
+            source TEXT,
+            timestamp TEXT,
+            closed INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT,
+            content TEXT,
+            timestamp DATETIME,
+            raw_data TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            email TEXT UNIQUE,
+            password_hash TEXT,
+            google_id TEXT UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            symbol TEXT NOT NULL,
+            price REAL,
+            quantity INTEGER,
+            trade_type TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            source TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS strategies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS portfolios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """,
+    ]),
+    (2, "Add insights.closed and option contract columns on trades", [
+        add_column("insights", "closed", "INTEGER DEFAULT 0"),
+        "UPDATE insights SET closed = 0 WHERE closed IS NULL",
+        add_column("trades", "strike", "REAL"),
+        add_column("trades", "option_type", "TEXT"),
+        add_column("trades", "expiry", "TEXT"),
+        add_column("trades", "fraction", "REAL"),
+    ]),
+    # Every index ends in rowid (= id), so each one also serves ORDER BY id DESC
+    (3, "Index the insights list filters", [
+        "CREATE INDEX IF NOT EXISTS idx_insights_closed ON insights (closed)",
+        "CREATE INDEX IF NOT EXISTS idx_insights_ticker_closed ON insights (ticker, closed)",
+        "CREATE INDEX IF NOT EXISTS idx_insights_category_closed ON insights (category, closed)",
+        "CREATE INDEX IF NOT EXISTS idx_insights_sentiment_closed ON insights (sentiment, closed)",
+        "CREATE INDEX IF NOT EXISTS idx_insights_closed_timestamp ON insights (closed, timestamp)",
+    ]),
+    (4, "Add notifications.content_hash for ingest deduplication", [
+        add_column("notifications", "content_hash", "TEXT"),
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_content_hash ON notifications (content_hash)",
+    ]),
+    # Counts kept current by triggers, so /api/stats aggregates a few hundred
+    # summary rows instead of scanning insights and trades
+    (5, "Add insight_stats and trade_stats summary tables", [
+        f"""
+        CREATE TABLE IF NOT EXISTS insight_stats (
+            ticker TEXT NOT NULL,
+            category TEXT NOT NULL,
+            sentiment TEXT NOT NULL,
+            confidence_bucket INTEGER NOT NULL,
+            closed INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY ({INSIGHT_STATS_COLUMNS})
+        ) WITHOUT ROWID
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS trade_stats (
+            hour TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            trade_type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY ({TRADE_STATS_COLUMNS})
+        ) WITHOUT ROWID
+        """,
+        "DELETE FROM insight_stats",
+        f"""
+        INSERT INTO insight_stats ({INSIGHT_STATS_COLUMNS}, count)
+        SELECT {insight_stats_key("insights")}, COUNT(*) FROM insights GROUP BY 1, 2, 3, 4, 5
+        """,
+        "DELETE FROM trade_stats",
+        f"""
+        INSERT INTO trade_stats ({TRADE_STATS_COLUMNS}, count, quantity)
+        SELECT {trade_stats_key("trades")}, COUNT(*), IFNULL(SUM(quantity), 0) FROM trades GROUP BY 1, 2, 3
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS insight_stats_insert AFTER INSERT ON insights BEGIN
+            {count_insight("NEW", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS insight_stats_delete AFTER DELETE ON insights BEGIN
+            {count_insight("OLD", -1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS insight_stats_update
+        AFTER UPDATE OF ticker, category, sentiment, confidence, closed ON insights BEGIN
+            {count_insight("OLD", -1)}
+            {count_insight("NEW", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trade_stats_insert AFTER INSERT ON trades BEGIN
+            {count_trade("NEW", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trade_stats_delete AFTER DELETE ON trades BEGIN
+            {count_trade("OLD", -1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trade_stats_update
+        AFTER UPDATE OF symbol, trade_type, timestamp, quantity ON trades BEGIN
+            {count_trade("OLD", -1)}
+            {count_trade("NEW", 1)}
+        END
+        """,
+    ]),
+    # Read by utils.record_cache.RecordCache (the User cache) to notice writes from other processes
+    (6, "Add cache_versions, advanced by triggers on users", [
+        """
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('users', 0)",
+        *bump_cache_version("users"),
+    ]),
+    # Read by backend/app.py's db_change_token(); /api/insights and /api/stats only read
+    # these two tables (and the stats tables their triggers maintain)
+    (7, "Advance cache_versions on writes to insights and trades", [
+        "INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('insights', 0), ('trades', 0)",
+        *bump_cache_version("insights"),
+        *bump_cache_version("trades"),
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Database paths already migrated by this process
+_migrated = set()
+_lock = threading.Lock()
+
+
+def current_version(conn):
+    """Return the schema version recorded in the database (0 if none)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations and return the resulting schema version.
+
+    Runs under BEGIN IMMEDIATE, so when several workers start at once one
+    applies the migrations while the others wait on the write lock and then
+    find nothing left to do.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = current_version(conn)
+        for target, description, steps in MIGRATIONS:
+            if target <= version:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (target, description)
+            )
+            logger.info(f"Applied schema migration {target}: {description}")
+            version = target
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return version
+
+
+def ensure_schema(connection, db_path):
+    """Migrate ``db_path`` once per process.
+
+    ``connection`` is a factory returning a context manager that yields a
+    connection, such as ``ConnectionPool.connection``.
+    """
+    if db_path in _migrated:
+        return
+    with _lock:
+        if db_path in _migrated:
+            return
+        with connection() as conn:
+            migrate(conn)
+        _migrated.add(db_path)
@@ -0,0 +1,165 @@
+import asyncio
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from utils.metrics import Counter, Histogram
+
+# Werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000";
+# unset uses Werkzeug's default. Stored hashes made with other parameters are
+# upgraded the next time their user logs in.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or None
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+# Hashes queued or running at once; further requests are rejected, not queued
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+
+PASSWORD_HASH_SECONDS = Histogram(
+    'tradesync_password_hash_seconds', 'Password hash and verify latency, queueing included', ['operation'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+PASSWORD_HASH_REJECTED = Counter('tradesync_password_hash_rejected_total', 'Hash requests refused while busy')
+
+
+class HasherBusy(Exception):
+    """Raised when PASSWORD_HASH_MAX_PENDING hashes are already queued or running"""
+
+
+# Run in the worker processes
+def _hash(password, method):
+    if method is None:
+        return generate_password_hash(password)
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+def method_of(password_hash):
+    """The method part of a Werkzeug hash ("scrypt:32768:8:1$salt$hash" -> "scrypt:32768:8:1")"""
+    return password_hash.split('$', 1)[0] if password_hash else None
+
+
+def expand_method(method=None):
+    """The method prefix Werkzeug writes for ``method``, with its defaults filled
+    in ("pbkdf2" -> "pbkdf2:sha256:1000000"); worked out without hashing"""
+    if method is None:
+        method = inspect.signature(generate_password_hash).parameters['method'].default
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    """Password hashing on a dedicated process pool with a bounded backlog.
+
+    Hashing is deliberately slow, so it runs in ``workers`` separate
+    processes instead of on request threads, and at most ``max_pending``
+    calls may be queued or running; beyond that, callers get HasherBusy
+    immediately (answer it with a 503) rather than piling up behind a
+    login storm. The pool is started on first use in each process, so it is
+    safe to create before gunicorn forks. ``workers=0`` hashes inline.
+    """
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_MAX_PENDING, timeout=PASSWORD_HASH_TIMEOUT_SECONDS):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        # Known up front, so needs_rehash() never waits on (or is refused by) the pool
+        self.method_tag = expand_method(method)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._stats = {"hashed": 0, "verified": 0, "rejected": 0, "failed": 0, "pending": 0}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # A pool inherited through fork belongs to the parent
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, operation, function, *args):
+        """Start ``function(*args)`` on the pool and return its concurrent Future"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            PASSWORD_HASH_REJECTED.inc()
+            raise HasherBusy(f"{self.max_pending} password hashes already pending")
+        with self._lock:
+            self._stats["pending"] += 1
+        started = time.perf_counter()
+
+        def done(future):
+            self._slots.release()
+            PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - started)
+            with self._lock:
+                self._stats["pending"] -= 1
+                self._stats["failed" if future.exception() else operation] += 1
+
+        try:
+            if self.workers > 0:
+                future = self._pool().submit(function, *args)
+            else:
+                future = Future()
+                try:
+                    future.set_result(function(*args))
+                except Exception as e:
+                    future.set_exception(e)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self._stats["pending"] -= 1
+            raise
+        future.add_done_callback(done)
+        return future
+
+    def hash(self, password):
+        """Hash ``password`` with the configured method"""
+        return self.submit("hashed", _hash, password, self.method).result(self.timeout)
+
+    def verify(self, password_hash, password):
+        """Check ``password`` against a stored hash"""
+        if not password_hash:
+            return False
+        return self.submit("verified", _verify, password_hash, password).result(self.timeout)
+
+    async def hash_async(self, password):
+        """hash() for coroutines: waits on the pool without blocking the event loop"""
+        future = self.submit("hashed", _hash, password, self.method)
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+
+    async def verify_async(self, password_hash, password):
+        """verify() for coroutines"""
+        if not password_hash:
+            return False
+        future = self.submit("verified", _verify, password_hash, password)
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with other parameters than the configured ones"""
+        return bool(password_hash) and method_of(password_hash) != self.method_tag
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["workers"] = self.workers
+        stats["max_pending"] = self.max_pending
+        stats["method"] = self.method_tag
+        return stats
+
+
+# Shared instance used by models.user
+password_hasher = PasswordHasher()
@@ -0,0 +1,189 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the timeout"""
+
+
+def default_pragmas():
+    """Connection pragmas, overridable through SQLITE_* environment variables"""
+    return {
+        # Readers no longer block on writers (and vice versa) with a WAL journal
+        "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        # NORMAL is durable across application crashes in WAL mode and skips
+        # most fsyncs; use FULL if power-loss durability matters more
+        "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        # Negative values are KiB, so -20000 is a ~20MB page cache per connection
+        "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -20000)),
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 10000)),
+        "temp_store": "MEMORY",
+    }
+
+
+class ConnectionPool:
+    """Bounded pool of tuned SQLite connections for one database file.
+
+    Connections are handed out LIFO so the warmest page cache is reused.
+    At most ``max_size`` connections exist at once; further callers wait up
+    to ``timeout`` seconds. A connection that has sat idle longer than
+    ``health_check_interval`` is pinged before reuse and replaced if dead.
+    """
+
+    def __init__(self, path, max_size=8, timeout=10.0, pragmas=None, cached_statements=256,
+                 health_check_interval=30.0):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = default_pragmas() if pragmas is None else pragmas
+        self.cached_statements = cached_statements
+        self.health_check_interval = health_check_interval
+        self.pid = os.getpid()
+        self._idle = []  # (connection, released_at)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+            "timeouts": 0,
+            "in_use": 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.pragmas.get("busy_timeout", 10000) / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding unhealthy connection to {self.path}: {str(e)}")
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._stats["discarded"] += 1
+
+    def acquire(self):
+        """Check a connection out of the pool; pair every call with release()"""
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeout(f"No connection to {self.path} available after {self.timeout}s")
+
+        try:
+            while True:
+                with self._lock:
+                    conn, released_at = self._idle.pop() if self._idle else (None, None)
+                if conn is None:
+                    conn = self._connect()
+                    with self._lock:
+                        self._stats["misses"] += 1
+                    break
+                if time.monotonic() - released_at < self.health_check_interval or self._healthy(conn):
+                    with self._lock:
+                        self._stats["hits"] += 1
+                    break
+                with self._lock:
+                    self._stats["health_check_failures"] += 1
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["in_use"] += 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection, rolling back anything left uncommitted"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+        else:
+            with self._lock:
+                keep = not self._closed
+                if keep:
+                    self._idle.append((conn, time.monotonic()))
+            if not keep:
+                self._discard(conn)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and returns it afterwards"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """Return hit/miss counters and current pool occupancy"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+        stats["max_size"] = self.max_size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
+
+    def close(self):
+        """Close every idle connection; checked-out ones are closed on release,
+        and get_pool() hands out a fresh pool for the path from now on"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path, **kwargs):
+    """Return the process-wide pool for ``path``, creating it on first use.
+
+    Pools inherited across a fork (e.g. gunicorn --preload) are replaced,
+    since SQLite connections must not be shared between processes, and so
+    are closed ones.
+    """
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None or pool.pid != os.getpid() or pool._closed:
+            if "max_size" not in kwargs:
+                kwargs["max_size"] = int(os.environ.get("DB_POOL_SIZE", 8))
+            pool = _pools[path] = ConnectionPool(path, **kwargs)
+        return pool
@@ -0,0 +1,260 @@
+import asyncio
+import collections
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One subscriber's bounded inbox of pre-encoded events.
+
+    Filters are ORed within a field and ANDed across fields, so
+    ``tickers={"$A", "$B"}, categories={"AI Insight"}`` receives AI insights
+    for either ticker. A subscriber that falls ``max_pending`` events behind
+    is marked overflowed and closed; it should reconnect and resume from
+    its last event id.
+    """
+
+    def __init__(self, hub, tickers=None, categories=None, max_pending=1000):
+        self.hub = hub
+        self.tickers = frozenset(tickers or ())
+        self.categories = frozenset(categories or ())
+        self.overflowed = False
+        self.closed = False
+        self._inbox = queue.Queue(maxsize=max_pending)
+
+    def matches(self, ticker, category):
+        return (not self.tickers or ticker in self.tickers) and \
+            (not self.categories or category in self.categories)
+
+    def deliver(self, event):
+        try:
+            self._inbox.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+            self.close()
+
+    def get(self, timeout=None):
+        """Return the next (event_id, payload) or None if nothing arrived in time"""
+        try:
+            return self._inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read with ``await get()`` from an asyncio event loop.
+
+    Must be created on the loop's thread. Publishers deliver from any
+    thread; each event is handed to the loop with call_soon_threadsafe, so
+    a waiting subscriber costs a coroutine rather than a blocked thread.
+    """
+
+    def __init__(self, hub, tickers=None, categories=None, max_pending=1000):
+        super().__init__(hub, tickers, categories, max_pending)
+        self.loop = asyncio.get_running_loop()
+        self._inbox = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop has shut down; nobody is left to read
+            self.close()
+
+    def _put(self, event):
+        try:
+            self._inbox.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.close()
+
+    async def get(self, timeout=None):
+        """Return the next (event_id, payload) or None if nothing arrived in time"""
+        try:
+            return await asyncio.wait_for(self._inbox.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """In-process publish/subscribe hub for insight events.
+
+    Each event is JSON-encoded once into an SSE frame and the same bytes are
+    handed to every matching subscriber. Subscribers are indexed by their
+    most selective filter, so publishing only visits subscribers that can
+    match. The last ``history_size`` events are kept for Last-Event-ID resume.
+    """
+
+    def __init__(self, history_size=1000, max_subscribers=5000, floor=None):
+        self.max_subscribers = max_subscribers
+        self._history = collections.deque(maxlen=history_size)
+        # Every event with an id above the floor is in the history buffer
+        self._floor = floor
+        self._last_id = floor
+        self._by_ticker = collections.defaultdict(set)
+        self._by_category = collections.defaultdict(set)
+        self._unfiltered = set()
+        self._count = 0
+        self._lock = threading.Lock()
+        self.published = 0
+
+    @staticmethod
+    def encode(event_id, data, event="insight"):
+        """Render one Server-Sent Events frame as bytes"""
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+    def _buckets(self, subscription):
+        if subscription.tickers:
+            return [self._by_ticker[ticker] for ticker in subscription.tickers]
+        if subscription.categories:
+            return [self._by_category[category] for category in subscription.categories]
+        return [self._unfiltered]
+
+    def subscribe(self, tickers=None, categories=None, last_event_id=None, max_pending=1000,
+                  subscription_class=Subscription):
+        """Register a subscriber and return (subscription, backlog).
+
+        ``backlog`` holds the buffered (event_id, payload) pairs after
+        ``last_event_id`` that match the filters, or is None when the buffer
+        no longer reaches back that far and the caller must replay from the
+        database instead.
+        """
+        subscription = subscription_class(self, tickers, categories, max_pending)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise OverflowError(f"Subscriber limit of {self.max_subscribers} reached")
+            for bucket in self._buckets(subscription):
+                bucket.add(subscription)
+            self._count += 1
+
+            backlog = []
+            if last_event_id is not None:
+                if self._floor is None or last_event_id < self._floor:
+                    backlog = None
+                else:
+                    backlog = [
+                        (event_id, payload) for event_id, ticker, category, payload in self._history
+                        if event_id > last_event_id and subscription.matches(ticker, category)
+                    ]
+        return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            removed = False
+            for bucket in self._buckets(subscription):
+                if subscription in bucket:
+                    bucket.discard(subscription)
+                    removed = True
+            if removed:
+                self._count -= 1
+
+    def set_floor(self, event_id):
+        """Declare that every event after ``event_id`` will be published in order"""
+        with self._lock:
+            self._history.clear()
+            self._floor = event_id
+            self._last_id = event_id
+
+    @property
+    def last_id(self):
+        """Id of the last event published (or the floor); a subscriber receives every later one live"""
+        with self._lock:
+            return self._last_id
+
+    @property
+    def subscriber_count(self):
+        return self._count
+
+    def publish(self, event_id, data):
+        """Fan one event out to every matching subscriber; ids must increase"""
+        ticker = data.get("ticker")
+        category = data.get("category")
+        payload = self.encode(event_id, data)
+        with self._lock:
+            if len(self._history) == self._history.maxlen:
+                self._floor = self._history[0][0]
+            self._history.append((event_id, ticker, category, payload))
+            self._last_id = event_id
+            candidates = set(self._unfiltered)
+            candidates.update(self._by_ticker.get(ticker, ()))
+            candidates.update(self._by_category.get(category, ()))
+            self.published += 1
+        for subscription in candidates:
+            if subscription.matches(ticker, category):
+                subscription.deliver((event_id, payload))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": self._count,
+                "published": self.published,
+                "buffered": len(self._history)
+            }
+
+
+class TableTailer:
+    """Feed a hub from an append-only table, in id order, with one query per wake.
+
+    ``fetch_since(last_id, limit)`` returns up to ``limit`` (id, data) pairs
+    with ids above ``last_id``. Writers call notify() after committing so
+    local events go out immediately; rows committed by other processes are
+    picked up within ``poll_interval`` seconds. Tailing the table rather
+    than publishing from each writer keeps the stream gap-free and ordered
+    even when several workers write concurrently.
+    """
+
+    def __init__(self, hub, fetch_since, latest_id, poll_interval=1.0, batch_size=500, name="table-tailer"):
+        self.hub = hub
+        self.fetch_since = fetch_since
+        self.latest_id = latest_id
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.name = name
+        self.last_id = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start tailing from the current end of the table (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.last_id = self.latest_id()
+            self.hub.set_floor(self.last_id)
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Wake the tailer after a commit"""
+        self._wake.set()
+
+    def poll(self):
+        """Publish every row committed since the last poll; returns the count"""
+        published = 0
+        while True:
+            rows = self.fetch_since(self.last_id, self.batch_size)
+            for event_id, data in rows:
+                self.hub.publish(event_id, data)
+                self.last_id = event_id
+            published += len(rows)
+            if len(rows) < self.batch_size:
+                return published
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error tailing events: {str(e)}")
@@ -0,0 +1,123 @@
+import collections
+import copy
+import threading
+import time
+
+CachedRecord = collections.namedtuple("CachedRecord", "record keys expires")
+
+
+class RecordCache:
+    """Bounded TTL/LRU cache of model objects reachable by several unique keys.
+
+    ``keys(record)`` returns the (field, value) pairs a record can be looked
+    up by, e.g. id, username and email; the record is stored once and indexed
+    under each, so a login by email also warms later lookups by id. Records
+    are copied on the way in and out, so callers may modify what they get.
+
+    Coherence across processes comes from ``version()``, a counter that every
+    write to the underlying table advances (see the cache_versions table). It
+    is read at most every ``check_interval`` seconds and a change empties the
+    cache, so another process's write is seen within that interval. Writers
+    in this process call invalidate() after committing, which takes effect
+    immediately.
+    """
+
+    def __init__(self, keys, version=None, max_entries=1024, ttl=300.0, check_interval=1.0):
+        self.keys = keys
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.check_interval = check_interval
+        # Bumped on every invalidation; put() drops records loaded before one
+        self.generation = 0
+        self._records = collections.OrderedDict()  # id(record) -> CachedRecord
+        self._index = {}  # (field, value) -> id(record)
+        self._seen_version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidations": 0, "version_checks": 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _check_version(self, now):
+        if self.version is None or (self._checked_at is not None and now - self._checked_at < self.check_interval):
+            return
+        self._checked_at = now
+        # Read outside the lock: it is a database round trip
+        version = self.version()
+        with self._lock:
+            self._stats["version_checks"] += 1
+            if self._seen_version is not None and version != self._seen_version:
+                self._clear()
+            self._seen_version = version
+
+    def get(self, field, value):
+        """Return a copy of the cached record with ``field == value``, or None"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        self._check_version(now)
+        with self._lock:
+            key = self._index.get((field, value))
+            cached = self._records.get(key) if key is not None else None
+            if cached is None:
+                self._stats["misses"] += 1
+                return None
+            if cached.expires <= now:
+                self._discard(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._records.move_to_end(key)
+            self._stats["hits"] += 1
+            return copy.copy(cached.record)
+
+    def put(self, record, generation=None):
+        """Cache ``record``, unless an invalidation happened since ``generation``
+        (read before loading it) was current"""
+        if not self.enabled:
+            return
+        keys = [(field, value) for field, value in self.keys(record) if value is not None]
+        record = copy.copy(record)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            # A record now owning one of these keys replaces whatever held it
+            for pair in keys:
+                if pair in self._index:
+                    self._discard(self._index[pair])
+            key = id(record)
+            self._records[key] = CachedRecord(record, keys, time.monotonic() + self.ttl)
+            for pair in keys:
+                self._index[pair] = key
+            while len(self._records) > self.max_entries:
+                self._discard(next(iter(self._records)))
+                self._stats["evicted"] += 1
+
+    def invalidate(self):
+        """Drop every cached record (after a write by this process)"""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._records.clear()
+        self._index.clear()
+        self.generation += 1
+        self._stats["invalidations"] += 1
+
+    def _discard(self, key):
+        cached = self._records.pop(key)
+        for pair in cached.keys:
+            if self._index.get(pair) == key:
+                del self._index[pair]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._records)
+            stats["generation"] = self.generation
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
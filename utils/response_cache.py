@@ -0,0 +1,66 @@
+import collections
+import hashlib
+import threading
+
+CacheEntry = collections.namedtuple("CacheEntry", "body etag headers version token")
+
+
+class ResponseCache:
+    """Cache of pre-serialized response bodies keyed by request parameters.
+
+    Entries are tagged with the data version current when the body was
+    built and are only served while that version (and the optional
+    ``token``, e.g. a cross-process change marker) is unchanged. Writers
+    call bump() after committing. ETags are content hashes, so they stay
+    stable across bumps when the data a query returns did not change.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.version = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "bytes_saved": 0}
+
+    def bump(self):
+        """Invalidate every cached entry by advancing the data version"""
+        with self._lock:
+            self.version += 1
+            return self.version
+
+    def get(self, key, token=None):
+        """Return the current entry for ``key`` or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == self.version and entry.token == token:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key, body, headers=None, version=None, token=None):
+        """Store a body built at ``version`` (read before building) and return its entry"""
+        etag = hashlib.sha1(body).hexdigest()
+        entry = CacheEntry(body, etag, dict(headers or {}), self.version if version is None else version, token)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def record_not_modified(self, entry):
+        """Count a 304 answered instead of sending ``entry``'s body"""
+        with self._lock:
+            self._stats["not_modified"] += 1
+            self._stats["bytes_saved"] += len(entry.body)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["version"] = self.version
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats